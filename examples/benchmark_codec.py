@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Script to compare the JSON codecs and the request compression with payloads similar to the ones of a recorder.
+"""
+import argparse
+import json
+import timeit
+
+from mirismanagerclient.lib.codec import CODEC_NAMES, compress_form_data, get_codec
+
+
+def get_payloads(profiles_count):
+    # Status info sent by a recorder during a recording (see "examples/recorder_controller.py")
+    status_info = {
+        'status_message': 'Recording in progress',
+        'audio': {'master': {'volume': 1.0, 'muted': False}},
+        'video': [{
+            'type': 'ndivsource',
+            'name': 'source-%s' % index,
+            'device': 'v4l-HDMI-%s-pci-0000:01:00.0' % index,
+            'capture': '1280x720@25',
+            'signal': 'fake'
+        } for index in range(4)],
+        'playlist': '/videos/BigBuckBunny_320x180.m3u8',
+        'time_in_sec': 3725,
+        'timecode': '1:02:05',
+        'record_folder': '/home/ubicast/mediacoder/media/20200227-112957-09bd'
+    }
+    # Profiles list returned for the "LIST_PROFILES" action
+    profiles = {
+        'profile-%s' % index: {
+            'has_password': False,
+            'can_live': bool(index % 2),
+            'name': 'profile-%s' % index,
+            'label': 'Profile %s' % index,
+            'type': 'recorder'
+        } for index in range(profiles_count)
+    }
+    return {'status_info': status_info, 'profiles': profiles}
+
+
+def main(args):
+    payloads = get_payloads(args.profiles)
+    for payload_name, payload in payloads.items():
+        content = json.dumps(payload).encode('utf-8')
+        print(f'Payload "{payload_name}": {len(content)} bytes')
+        for codec_name in CODEC_NAMES:
+            try:
+                codec = get_codec(codec_name)
+            except ImportError:
+                print(f'    {codec_name:8}: not installed')
+                continue
+            loads = timeit.timeit(lambda: codec.loads(content), number=args.number)  # noqa: B023
+            dumps = timeit.timeit(lambda: codec.dumps(payload), number=args.number)  # noqa: B023
+            print(
+                f'    {codec_name:8}: decode {loads * 1000000 / args.number:8.2f} µs, '
+                f'encode {dumps * 1000000 / args.number:8.2f} µs'
+            )
+        body, _headers = compress_form_data({'data': content.decode('utf-8')}, threshold=1)
+        print(f'    gzip    : {len(body)} bytes')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument(
+        '--number',
+        default=10000,
+        help='The number of iterations for each measure.',
+        type=int,
+    )
+    parser.add_argument(
+        '--profiles',
+        default=20,
+        help='The number of profiles in the profiles list payload.',
+        type=int,
+    )
+    args = parser.parse_args()
+
+    main(args)
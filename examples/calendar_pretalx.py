@@ -4,11 +4,10 @@ Script to import a pretalx schedule in the calendar of a Miris Manager system.
 """
 
 import argparse
-from datetime import datetime, timedelta
+from datetime import datetime
 import hashlib
-import json
 from pathlib import Path
-import pprint
+import sys
 import tempfile
 
 import requests
@@ -19,13 +18,12 @@ def get_cache_path(pretalx_url):
     return Path(tempfile.gettempdir()) / f'pretalx-schedule-{digest}.json'
 
 
-def get_schedule(pretalx_url, use_cache=True):
-    cache_path = get_cache_path(pretalx_url)
-    if use_cache and cache_path.exists():
-        return json.loads(cache_path.read_text())
-    schedule = requests.get(pretalx_url).json()
-    cache_path.write_text(json.dumps(schedule))
-    return schedule
+def get_schedule(pretalx_url, use_cache=True, ttl=300):
+    # The cached schedule is used during its TTL, then revalidated with a conditional request
+    from mirismanagerclient.lib.http_cache import CachedDownload
+
+    cache = CachedDownload(pretalx_url, get_cache_path(pretalx_url), ttl=ttl)
+    return cache.get_json(revalidate=not use_cache)
 
 
 def get_rooms(schedule):
@@ -35,44 +33,64 @@ def get_rooms(schedule):
     return sorted(rooms)
 
 
+def get_sync_prefix(schedule, room_name=None):
+    # Keys are scoped by conference and room, so the events of other imports in the same system are never changed
+    conference = schedule['schedule']['conference']
+    prefix = 'pretalx:%s:' % (conference.get('acronym') or conference.get('title') or '')
+    if room_name:
+        prefix += '%s:' % room_name
+    return prefix
+
+
+def get_pretalx_events(schedule, room_name, enabled=False):
+    # Normalize the talks of a room, dates are converted from the schedule time zone
+    from mirismanagerclient.lib.calendar_sync import CalendarEvent, parse_duration
+
+    conference = schedule['schedule']['conference']
+    prefix = get_sync_prefix(schedule, room_name)
+    time_zone = conference.get('time_zone_name') or 'Europe/Paris'
+    events = []
+    for day in conference['days']:
+        for talk in day['rooms'].get(room_name, []):
+            start = datetime.fromisoformat(talk['date'])  # 2022-07-06T15:15:00+02:00
+            events.append(CalendarEvent(
+                key=prefix + str(talk.get('code') or talk.get('guid') or talk['id']),
+                start=start,
+                end=start + parse_duration(talk['duration']),  # 00:20
+                title=talk['title'],
+                speaker=', '.join(person['public_name'] for person in talk['persons']),
+                description=talk['abstract'],
+                room=room_name,
+                enabled=enabled,
+                time_zone=time_zone,
+            ))
+    return events
+
+
 def import_pretalx_events(args, schedule):
-    for day in schedule['schedule']['conference']['days']:
-        for conf in day['rooms'].get(args.room_name, []):
-            start = datetime.fromisoformat(conf['date'])  # 2022-07-06T15:15:00+02:00 --> YYYY-MM-DD HH:MM:SS
-            start_date = start.strftime('%Y-%m-%d %H:%M:%S')
-            duration = conf['duration']  # 00:20
-            d = datetime.strptime(duration, '%H:%M')
-            end = start + timedelta(hours=d.hour, minutes=d.minute)
-            end_date = end.strftime('%Y-%m-%d %H:%M:%S')
-
-            parameters = {
-                'title': conf['title'],
-                'speaker': conf['persons'][0]['public_name'],
-                'description': conf['abstract'],
-            }
-
-            headers = {
-                'api-key': args.api_key,
-                'system': args.serial,
-            }
-
-            data = {
-                'start_date': start_date,
-                'end_date': end_date,
-                'time_zone': 'Europe/Paris',
-                'command': 'record',
-                'parameters': json.dumps(parameters),
-                'enabled': 'yes' if args.enable_event else 'no',
-            }
-
-            print(f'about to post: {pprint.pformat(data)}')
-            if not args.dry_run:
-                p = requests.post(
-                    f'{args.url}/api/v3/fleet/calendars/add-event/',
-                    headers=headers,
-                    data=data,
-                )
-                print(p.content)
+    from mirismanagerclient import MirisManagerClient
+
+    client = MirisManagerClient(local_conf={
+        'SERVER_URL': args.url,
+        'API_KEY': args.api_key,
+        'AUTO_REGISTRATION': False,
+    })
+
+    def progress(done, total, operation, key, error):
+        print(f'[{done}/{total}] {operation} {key}: {error or "ok"}')
+
+    prefix = get_sync_prefix(schedule, args.room_name)
+    if args.rollback:
+        report = client.rollback_calendar(
+            args.serial, args.state, prefix=prefix, dry_run=args.dry_run, progress=progress)
+    else:
+        events = get_pretalx_events(schedule, args.room_name, enabled=args.enable_event)
+        # Only the changes since the last import are sent, talks removed from the schedule are deleted
+        report = client.sync_calendar(
+            args.serial, events, prefix=prefix, dry_run=args.dry_run, progress=progress,
+            state_path=args.state)
+    print(report)
+    return report
 
 
 if __name__ == '__main__':
@@ -90,7 +108,13 @@ if __name__ == '__main__':
     early_parser.add_argument(
         '--no-cache',
         action='store_true',
-        help='Ignore the on-disk schedule cache and download a fresh copy.',
+        help='Revalidate the on-disk schedule cache even if its TTL has not expired.',
+    )
+    early_parser.add_argument(
+        '--cache-ttl',
+        default=300,
+        help='Duration in seconds during which the on-disk schedule cache is used without any request.',
+        type=int,
     )
 
     # Fetch the schedule first so the room name can be validated against the
@@ -102,7 +126,8 @@ if __name__ == '__main__':
     rooms = []
     if pre_args.pretalx_url:
         try:
-            schedule = get_schedule(pre_args.pretalx_url, use_cache=not pre_args.no_cache)
+            schedule = get_schedule(
+                pre_args.pretalx_url, use_cache=not pre_args.no_cache, ttl=pre_args.cache_ttl)
             rooms = get_rooms(schedule)
         except requests.RequestException:
             pass
@@ -146,6 +171,16 @@ if __name__ == '__main__':
         action='store_true',
         help='dry run (simulation)',
     )
+    parser.add_argument(
+        '--state',
+        help='Local sync state file, if given the changes are computed from it instead of the system calendar.',
+        type=str,
+    )
+    parser.add_argument(
+        '--rollback',
+        action='store_true',
+        help='Delete all the events listed in the sync state file.',
+    )
     # Not "required=True": argparse's missing-argument error is generic and
     # would not list the rooms. Validate below so the error lists the choices.
     parser.add_argument(
@@ -157,7 +192,10 @@ if __name__ == '__main__':
     args = parser.parse_args()
     if schedule is None:
         parser.error(f'could not fetch the pretalx schedule from {pre_args.pretalx_url!r}; check --pretalx-url')
-    if args.room_name is None:
+    if args.rollback and not args.state:
+        parser.error('the --rollback option requires --state')
+    if args.room_name is None and not args.rollback:
         parser.error(f'the following argument is required: -r/--room-name; choose one of: {", ".join(rooms)}')
 
-    import_pretalx_events(args, schedule)
+    report = import_pretalx_events(args, schedule)
+    sys.exit(1 if report.errors else 0)
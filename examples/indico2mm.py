@@ -17,135 +17,76 @@ choose a room and relaunch the script with it:
 
 ``indico2mm.py -r "Room 1" -m https://skyreach.ubicast.net -k API_KEY -s "mbm-dev" calendar.json``
 
-Note: the script will also generate an `self-remove` script to delete added event at once.
+The events sent are recorded in a local sync state file (`indico2mm-<system>.json`,
+or `indico2mm-<system>-<room>.json` with a room filter, in the directory of the JSON
+file by default): the next runs only send the events that changed and delete the ones
+removed from the calendar, and all the added events can be deleted at once with
+the `--rollback` option. Imports of different rooms in the same system are kept
+separate, a run never deletes the events imported for another room.
 """
 
 import argparse
-import collections
-import datetime
-import json
+import os
+import re
 import sys
-import zoneinfo
 
-import requests
+
+def get_sync_prefix(room):
+    # Keys are scoped by room, so the events imported for other rooms in the same system are never changed
+    return f'indico:{room}:'
+
+
+def get_default_state_path(jsonfile, system, room):
+    # The default sync state is stored next to the indico export, whatever the working directory is
+    name = f'indico2mm-{system}'
+    if room != 'all':
+        name += '-' + re.sub(r'[^\w.-]+', '_', room)
+    return os.path.join(os.path.dirname(os.path.abspath(jsonfile)), name + '.json')
 
 
 def main(args):
+    from mirismanagerclient.lib.indico import iter_indico_events
+
+    # The file is read incrementally, only the events of the room are kept
     with open(args.jsonfile) as fh:
-        data = json.load(fh)
-
-    assert len(data['results']) == 1
-    # get the first and only dict value
-    root = next(iter(data['results'].values()))
-
-    mm_events = list()
-    for _date, sessions in root.items():
-        for session in sessions.values():
-            if session['entryType'] == 'Session' and len(entries := session['entries']):
-                for entry in entries.values():
-                    if entry['entryType'] == 'Contribution':
-                        room = entry.get('room') or session.get('title', 'unknown')
-                        if args.room != 'all' and room != args.room:
-                            continue
-
-                        start = datetime.datetime.combine(
-                            datetime.date.fromisoformat(entry['startDate']['date']),
-                            datetime.time.fromisoformat(entry['startDate']['time']),
-                            tzinfo=zoneinfo.ZoneInfo(entry['startDate']['tz']),
-                        )
-                        end = datetime.datetime.combine(
-                            datetime.date.fromisoformat(entry['endDate']['date']),
-                            datetime.time.fromisoformat(entry['endDate']['time']),
-                            tzinfo=zoneinfo.ZoneInfo(entry['endDate']['tz']),
-                        )
-                        mm_events.append(
-                            collections.OrderedDict(
-                                (
-                                    ('title', entry['title']),
-                                    (
-                                        'speakers',
-                                        ', '.join(
-                                            [p['name'] for p in entry['presenters']]
-                                        ),
-                                    ),
-                                    ('start', start),
-                                    ('end', end),
-                                    ('room', room),
-                                    ('description', entry['description']),
-                                )
-                            )
-                        )
+        mm_events = list(iter_indico_events(
+            fh, room=None if args.room == 'all' else args.room, enabled=args.enable_event,
+            prefix=get_sync_prefix(args.room)))
 
     if not args.mm_url:
-        for i, e in enumerate(sorted(mm_events, key=lambda x: x['start'])):
+        for i, e in enumerate(sorted(mm_events, key=lambda x: x.start)):
             print(
-                f"{i}\ttitle: {e['title']}\n"
-                f"\tspeakers: {e['speakers']}\n"
-                f"\troom: {e['room']}\n"
-                f"\ttime: {e['start']} -> {e['end']}\n"
+                f'{i}\ttitle: {e.title}\n'
+                f'\tspeakers: {e.speaker}\n'
+                f'\troom: {e.room}\n'
+                f'\ttime: {e.start} -> {e.end}\n'
             )
 
     # send it to MirisManager
     if args.mm_url and args.mm_api_key and args.system:
-        created_uids = list()
-        for event in mm_events:
-            parameters = {
-                'title': event['title'],
-                'speaker': event['speakers'],
-                'description': event['description'],
-            }
-
-            headers = {
-                'api-key': args.mm_api_key,
-                'system': args.system,
-            }
-
-            data = {
-                'start_date': event['start']
-                .replace(tzinfo=None)
-                .isoformat(sep=' ', timespec='seconds'),
-                'end_date': event['end']
-                .replace(tzinfo=None)
-                .isoformat(sep=' ', timespec='seconds'),
-                'time_zone': event['start'].tzinfo.key,
-                'command': 'record',
-                'parameters': json.dumps(parameters),
-                'enabled': 'yes' if args.enable_event else 'no',
-            }
-
-            if not args.dry_run:
-                print(f'>> calling add-event with {headers} and {data}')
-                p = requests.post(
-                    f'{args.mm_url}/api/v3/fleet/calendars/add-event/',
-                    headers=headers,
-                    data=data,
-                )
-                p.raise_for_status()
-                uid = p.json()['uid']
-                print(f'added uid {uid} for {p.content}')
-                created_uids.append(uid)
-                uid_filename = f"delete_events_{datetime.datetime.now().isoformat(timespec='seconds')}.sh"
-            else:
-                print(f'dry run: calling add-event with {headers} and {data}')
-
-        if created_uids:
-            cmd = f'curl -w "\\n" -H "api-key:{args.mm_api_key}" \
-                    -H "system:{args.system}" -d "uid={{uid}}" \
-                    https://skyreach.ubicast.net/api/v3/fleet/calendars/delete-event/'
-            with open(uid_filename, 'w') as fh:
-                fh.write('set -e\n\n')
-                fh.write(
-                    "read -p 'Are you sure you want to clear these events ? [yN]: ' yn\n"
-                )
-                fh.write('[ x${yn}x != xyx ] && exit;\n\n')
-                for uid in created_uids:
-                    fh.write(cmd.format(uid=uid) + '\n')
-
-                # delete the script
-                fh.write('rm "$0"\n')
-
-                print('*' * 50)
-                print(f'delete script available with: `bash {uid_filename}`')
+        from mirismanagerclient import MirisManagerClient
+
+        client = MirisManagerClient(local_conf={
+            'SERVER_URL': args.mm_url,
+            'API_KEY': args.mm_api_key,
+            'AUTO_REGISTRATION': False,
+        })
+        state_path = args.state or get_default_state_path(args.jsonfile, args.system, args.room)
+        prefix = get_sync_prefix(args.room)
+
+        def progress(done, total, operation, key, error):
+            print(f'[{done}/{total}] {operation} {key}: {error or "ok"}')
+
+        if args.rollback:
+            report = client.rollback_calendar(
+                args.system, state_path, prefix=prefix, dry_run=args.dry_run, progress=progress)
+        else:
+            # Only the events changed since the last import are sent
+            report = client.sync_calendar(
+                args.system, mm_events, prefix=prefix, dry_run=args.dry_run, progress=progress,
+                state_path=state_path)
+        print(report)
+        return report
 
 
 class RawDefaultFormatter(
@@ -183,6 +124,18 @@ if __name__ == '__main__':
     parser.add_argument(
         '-e', '--enable-event', action='store_true', help='enable the event'
     )
+    parser.add_argument(
+        '--state',
+        type=str,
+        action='store',
+        help=('sync state file (default: indico2mm-<system>.json, or indico2mm-<system>-<room>.json with a room '
+              'filter, in the directory of the json file)'),
+    )
+    parser.add_argument(
+        '--rollback',
+        action='store_true',
+        help='delete all the events listed in the sync state file',
+    )
     parser.add_argument('jsonfile', help='json file')
     args = parser.parse_args()
 
@@ -199,4 +152,5 @@ if __name__ == '__main__':
             parser.print_usage()
             sys.exit(1)
 
-    main(args)
+    report = main(args)
+    sys.exit(1 if report and report.errors else 0)
@@ -1,39 +1,35 @@
 #!/usr/bin/env python3
 """
 Script to get the URL of the web user interface of a recorder with a valid access token.
+A portal redirecting many users should keep a client instance and use "get_access_token" instead of
+"create_access_token": tokens are then created in advance in the background and the redirection does not
+wait for the token creation.
 """
 import argparse
-import json
-
-import requests
+from urllib.parse import urlencode
 
 
 def main(args):
+    from mirismanagerclient import MirisManagerClient
+
+    client = MirisManagerClient(local_conf={
+        'SERVER_URL': args.url,
+        'API_KEY': args.api_key,
+        'AUTO_REGISTRATION': False,
+    })
     # GENERATE ONE TIME TOKEN
     # Data will be passed to the recorder and also prevents another user
     # from accessing the system if a recording is already in progress
-    req = requests.post(
-        f'{args.url}/api/v3/users/create-token/',
-        headers={
-            'api-key': args.api_key,
-            'system': args.serial,
-        },
-        data={
-            'purpose': 'control',
-            'system': args.serial,
-            'data': json.dumps({
-                'speaker_name': 'Joh Does',
-                'speaker_id': 'jdoe',
-                'speaker_email': 'john@doe.com',
-            }),
-        }
-    )
-    response = req.json()
+    response = client.create_access_token(args.serial, purpose='control', data={
+        'speaker_name': 'Joh Does',
+        'speaker_id': 'jdoe',
+        'speaker_email': 'john@doe.com',
+    })
     token = response['token']
     #{'token': 'c8pse0v0gv312eg07m3vb29u6c78fcrlg5c1roo1', 'expires': '2022-01-14 02:56:13'}
 
     # GENERATE FULL URL THE USER SHOULD BE REDIRECTED TO
-    querystring = requests.compat.urlencode({
+    querystring = urlencode({
         'profile': 'myprofile',
         'title': 'my title',
         'location': 'Room A',
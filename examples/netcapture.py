@@ -1,110 +1,44 @@
 #!/usr/bin/env python3
 """
-Script to start and stop a recording by targeting a profile (room).
+Script to start and stop a recording by targeting one or several profiles (rooms).
+The commands are sent to all the profiles at once and each profile result is printed as soon as it is known.
 """
 import argparse
 import sys
-import time
 
-import requests
 
-
-def get_status(args, session):
-    status_dict = session.get(
-        f'{args.url}/api/v3/fleet/systems/get-status/',
-        headers={'api-key': args.api_key},
-        params={'profile': args.profile}
-    ).json()
-    '''
-    status dict sample:
-    {
-        'last_status_update': '20200227112959',
-        'last_status_update_display': '2020-02-27 11:29:59',
-        'last_connection': '2020-02-27 11:29:57',
-        'profile': 'ndi',
-        'status': 'RUNNING',
-        'status_info': {
-            'status_message': 'Recording in progress',
-            'audio': {'master': {'volume': 1.0, 'muted': False}},
-            'video': [{
-                'type': 'ndivsource',
-                'name': 'source-f41f',
-                'device': 'v4l-HDMI-1-pci-0000:01:00.0',
-                'capture': '1280x720@25',
-                'signal': 'fake'
-            }],
-            'playlist': '/hls/944d/adaptive.m3u8',
-            'time_in_sec': 2,
-            'timecode': '0:00:02',
-            'record_folder': '/home/ubicast/mediacoder/media/20200227-112957-09bd'
-        },
-        'status_display': 'Recording in progress (profile: ndi)',
-        'remaining_space': 911891,
-        'remaining_time': 0,
-        'online': True,
-        'auto_refresh': False,
-        'screenshot_name': 'screenshots/ubi-box-e0d55ec52008_2020-02-27_10-30-00.jpg',
-        'screenshot_date': '2020-02-27 11:30:00',
-        'screenshot_outdated': False,
-        'messages_info': 20,
-        'messages_warning': 2,
-        'messages_error': 17,
-        'last_error_message': None,
-        'last_error_date': None
-    }
-
-    status_dict["status"] can contain:
-    "READY": idle
-    "RUNNING": system is recording
-    "UNAVAILABLE": system not found or profile does not exist
-    "INITIALIZING": loading
-    '''
-    return status_dict.get('status')
+def print_result(result):
+    # can be UNAVAILABLE, READY, INITIALIZING, RUNNING
+    # https://mirismanager.ubicast.eu/static/docs/api/values.html
+    state = 'ok' if result.ok else f'failed: {result.error}'
+    print(f'{result.action} {result.profile}: {state} (status: {result.status}, {result.latency:.2f}s)')
 
 
 def main(args):
-    with requests.Session() as session:
-        data = {
-            'profile': args.profile,
-            'async': 'no',
-            'action': 'START_RECORDING',
-            'speaker_email': 'user@domain.com',
-            'course_id': 'mscspeaker'
-        }
-        # list of mediaserver supported parameters here:
-        # https://ubicast.tv/static/mediaserver/docs/api/api.html#api-v2-medias-add
-
-        print('Start recording')
-        response = session.post(
-            f'{args.url}/api/v3/fleet/control/run-command/',
-            headers={'api-key': args.api_key},
-            data=data
-        ).json()
-        #{'uid': '89b15583-7528-4c0c-a18e-28155be08d21', 'status': 'DONE', 'message': 'Recording started'}
+    from mirismanagerclient import MirisManagerClient
 
-        if response.get('error'):
-            # {'error': 'No system is available to record.'}
-            print(response['error'])
-            return 1
-        else:
-            print(response.get('message'))
-            # can be UNAVAILABLE, READY, INITIALIZING, RUNNING
-            # https://mirismanager.ubicast.eu/static/docs/api/values.html
-            while not get_status(args, session) == 'RUNNING':
-                time.sleep(1)
-                if get_status(args, session) == 'UNAVAILABLE':
-                    print('Profile does not exist or no system is online')
-                    return 1
-            print('System is recording, stopping now')
+    client = MirisManagerClient(local_conf={
+        'SERVER_URL': args.url,
+        'API_KEY': args.api_key,
+        'AUTO_REGISTRATION': False,
+    })
+    params = {
+        'speaker_email': 'user@domain.com',
+        'course_id': 'mscspeaker'
+    }
+    # list of mediaserver supported parameters here:
+    # https://ubicast.tv/static/mediaserver/docs/api/api.html#api-v2-medias-add
+    profiles = args.profile or ['showroom']
 
-            print('Stop recording')
-            data['action'] = 'STOP_RECORDING'
-            session.post(
-                f'{args.url}/api/v3/fleet/control/run-command/',
-                headers={'api-key': args.api_key},
-                data=data
-            )
-    return 0
+    print('Start recording')
+    results = client.control_profiles(
+        'START_RECORDING', profiles, params=params, timeout=args.timeout, on_result=print_result)
+    running = [profile for profile, result in results.items() if result.ok]
+    if running:
+        print('Systems are recording, stopping now')
+        print('Stop recording')
+        client.control_profiles('STOP_RECORDING', running, timeout=args.timeout, on_result=print_result)
+    return 0 if len(running) == len(profiles) else 1
 
 
 if __name__ == '__main__':
@@ -127,11 +61,19 @@ if __name__ == '__main__':
     parser.add_argument(
         '--profile',
         dest='profile',
-        default='showroom',
-        help='The profile.',
+        action='append',
+        help='The profile, can be given several times (default: "showroom").',
         required=False,
         type=str,
     )
+    parser.add_argument(
+        '--timeout',
+        dest='timeout',
+        default=120,
+        help='The maximum duration in seconds to wait for the profiles status.',
+        required=False,
+        type=int,
+    )
     args = parser.parse_args()
 
     sys.exit(main(args))
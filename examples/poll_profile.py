@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
 """
-Script to poll a profile status in a Miris Manager server.
+Script to watch the status of profiles in a Miris Manager server.
+Only the changes are printed (status transitions, new errors and remaining space thresholds crossings).
 The script is intended to be used with a user API key and not a system API key.
 """
 import argparse
-import time
 
 from mirismanagerclient import MirisManagerClient
 
@@ -17,12 +17,19 @@ if __name__ == '__main__':
         nargs='?',
         type=str,
     )
+    parser.add_argument(
+        '--profile',
+        dest='profile',
+        action='append',
+        help='The profile to watch, can be given several times (default: "common").',
+        required=False,
+        type=str,
+    )
     args = parser.parse_args()
 
     mmc = MirisManagerClient(args.conf)
     # ping
     print(mmc.api_request('PING'))
-    # poll profile status
-    while True:
-        print(mmc.api_request('GET_STATUS', params=dict(profile='common')))
-        time.sleep(5)
+    # watch profiles status
+    for change in mmc.watch_profiles(args.profile or ['common']):
+        print(f'{change.profile}: {change.kind} {change.old} -> {change.new}')
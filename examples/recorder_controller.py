@@ -6,6 +6,7 @@ import argparse
 import json
 import logging
 import os
+import threading
 import time
 
 from mirismanagerclient import MirisManagerClient
@@ -30,8 +31,9 @@ class RecorderController(MirisManagerClient):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        self.update_capabilities()
-        self.set_status(
+        # Capabilities and status are sent at the same time
+        self.start(
+            send_info=False,
             status='ready',
             status_message='Ready to record',
             remaining_space='auto'
@@ -54,19 +56,28 @@ class RecorderController(MirisManagerClient):
                 remaining_space='auto'
             )
             time.sleep(3)
+            # Only changed status info fields are serialized again on next status updates,
+            # for example when only "time_in_sec" and "timecode" are updated during the recording.
+            self.status_info.update(
+                playlist='/videos/BigBuckBunny_320x180.m3u8',
+                time_in_sec=0,
+                timecode='0:00:00',
+            )
             self.set_status(
                 status='running',
                 status_message='',
-                status_info='{"playlist": "/videos/BigBuckBunny_320x180.m3u8"}',
+                status_info=self.status_info,
                 remaining_space='auto'
             )
             return 'DONE', ''
 
         elif action == 'STOP_RECORDING':
             logger.info('Stopping recording.')
+            self.status_info.clear()
             self.set_status(
                 status='ready',
                 status_message='',
+                status_info=self.status_info,
                 remaining_space='auto'
             )
             return 'DONE', ''
@@ -86,15 +97,25 @@ class RecorderController(MirisManagerClient):
 
         elif action == 'UPGRADE':
             logger.info('Starting upgrade.')
-
-            # Start your asynchronous upgrade process here then call:
-            # self.set_command_status(uid, 'DONE', '')
-
+            # Progress updates are coalesced and the final status is sent again until it is delivered
+            progress = self.track_command(uid)
+            threading.Thread(target=self.upgrade, args=(progress, ), daemon=True).start()
             return 'IN_PROGRESS', ''
 
         else:
             raise NotImplementedError('Unsupported action: %s.' % action)
 
+    def upgrade(self, progress):
+        # Replace this with your asynchronous upgrade process
+        try:
+            for percent in range(0, 101, 10):
+                progress.update({'progress': percent})
+                time.sleep(1)
+        except Exception as e:
+            progress.failed(str(e))
+        else:
+            progress.done('Upgrade completed.')
+
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description=__doc__.strip())
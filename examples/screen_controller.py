@@ -11,31 +11,31 @@ from mirismanagerclient import MirisManagerClient
 logger = logging.getLogger('screen_controller')
 
 
-class ScreenController(MirisManagerClient):
-    DEFAULT_CONF = {
-        'CAPABILITIES': ['screen_control', 'screenshot'],
-    }
+def get_client(conf=None):
+    client = MirisManagerClient(conf)
 
-    def handle_action(self, uid, action, params):
-        if action == 'GET_SCREENSHOT':
-            self.set_status(remaining_space='auto')  # Send remaining space to Miris Manager
-            self.set_screenshot(
-                path='/var/lib/AccountsService/icons/%s' % (os.environ.get('USER') or 'root'),
-                file_name='screen.png'
-            )
-            logger.info('Screenshot sent.')
-            return 'DONE', ''
+    # Capabilities are derived from the registered actions
+    @client.action('GET_SCREENSHOT', capability='screenshot', concurrency=1)
+    def get_screenshot(uid, params):
+        client.set_status(remaining_space='auto')  # Send remaining space to Miris Manager
+        client.set_screenshot(
+            path='/var/lib/AccountsService/icons/%s' % (os.environ.get('USER') or 'root'),
+            file_name='screen.png'
+        )
+        logger.info('Screenshot sent.')
+        return 'DONE', ''
 
-        elif action == 'SIMULATE_CLICK':
-            logger.info('Click requested: %s.', params)
-            return 'DONE', ''
+    @client.action('SIMULATE_CLICK', params={'x': int, 'y': int}, capability='screen_control')
+    def simulate_click(uid, params):
+        logger.info('Click requested: %s.', params)
+        return 'DONE', ''
 
-        elif action == 'SEND_TEXT':
-            logger.info('Text received: %s.', params)
-            return 'DONE', ''
+    @client.action('SEND_TEXT', params={'text': str}, capability='screen_control')
+    def send_text(uid, params):
+        logger.info('Text received: %s.', params)
+        return 'DONE', ''
 
-        else:
-            raise NotImplementedError('Unsupported action: %s.' % action)
+    return client
 
 
 if __name__ == '__main__':
@@ -49,7 +49,7 @@ if __name__ == '__main__':
     )
     args = parser.parse_args()
 
-    client = ScreenController(args.conf)
+    client = get_client(args.conf)
     client.update_capabilities()
     try:
         client.long_polling_loop()
@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 """
 Script to send a message
+With "--from-logs", the message is logged and sent by the logging handler of the client instead: log records
+are sent from a background thread, identical messages are merged and the rate of messages is limited.
 """
 import argparse
 import datetime
+import logging
 
 from mirismanagerclient import MirisManagerClient
 
@@ -16,9 +19,23 @@ if __name__ == '__main__':
         nargs='?',
         type=str,
     )
+    parser.add_argument(
+        '--from-logs',
+        action='store_true',
+        help='Send the message using the logging handler of the client.',
+    )
     args = parser.parse_args()
 
     client = MirisManagerClient(args.conf)
+    if args.from_logs:
+        handler = client.forward_logs('WARNING')
+        for _index in range(10):
+            # The first message is sent at once, the next ones are merged in a single message
+            logging.getLogger('send_message').warning('Test message')
+        # Remove the handler and send the pending merged messages
+        client.stop_forwarding_logs()
+        print('Messages sent: %s' % handler.sent)
+        raise SystemExit(0)
     client.api_request('ADD_MESSAGE', data=dict(
         content='%s\nTest message' % datetime.datetime.now(),
         content_debug='Debug content with some special characters:\n\tđ€¶←←ħ¶ŧħ<< "\' fF5ef',
@@ -1,13 +1,16 @@
 #!/usr/bin/env python3
 """
 A script to create devices acting as wake on lan relay.
+The magic packets are sent directly, without external tool. A "WAKE_ON_LAN" command can target a single
+device ("mac" and optionally "ip" parameters) or a batch of devices ("targets" parameter: list of dicts with
+"mac" and optionally "ip"), the "ip" being the destination address (usually the broadcast address of the subnet).
 """
 import argparse
+import json
 import logging
-import os
-import re
 
 from mirismanagerclient import MirisManagerClient
+from mirismanagerclient.lib import wake_on_lan as wake_on_lan_lib
 
 logger = logging.getLogger('wol_relay')
 
@@ -15,12 +18,15 @@ logger = logging.getLogger('wol_relay')
 class WOLRelay(MirisManagerClient):
     DEFAULT_CONF = {
         'CAPABILITIES': ['send_wake_on_lan'],
-        'WOL_PATH': 'wakeonlan',  # Path to the wake on lan binary, installed with `apt install wakeonlan`
+        'WOL_PORT': 9,  # UDP port of the magic packets
+        'WOL_REPEAT': 3,  # Number of packets sent to each device
     }
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+        self.wol_sender = wake_on_lan_lib.WakeOnLanSender(
+            port=self.conf['WOL_PORT'], repeat=self.conf['WOL_REPEAT'])
         self.update_capabilities()
         try:
             self.long_polling_loop()
@@ -34,38 +40,16 @@ class WOLRelay(MirisManagerClient):
         # https://mirismanager.ubicast.eu/static/skyreach/docs/api-v3/values.html#system-command-actions
         if action == 'WAKE_ON_LAN':  # wol_relay capability
             # Send wake on lan
-            success, message = self.send_wake_on_lan(params)
-            logger.info('Running wake on lan: success: %s, message: %s', success, message)
-            if not success:
-                raise RuntimeError('Failed to send wake on lan: %s' % message)
-            return 'DONE', ''
+            targets = wake_on_lan_lib.get_targets(params)
+            results = self.wol_sender.send(targets)
+            failed = [result for result in results if result['error']]
+            logger.info('Running wake on lan: %s targets, %s failed.', len(results), len(failed))
+            if len(failed) == len(results):
+                raise RuntimeError('Failed to send wake on lan: %s' % '; '.join(result['error'] for result in failed))
+            return 'DONE', json.dumps({'results': results})
         else:
             raise NotImplementedError('Unsupported action: %s.' % action)
 
-    def send_wake_on_lan(self, params):
-        # Check that arguments are valid
-        if 'mac' not in params:
-            return False, 'No mac address in request.'
-        mac_address = params['mac'].lower()
-        matching = re.match(r'^([\da-f]{2}:){5}([\da-f]{2})$', mac_address)
-        if not matching:
-            return False, 'The given mac address is not valid.'
-        ip_address = None
-        if params.get('ip'):
-            matching = re.match(r'^(\d{1,3}\.){3}\d{1,3}$', params['ip'])
-            if not matching:
-                return False, 'The given IP address is not valid.'
-            ip_address = params['ip']
-        # Launch wake on lan
-        if ip_address:
-            cmd = '%s -i "%s" "%s"' % (self.conf['WOL_PATH'], ip_address, mac_address)
-        else:
-            cmd = '%s "%s"' % (self.conf['WOL_PATH'], mac_address)
-        ret_code = os.system(cmd)
-        if ret_code != 0:
-            return False, 'Tool returned code %s.' % (ret_code >> 8)
-        return True, 'Wake on lan package sent.'
-
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description=__doc__.strip())
@@ -1,3 +1,25 @@
-from .client import MirisManagerClient, MirisManagerRequestError
+"""
+Miris Manager client package
+The client module is imported on first access to its attributes to keep the package import fast.
+"""
+import importlib
 
 __all__ = ['MirisManagerClient', 'MirisManagerRequestError']
+
+_LAZY_ATTRIBUTES = {
+    'MirisManagerClient': '.client',
+    'MirisManagerRequestError': '.client',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
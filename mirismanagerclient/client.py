@@ -1,17 +1,30 @@
 """
 Miris Manager client main module
 """
+import atexit
 import logging
 from pathlib import Path
+import threading
+import time
 
 import requests
 
 from .lib import (
+    actions as actions_lib,
+    clock as clock_lib,
+    codec as codec_lib,
+    command_history as command_history_lib,
     configuration as configuration_lib,
+    endpoints as endpoints_lib,
     info as info_lib,
-    long_polling as long_polling_lib,
+    progress as progress_lib,
+    rate_limit as rate_limit_lib,
+    response_cache as response_cache_lib,
+    routes as routes_lib,
     signing as signing_lib,
-    ssh_tunnel as ssh_tunnel_lib,
+    startup as startup_lib,
+    status as status_lib,
+    transport as transport_lib,
 )
 
 logger = logging.getLogger(__name__)
@@ -27,11 +40,15 @@ class MirisManagerRequestError(Exception):
 class MirisManagerClient():
     """
     Miris Manager client class
+    The client can be shared between threads. The configuration is never modified in place:
+    each change replaces "conf" with an updated copy, so reading it requires no lock.
     """
     DEFAULT_CONF = None  # can be either a dict or a path (`str` object)
 
     def __init__(self, local_conf=None, setup_logging=True):
         # "local_conf" can be either a dict or a path (`str` object)
+        self._conf_lock = threading.RLock()
+        self._register_lock = threading.Lock()
         # Setup logging
         if setup_logging:
             logging.basicConfig(
@@ -55,72 +72,236 @@ class MirisManagerClient():
             urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
         self._long_polling_manager = None
         self._ssh_tunnel_manager = None
+        self._servers_check_thread = None
+        # Connections are kept open and reused between requests
+        self.session = transport_lib.create_session(self.conf.get('TCP_KEEPALIVE'))
+        # Functions registered with the "action" decorator, see "handle_action"
+        self.actions = actions_lib.ActionRegistry()
+        self.codec = codec_lib.get_codec(self.conf['JSON_CODEC'])
+        self.clock = clock_lib.ClockOffsetTracker(self.conf['CLOCK_DRIFT_THRESHOLD'])
+        # Structured status info, see "set_status"
+        self.status_info = status_lib.StatusInfo(self.codec)
+        self.rate_limiter = rate_limit_lib.RateLimiter(self.conf.get('RATE_LIMITS'))
+        # Last status of received commands, used to avoid running twice a command sent again by the server
+        self.command_history = command_history_lib.CommandHistory(
+            self.conf['COMMAND_HISTORY_SIZE'],
+            self.conf['COMMAND_HISTORY_TTL'],
+            self.conf.get('COMMAND_HISTORY_PATH'),
+        )
+        self._command_tracker = None
+        self._token_pool = None
+        # Duration in seconds of the last "start" call, None if it has not succeeded
+        self.time_to_ready = None
+        self.response_cache = None
+        if self.conf.get('RESPONSE_CACHE'):
+            self.response_cache = response_cache_lib.ResponseCache(self.conf['RESPONSE_CACHE_SIZE'])
+        # Log records forwarded as messages, installed last because sending messages needs the client to be ready
+        self.log_handler = None
+        self._log_handler_loggers = []
+        if self.conf.get('MESSAGES_LOG_LEVEL'):
+            self.forward_logs(self.conf['MESSAGES_LOG_LEVEL'])
 
     def load_conf(self, local_conf):
         self.local_conf = local_conf
         conf = configuration_lib.load_conf(self.DEFAULT_CONF, self.local_conf)
+        self.routes = routes_lib.build_routes(conf['API_CALLS'])
+        self.endpoints = self._build_endpoints(conf)
         self.conf_checked = False
         return conf
 
+    def _build_endpoints(self, conf):
+        return endpoints_lib.EndpointSelector(
+            configuration_lib.get_server_urls(conf) or [''],
+            failback_ratio=conf['SERVER_FAILBACK_RATIO'],
+            failback_delay=conf['SERVER_FAILBACK_DELAY'],
+        )
+
     def update_conf(self, key, value):
-        self.conf[key] = value
-        # write change in local_conf if it is a path
-        configuration_lib.update_conf(self.local_conf, key, value)
+        with self._conf_lock:
+            conf = dict(self.conf)
+            conf[key] = value
+            if key == 'API_CALLS':
+                # API calls are overridden field by field, like in configuration files
+                conf[key] = configuration_lib.merge_api_calls(self.conf['API_CALLS'], value)
+                self.routes = routes_lib.build_routes(conf[key])
+            elif key == 'SERVER_URL':
+                self.endpoints = self._build_endpoints(conf)
+            self.conf = conf
+            # write change in local_conf if it is a path
+            configuration_lib.update_conf(self.local_conf, key, value)
 
     def check_conf(self):
-        if not self.conf_checked:
-            configuration_lib.check_conf(self.conf)
-            self.conf_checked = True
+        if self.conf_checked:
+            return
+        with self._conf_lock:
+            if not self.conf_checked:
+                conf = dict(self.conf)
+                configuration_lib.check_conf(conf)
+                if configuration_lib.get_server_urls(conf) != [endpoint.url for endpoint in self.endpoints.endpoints]:
+                    self.endpoints = self._build_endpoints(conf)
+                self.conf = conf
+                self.conf_checked = True
+
+    def override_route(self, name, **changes):
+        # Override or add an API call for this client instance only
+        with self._conf_lock:
+            self.routes = routes_lib.override_routes(self.routes, name, **changes)
+            return self.routes[name]
 
     def get_url_info(self, url_or_action):
+        route = self.routes.get(url_or_action)
+        if route is not None:
+            return route
         if url_or_action.startswith('/'):
-            return {'url': url_or_action}
-        if url_or_action not in self.conf['API_CALLS']:
-            raise MirisManagerRequestError(
-                f'Invalid url requested: {url_or_action} does not exist in API_CALLS configuration.',
-                status_code=0,
-                error_code='invalid_url'
+            return routes_lib.Route(url_or_action, url_or_action, method=None)
+        raise MirisManagerRequestError(
+            f'Invalid url requested: {url_or_action} does not exist in API_CALLS configuration.',
+            status_code=0,
+            error_code='invalid_url'
+        )
+
+    def get_server_url(self):
+        # URL of the server currently used
+        return self.endpoints.url
+
+    def _send(self, url, method='get', headers=None, params=None,
+              data=None, files=None, timeout=None, stream=False, server_url=None):
+        conf = self.conf
+        if not files:
+            body, body_headers = codec_lib.compress_form_data(data, conf.get('COMPRESS_REQUESTS_ABOVE'))
+            if body is not None:
+                data = body
+                headers = dict(headers or {}, **body_headers)
+        endpoints = self.endpoints
+        server_url = server_url or endpoints.url
+        sent = time.time()
+        try:
+            req = getattr(self.session, method)(
+                url=server_url + url,
+                headers=headers,
+                params=params,
+                data=data,
+                files=files,
+                proxies=conf.get('PROXIES'),
+                verify=conf['VERIFY_SSL'],
+                timeout=timeout or conf['TIMEOUT'],
+                stream=stream
             )
-        return self.conf['API_CALLS'][url_or_action]
+        except requests.exceptions.ConnectionError:
+            # Read timeouts are not failures of the server (they are expected for long polling requests)
+            endpoints.record_failure(server_url)
+            raise
+        if req.status_code in (502, 503, 504):
+            endpoints.record_failure(server_url)
+        elif not endpoints.current.healthy or endpoints.current.url != server_url:
+            endpoints.record_success(server_url)
+        if conf.get('CLOCK_SYNC') and req.headers.get('Date'):
+            self.clock.add_date_sample(req.headers['Date'], sent, time.time())
+        return req
 
-    def _request(self, url, method='get', headers=None, params=None,
-                 data=None, files=None, anonymous=None, timeout=None):
-        req = getattr(requests, method)(
-            url=self.conf['SERVER_URL'] + url,
-            headers=headers,
-            params=params,
-            data=data,
-            files=files,
-            proxies=self.conf.get('PROXIES'),
-            verify=self.conf['VERIFY_SSL'],
-            timeout=timeout or self.conf['TIMEOUT']
-        )
+    def check_servers(self):
+        """
+        Measure the round trip time of each configured server with a "PING" request.
+        The fastest available server is used for the next requests.
+        """
+        route = self.get_url_info('PING')
+        for endpoint in list(self.endpoints.endpoints):
+            start = time.monotonic()
+            try:
+                req = self._send(
+                    route.url, method=route.method or 'get', timeout=route.timeout, server_url=endpoint.url)
+            except Exception as e:
+                logger.debug('Server "%s" is not reachable: %s', endpoint.url, e)
+                if not isinstance(e, requests.exceptions.ConnectionError):
+                    # Connection errors are already recorded by "_send"
+                    self.endpoints.record_failure(endpoint.url)
+                continue
+            if req.status_code == 200:
+                self.endpoints.record_success(endpoint.url, time.monotonic() - start)
+            elif req.status_code not in (502, 503, 504):
+                self.endpoints.record_failure(endpoint.url)
+        return self.endpoints.get_stats()
+
+    def start_servers_check(self):
+        # Check regularly the servers in a background thread, only useful if several servers are set
+        with self._conf_lock:
+            if len(self.endpoints) < 2 or self._servers_check_thread is not None:
+                return
+            self._servers_check_thread = threading.Thread(
+                target=self._servers_check_loop, name='mm-servers-check', daemon=True)
+            self._servers_check_thread.start()
+
+    def _servers_check_loop(self):
+        while True:
+            try:
+                self.check_servers()
+            except Exception as e:
+                logger.warning('Unable to check servers: %s', e)
+            time.sleep(self.conf['SERVER_CHECK_INTERVAL'])
+
+    def sync_clock(self):
+        # Estimate the server clock offset using the time API call
+        route = self.get_url_info('TIME')
+        sent = time.time()
+        response = self._request(route.url, method=route.method or 'get', timeout=route.timeout)
+        received = time.time()
+        value = response.get('utc_time') or response.get('time')
+        try:
+            server_time = clock_lib.parse_server_time(value)
+        except ValueError as e:
+            logger.warning('Unable to estimate server clock offset: %s', e)
+            self.clock.needs_refresh = False
+            return None
+        self.clock.add_time_sample(server_time, sent, received)
+        return self.clock.get_offset()
+
+    def _parse_response(self, req):
         status_code = req.status_code
         error_code = None
-        body = req.text.strip()
+        body = req.content.strip()
         if req.status_code != 200:
             try:
-                response = req.json()
+                response = self.codec.loads(body)
                 error = response['error']
                 error_code = response.get('code')
             except Exception:
-                error = 'Request failed with status code %s:\n%s.' % (req.status_code, body[:200])
+                error = 'Request failed with status code %s:\n%s.' % (
+                    req.status_code, body[:200].decode('utf-8', 'replace'))
             raise MirisManagerRequestError(
                 error,
                 status_code=status_code,
                 error_code=error_code
             )
-        response = req.json() if body else {}
+        response = self.codec.loads(body) if body else {}
         return response
 
+    def _request(self, url, method='get', headers=None, params=None,
+                 data=None, files=None, anonymous=None, timeout=None):
+        req = self._send(
+            url,
+            method=method,
+            headers=headers,
+            params=params,
+            data=data,
+            files=files,
+            timeout=timeout
+        )
+        return self._parse_response(req)
+
     def _register(self):
-        if self.conf.get('API_KEY'):
-            return
+        # Only one registration can be done at a time, other threads wait for its result
+        with self._register_lock:
+            if self.conf.get('API_KEY'):
+                return
+            return self._register_system()
+
+    def _register_system(self):
         logger.info('No API key in configuration, requesting system registration...')
-        data = info_lib.get_host_info(self.conf['SERVER_URL'])
-        data['capabilities'] = ' '.join(self.conf['CAPABILITIES'])
+        data = info_lib.get_host_info(self.get_server_url())
+        data['capabilities'] = ' '.join(self.get_capabilities())
         # Make API request
-        response = self._request(self.get_url_info('REGISTER_SYSTEM')['url'], method='post', data=data)
+        route = self.get_url_info('REGISTER_SYSTEM')
+        response = self._request(route.url, method=route.method or 'post', data=data, timeout=route.timeout)
         # Check response
         secret_key = response.get('secret_key')
         if not secret_key:
@@ -136,59 +317,200 @@ class MirisManagerClient():
                 status_code=200,
                 error_code='no_api_key'
             )
-        self.update_conf('SECRET_KEY', secret_key)
-        self.update_conf('API_KEY', api_key)
+        with self._conf_lock:
+            self.update_conf('SECRET_KEY', secret_key)
+            self.update_conf('API_KEY', api_key)
         logger.info('System registration done.')
         return True
 
+    def _get_headers(self, route, headers=None, anonymous=None):
+        if anonymous is None:
+            anonymous = route.anonymous
+        if anonymous:
+            return headers
+        # Register system if no API key and auto registration
+        if not self.conf.get('API_KEY'):
+            if not self.conf['AUTO_REGISTRATION']:
+                raise ValueError('The client auto registration is disabled and no API_KEY is set in conf file, '
+                                 'please set one or turn on auto registration.')
+            try:
+                self._register()
+            except Exception as e:
+                logger.warning('Registration failed: %s', e)
+                raise
+        # Add signature in headers
+        # headers with "_" are ignored by Django
+        conf = self.conf
+        _headers = {'api-key': conf['API_KEY']}
+        if self.clock.should_refresh():
+            try:
+                self.sync_clock()
+            except Exception as e:
+                self.clock.refresh_failed()
+                logger.warning(
+                    'Unable to refresh server clock offset (next attempt in %ss): %s', self.clock.retry_delay, e)
+        signature = signing_lib.get_signature(conf, self.clock.get_offset())
+        if signature:
+            _headers.update(signature)
+        if headers:
+            _headers.update(headers)
+        return _headers
+
     def api_request(self, url_or_action, method='get', headers=None, params=None,
                     data=None, files=None, anonymous=None, timeout=None):
         self.check_conf()
-        url_info = self.get_url_info(url_or_action)
-        if anonymous is None:
-            anonymous = bool(url_info.get('anonymous'))
-        if anonymous:
-            _headers = headers
-        else:
-            # Register system if no API key and auto registration
-            if not self.conf.get('API_KEY'):
-                if not self.conf['AUTO_REGISTRATION']:
-                    raise ValueError('The client auto registration is disabled and no API_KEY is set in conf file, '
-                                     'please set one or turn on auto registration.')
-                try:
-                    self._register()
-                except Exception as e:
-                    logger.warning('Registration failed: %s', e)
-                    raise
-            # Add signature in headers
-            # headers with "_" are ignored by Django
-            _headers = {'api-key': self.conf['API_KEY']}
-            if not anonymous:
-                signature = signing_lib.get_signature(self.conf)
-                if signature:
-                    _headers.update(signature)
-            if headers:
-                _headers.update(headers)
+        route = self.get_url_info(url_or_action)
+        method = route.method or method
+        # Get response from cache if possible
+        cache_key = cache_entry = None
+        if self.response_cache is not None and route.cache_ttl is not None and method == 'get' and not files:
+            cache_key = self.response_cache.make_key(route.name, route.url, params)
+            cache_entry = self.response_cache.get(cache_key)
+            if cache_entry is not None and cache_entry.is_fresh():
+                return self.response_cache.get_response(cache_entry)
+        # Wait before signing the request if too many calls have been made
+        if route.rate_class:
+            self.rate_limiter.acquire(route.rate_class)
+        _headers = self._get_headers(route, headers, anonymous)
+        if cache_entry is not None:
+            # Revalidate expired response with a conditional request
+            validators = cache_entry.get_validators()
+            if validators:
+                _headers = dict(_headers or {}, **validators)
         # Make API request
-        response = self._request(
-            url_info['url'],
-            method=url_info.get('method', method),
+        req = self._send(
+            route.url,
+            method=method,
             headers=_headers,
             params=params,
             data=data,
             files=files,
-            timeout=timeout
+            timeout=timeout or route.timeout
         )
+        if self.response_cache is not None and route.invalidates:
+            self.response_cache.invalidate(route.invalidates)
+        if cache_entry is not None and req.status_code == 304:
+            self.response_cache.refresh(cache_key, cache_entry, route.cache_ttl, req.headers)
+            return self.response_cache.get_response(cache_entry)
+        response = self._parse_response(req)
+        if cache_key is not None:
+            self.response_cache.store(cache_key, response, route.cache_ttl, req.headers)
         return response
 
+    def api_stream(self, url_or_action, method='get', headers=None, params=None, anonymous=None, timeout=None):
+        """
+        Make an API request and return the streamed response (a "requests.Response" object).
+        The response should be closed by the caller.
+        """
+        self.check_conf()
+        route = self.get_url_info(url_or_action)
+        _headers = self._get_headers(route, headers, anonymous)
+        req = self._send(
+            route.url,
+            method=route.method or method,
+            headers=_headers,
+            params=params,
+            timeout=timeout or route.timeout,
+            stream=True
+        )
+        if req.status_code != 200:
+            try:
+                self._parse_response(req)
+            finally:
+                req.close()
+        return req
+
+    def start(self, send_info=True, **status):
+        '''
+        Prepare the client and show the system online in Miris Manager as fast as possible:
+        - resolve the servers host names and open the connections (with "PING" requests, the
+          fastest server is selected if several servers are set),
+        - register the system if it has no API key,
+        - send the system info (only its capabilities if "send_info" is False, nothing if the
+          system has just been registered) at the same time as the initial status.
+        Keyword arguments are given to "set_status", no status is sent if there are none.
+        Return the duration in seconds of each step, "ready" is the total duration.
+        '''
+        start = time.monotonic()
+        timings = {}
+        self.time_to_ready = None
+        self.check_conf()
+        startup_lib.resolve_hosts([endpoint.url for endpoint in self.endpoints.endpoints])
+        timings['dns'] = time.monotonic() - start
+        if len(self.endpoints) > 1:
+            self.check_servers()
+        else:
+            try:
+                self.api_request('PING')
+            except Exception as e:
+                logger.warning('Unable to reach the server: %s', e)
+        timings['connect'] = time.monotonic() - start - timings['dns']
+        registered = False
+        if not self.conf.get('API_KEY') and self.conf['AUTO_REGISTRATION']:
+            step_start = time.monotonic()
+            registered = bool(self._register())
+            timings['register'] = time.monotonic() - step_start
+        tasks = {}
+        if not registered:
+            tasks['info'] = self.set_info if send_info else self.update_capabilities
+        if status:
+            tasks['status'] = lambda: self.set_status(**status)
+        results = startup_lib.run_concurrently(tasks)
+        failed = []
+        for name, (_result, error, duration) in results.items():
+            timings[name] = duration
+            if error is not None:
+                failed.append(name)
+        timings['ready'] = time.monotonic() - start
+        if failed:
+            logger.warning('Client started in %.3fs but some calls failed: %s.', timings['ready'], ', '.join(failed))
+        else:
+            self.time_to_ready = timings['ready']
+            logger.info('Client ready in %.3fs.', self.time_to_ready)
+        return timings
+
     def long_polling_loop(self, single_loop=False):
         if not self._long_polling_manager:
+            # The long polling and SSH tunnel modules are imported only when used to reduce the startup time
+            from .lib import long_polling as long_polling_lib
             self._long_polling_manager = long_polling_lib.LongPollingManager(self)
+        self.start_servers_check()
+        if self.conf.get('COMMAND_STATUS_QUEUE_PATH'):
+            # Send final statuses not delivered before the last restart
+            self.get_command_tracker()
         self._long_polling_manager.loop(single_loop)
 
+    def action(self, name, params=None, capability=None, timeout=None, concurrency=None, priority=None):
+        '''
+        Decorator to register the function handling an action, for example:
+            @client.action('SIMULATE_CLICK', params={'x': int, 'y': int}, capability='screen_control')
+            def simulate_click(uid, params):
+                return 'DONE', ''
+        The function is called with the command uid and params and must return a tuple (status, data)
+        like "handle_action".
+        Arguments:
+        - params: The schema of the action parameters: {name: type or tuple of types}. A parameter is
+          optional if None is one of its types. Commands with invalid parameters are reported as failed.
+        - capability: The capability or list of capabilities of the system enabling this action in Miris Manager.
+        - timeout, concurrency, priority: The scheduling settings of the action, they override the
+          "ACTION_TIMEOUTS", "ACTION_CONCURRENCY" and "ACTION_PRIORITIES" values and are only used
+          if "COMMAND_WORKERS" is set.
+        '''
+        def decorator(function):
+            self.actions.register(
+                name, function, params=params, capability=capability,
+                timeout=timeout, concurrency=concurrency, priority=priority)
+            return function
+        return decorator
+
+    def get_capabilities(self):
+        # Capabilities from the configuration and from the registered actions
+        return self.actions.get_capabilities(self.conf['CAPABILITIES'])
+
     def handle_action(self, uid, action, params):
         '''
-        Function that should be implemented in your client to process the long polling responses.
+        Function processing the long polling responses. By default, the function registered
+        for the action with the "action" decorator is used, it can be overridden in your client.
         IMPORTANT: Any code written here should not be blocking more than 5s because of the
                    delay after which the system is considered as offline in Miris Manager.
         Arguments:
@@ -202,30 +524,144 @@ class MirisManagerClient():
         - "FAILED": The command execution has failed.
         - data: The command result data (string). It can be a json dump or a message. Empty strings are allowed.
         '''
-        raise NotImplementedError('Your class should override the "handle_action" method.')
+        handler = self.actions.get(action)
+        if handler is None:
+            if not self.actions:
+                raise NotImplementedError('Your class should override the "handle_action" method.')
+            raise NotImplementedError('Unsupported action: %s.' % action)
+        return handler(uid, params)
+
+    def _send_command_status(self, command_uid, status, data=None):
+        if data is not None and not isinstance(data, str):
+            data = self.codec.dumps(data).decode('utf-8')
+        # Commands in progress are not saved in the history file to run them again after a restart
+        self.command_history.set(command_uid, status, data, persistent=status != 'IN_PROGRESS')
+        return self.api_request('SET_COMMAND_STATUS', data=dict(
+            uid=command_uid,
+            status=status,
+            data=data or '',
+        ))
 
     def set_command_status(self, command_uid, status='DONE', data=None):
         if not command_uid:
             return
         try:
-            self.api_request('SET_COMMAND_STATUS', data=dict(
-                uid=command_uid,
-                status=status,
-                data=data or '',
-            ))
+            self._send_command_status(command_uid, status, data)
         except Exception as e:
             logger.warning('Unable to communicate command status: %s %s', type(e), e)
 
+    def get_command_tracker(self):
+        with self._conf_lock:
+            if self._command_tracker is None:
+                self._command_tracker = progress_lib.CommandTracker(
+                    self._send_command_status,
+                    interval=self.conf['COMMAND_PROGRESS_INTERVAL'],
+                    retry_delay=self.conf['COMMAND_STATUS_RETRY_DELAY'],
+                    path=self.conf.get('COMMAND_STATUS_QUEUE_PATH'),
+                )
+            return self._command_tracker
+
+    def track_command(self, command_uid):
+        '''
+        Get a progress handle for a command answered with the "IN_PROGRESS" status.
+        The handle methods can be called from any thread:
+        - update(data): Send the command progress, frequent updates are coalesced and sent
+          at most once every "COMMAND_PROGRESS_INTERVAL" seconds.
+        - done(data) and failed(data): Send the final status of the command, it is sent again
+          until it is delivered (even after a restart if "COMMAND_STATUS_QUEUE_PATH" is set).
+        "data" can be a string or a dict (sent as JSON).
+        '''
+        return self.get_command_tracker().track(command_uid)
+
+    def forward_logs(self, level='WARNING', logger_name=None):
+        """
+        Send the log records of the given level and above as messages of the system.
+        The records are sent from a background thread and identical messages are merged, see "MessageHandler".
+        A single handler is used: calling this function again changes its level and adds it to the given logger.
+        The handler is closed at exit, see "stop_forwarding_logs".
+        Return the logging handler.
+        """
+        level = getattr(logging, level) if isinstance(level, str) else level
+        with self._conf_lock:
+            if self.log_handler is None:
+                from .lib import log_handler as log_handler_lib
+                self.log_handler = log_handler_lib.MessageHandler(
+                    self,
+                    level=level,
+                    window=self.conf['MESSAGES_LOG_WINDOW'],
+                    rate=self.conf['MESSAGES_LOG_RATE'],
+                )
+                # The pending merged messages are sent before exiting
+                atexit.register(self.stop_forwarding_logs)
+            else:
+                self.log_handler.setLevel(level)
+            target_logger = logging.getLogger(logger_name)
+            if target_logger not in self._log_handler_loggers:
+                target_logger.addHandler(self.log_handler)
+                self._log_handler_loggers.append(target_logger)
+            return self.log_handler
+
+    def stop_forwarding_logs(self):
+        """
+        Remove the handler of "forward_logs" from the loggers and close it (pending messages are sent).
+        """
+        with self._conf_lock:
+            handler = self.log_handler
+            target_loggers = self._log_handler_loggers
+            self.log_handler = None
+            self._log_handler_loggers = []
+        if handler is None:
+            return
+        atexit.unregister(self.stop_forwarding_logs)
+        for target_logger in target_loggers:
+            target_logger.removeHandler(handler)
+        handler.close()
+
+    def create_access_token(self, system, purpose='control', data=None):
+        """
+        Create a one-time access token for the web interface of a system.
+        "data" is passed to the system (a string or a dict sent as JSON).
+        Return the response: {'token': ..., 'expires': ...}.
+        """
+        if data is not None and not isinstance(data, str):
+            data = self.codec.dumps(data).decode('utf-8')
+        return self.api_request('CREATE_TOKEN', headers={'system': system}, data=dict(
+            purpose=purpose,
+            system=system,
+            data=data or '',
+        ))
+
+    def get_token_pool(self):
+        with self._conf_lock:
+            if self._token_pool is None:
+                from .lib import tokens as tokens_lib
+                self._token_pool = tokens_lib.TokenPool(
+                    self.create_access_token,
+                    server_time=lambda: self.clock.now().timestamp(),
+                    size=self.conf['TOKEN_POOL_SIZE'],
+                    margin=self.conf['TOKEN_EXPIRY_MARGIN'],
+                    max_age=self.conf['TOKEN_MAX_AGE'],
+                )
+            return self._token_pool
+
+    def get_access_token(self, system, purpose='control', data=None):
+        """
+        Get a one-time access token for the web interface of a system from a pool of tokens created
+        in advance, see "TokenPool". The pool of tokens of a system, purpose and data is created on the
+        first call, "get_token_pool().warm(system, purpose, data)" can be used to create it before.
+        """
+        return self.get_token_pool().get(system, purpose, data)
+
     def set_info(self):
-        data = info_lib.get_host_info(self.conf['SERVER_URL'])
-        data['capabilities'] = ' '.join(self.conf['CAPABILITIES'])
+        data = info_lib.get_host_info(self.get_server_url())
+        data['capabilities'] = ' '.join(self.get_capabilities())
         # Make API request
         response = self.api_request('SET_INFO', data=data)
         return response
 
     def update_capabilities(self):
         data = {
-            'capabilities': ' '.join(self.conf['CAPABILITIES']),
+            'capabilities': ' '.join(self.get_capabilities()),
         }
         # Make API request
         response = self.api_request('SET_INFO', data=data)
@@ -233,10 +669,19 @@ class MirisManagerClient():
 
     def set_status(self, status=None, status_info=None, status_message=None,
                    profile=None, remaining_space=None, remaining_time=None):
+        # "status_info" can be a JSON string, a dict or a "StatusInfo" object (like "self.status_info").
+        # A "StatusInfo" object is sent only if it has been changed since the last call.
         data = {}
+        structured_info = None
         if status is not None:
             data['status'] = status
-        if status_info is not None:
+        if isinstance(status_info, status_lib.StatusInfo):
+            if status_info.changed:
+                structured_info = status_info
+                data['status_info'] = status_info.serialize()
+        elif isinstance(status_info, dict):
+            data['status_info'] = self.codec.dumps(status_info).decode('utf-8')
+        elif status_info is not None:
             data['status_info'] = status_info
         if status_message is not None or status is not None:
             data['status_message'] = status_message or ''
@@ -249,8 +694,13 @@ class MirisManagerClient():
         if remaining_time is not None:
             data['remaining_time'] = remaining_time
         if not data:
+            if isinstance(status_info, status_lib.StatusInfo):
+                logger.debug('Status info unchanged, no status update needed.')
+                return {}
             raise ValueError('No data to update.')
         response = self.api_request('SET_STATUS', data=data)
+        if structured_info is not None:
+            structured_info.mark_sent()
         return response
 
     def set_screenshot(self, path, file_name=None):
@@ -260,9 +710,57 @@ class MirisManagerClient():
             ))
         return response
 
+    def sync_calendar(self, system, events, prefix=None, delete_missing=True, dry_run=False, workers=8, progress=None,
+                      state_path=None):
+        '''
+        Synchronize the calendar of a system with a list of events ("CalendarEvent" objects
+        of the "calendar_sync" module). Only the changes are sent, see "CalendarSync".
+        Events previously synchronized with a key starting with "prefix" and not in the
+        list are deleted if "delete_missing" is True.
+        If "state_path" is given, the changes are computed from the local sync state stored
+        in this file instead of the calendar of the system.
+        '''
+        from .lib import calendar_sync as calendar_sync_lib
+        calendar_sync = calendar_sync_lib.CalendarSync(self, system, workers=workers, progress=progress)
+        state = calendar_sync_lib.SyncState(state_path, system) if state_path else None
+        return calendar_sync.sync(
+            events, prefix=prefix, delete_missing=delete_missing, dry_run=dry_run, state=state)
+
+    def rollback_calendar(self, system, state_path, prefix=None, dry_run=False, workers=8, progress=None):
+        """
+        Delete the events of the calendar of a system listed in a local sync state file.
+        """
+        from .lib import calendar_sync as calendar_sync_lib
+        calendar_sync = calendar_sync_lib.CalendarSync(self, system, workers=workers, progress=progress)
+        state = calendar_sync_lib.SyncState(state_path, system)
+        return calendar_sync.rollback(state, prefix=prefix, dry_run=dry_run)
+
+    def control_profiles(self, action, profiles, params=None, target_status=None, workers=16, timeout=120,
+                         on_result=None):
+        """
+        Run an action ("START_RECORDING", "STOP_RECORDING"...) on several profiles concurrently and
+        wait for them to reach the target status, see "FleetController".
+        Return a dict {profile: ProfileResult}.
+        """
+        from .lib import fleet as fleet_lib
+        controller = fleet_lib.FleetController(self, workers=workers, timeout=timeout, on_result=on_result)
+        return controller.run(action, profiles, params=params, target_status=target_status)
+
+    def watch_profiles(self, profiles, min_interval=2, max_interval=30, space_thresholds=(10000, 2000), duration=None):
+        """
+        Watch the status of several profiles, return a generator of changes ("StatusChange" objects),
+        see "StatusWatcher".
+        """
+        from .lib import status_watch as status_watch_lib
+        watcher = status_watch_lib.StatusWatcher(
+            self, profiles, min_interval=min_interval, max_interval=max_interval, space_thresholds=space_thresholds)
+        return watcher.watch(duration=duration)
+
     def open_tunnel(self, status_callback=None):
         if not self._ssh_tunnel_manager:
+            from .lib import ssh_tunnel as ssh_tunnel_lib
             self._ssh_tunnel_manager = ssh_tunnel_lib.SSHTunnelManager(self, status_callback)
+        self.start_servers_check()
         self._ssh_tunnel_manager.tunnel_loop()
 
     def close_tunnel(self):
@@ -5,9 +5,27 @@ BASE_CONF = {
     # Logging level
     'LOG_LEVEL': 'INFO',
 
+    # Level of the log records forwarded as messages of the system (for example "ERROR"), None to disable it
+    'MESSAGES_LOG_LEVEL': None,
+    # Duration in seconds during which identical log messages are merged in one message
+    'MESSAGES_LOG_WINDOW': 60,
+    # Maximum number of log messages sent per second
+    'MESSAGES_LOG_RATE': 0.2,
+
     # Server URL of Miris Manager
+    # A list of URLs can be given: requests are sent to the fastest available server and the client switches
+    # to another server if the current one fails.
     'SERVER_URL': 'https://mirismanager',
 
+    # Interval in seconds between checks of the servers availability and latency when several servers are set
+    # (long polling requests are also limited to this duration to follow a switch to another server)
+    'SERVER_CHECK_INTERVAL': 10,
+
+    # Duration in seconds during which a server must be available before switching back to it, and
+    # ratio of the current server latency under which the latency of another server must be to switch to it
+    'SERVER_FAILBACK_DELAY': 30,
+    'SERVER_FAILBACK_RATIO': 0.7,
+
     # API key of this system in Miris Manager
     # The API key is automatically set when empty and when Capus Manager discovery mode is enabled.
     'API_KEY': '',
@@ -21,41 +39,183 @@ BASE_CONF = {
     # Notify systemd watchdog after each long polling call
     'WATCHDOG': False,
 
+    # Ask the server to send several commands through each long polling connection (streamed as
+    # newline delimited JSON or server-sent events), one-shot responses are still supported
+    'LONG_POLLING_STREAM': False,
+
+    # Maximum duration in seconds of long polling requests without any data received
+    'LONG_POLLING_TIMEOUT': 300,
+
+    # Lower the long polling timeout below the idle duration after which connections are dropped by the
+    # network (some NAT and proxies silently drop idle connections), it is raised again progressively
+    'LONG_POLLING_ADAPTIVE_TIMEOUT': True,
+
+    # Minimum duration in seconds of long polling requests when the timeout is adaptive
+    'LONG_POLLING_MIN_TIMEOUT': 30,
+
+    # TCP keepalive settings of connections (None to disable): duration in seconds without activity before
+    # sending probes, duration in seconds between probes and number of failed probes to drop the connection
+    'TCP_KEEPALIVE': {'idle': 30, 'interval': 10, 'count': 3},
+
+    # Number of received commands for which the last status is kept, a command received again is not run
+    # again, its last status is sent instead
+    'COMMAND_HISTORY_SIZE': 256,
+
+    # Duration in seconds during which the status of a received command is kept
+    'COMMAND_HISTORY_TTL': 3600,
+
+    # Path of the file used to keep the commands history after a restart (None to keep it only in memory)
+    'COMMAND_HISTORY_PATH': None,
+
+    # Number of threads running received commands (0 to run commands one after the other in the long polling thread)
+    'COMMAND_WORKERS': 0,
+
+    # Priority of commands per action when "COMMAND_WORKERS" is set (lower values are run first, default is 5)
+    # Commands with a priority of 0 are run immediately even if all workers are busy.
+    'ACTION_PRIORITIES': {
+        'STOP_RECORDING': 0,
+        'STOP_PUBLISHING': 0,
+        'START_RECORDING': 1,
+        'GET_SCREENSHOT': 8,
+        'UPGRADE': 9,
+    },
+
+    # Maximum number of commands of an action running at the same time when "COMMAND_WORKERS" is set
+    'ACTION_CONCURRENCY': {
+        'GET_SCREENSHOT': 1,
+        'UPGRADE': 1,
+    },
+
+    # Duration in seconds after which a command of an action is reported as failed when "COMMAND_WORKERS" is set
+    'ACTION_TIMEOUTS': {},
+
+    # Default duration in seconds after which a command is reported as failed (None to disable)
+    'COMMAND_TIMEOUT': None,
+
+    # Minimum duration in seconds between two progress updates of a command (see "track_command")
+    'COMMAND_PROGRESS_INTERVAL': 2,
+
+    # Duration in seconds before sending again a final command status that has not been delivered
+    # (doubled after each failure, up to 5 minutes)
+    'COMMAND_STATUS_RETRY_DELAY': 5,
+
+    # Path of the file used to keep undelivered final command statuses after a restart (None to keep them
+    # only in memory)
+    'COMMAND_STATUS_QUEUE_PATH': None,
+
+    # Number of one-time access tokens created in advance for each system, purpose and data
+    'TOKEN_POOL_SIZE': 5,
+    # Tokens are not given anymore this number of seconds before their expiration
+    'TOKEN_EXPIRY_MARGIN': 30,
+    # Maximum duration in seconds during which a token created in advance is kept
+    'TOKEN_MAX_AGE': 600,
+
     # Verify server SSL certificate
     'VERIFY_SSL': False,
 
     # API requests max duration in seconds
     'TIMEOUT': 10,
 
+    # Estimate the server clock offset from responses dates and use it to sign and check requests
+    'CLOCK_SYNC': True,
+
+    # Clock drift in seconds above which the server clock offset is refreshed using the "TIME" API call
+    'CLOCK_DRIFT_THRESHOLD': 5,
+
+    # JSON library used to decode responses: "auto" (fastest installed), "orjson", "msgspec" or "json"
+    'JSON_CODEC': 'auto',
+
+    # Size in bytes above which requests data are compressed with gzip (None to disable)
+    # The Miris Manager server must support compressed requests to enable this.
+    'COMPRESS_REQUESTS_ABOVE': None,
+
     # Proxies for API requests
     # To use system proxies: None (proxies should be set in environment)
     # To disable proxies: {'http': '', 'https': ''}
     # To use a proxy: {'http': 'http://10.10.1.10:3128', 'https': 'http://10.10.1.10:1080'}
     'PROXIES': None,
 
+    # Cache responses of read only API calls (API calls with a "cache_ttl" value)
+    'RESPONSE_CACHE': False,
+
+    # Maximum number of responses kept in cache
+    'RESPONSE_CACHE_SIZE': 128,
+
+    # Maximum rate of API calls per class of API calls (None to disable the limit of a class or of all classes)
+    # "rate" is the number of calls per second and "burst" the number of calls allowed before being limited.
+    # Calls exceeding the limit are delayed.
+    'RATE_LIMITS': {
+        'status': {'rate': 2, 'burst': 10},
+        'messages': {'rate': 1, 'burst': 20},
+        'uploads': {'rate': 0.2, 'burst': 3},
+        'reads': {'rate': 5, 'burst': 20},
+        'calendar': {'rate': 10, 'burst': 20},
+        'control': {'rate': 40, 'burst': 100},
+        'tokens': {'rate': 5, 'burst': 20},
+    },
+
     # This list makes available or not actions buttons in Miris Manager
     'CAPABILITIES': {},
 
-    # List of Miris Manager urls (do not overwritte this)
+    # List of Miris Manager urls
+    # API calls given in a configuration override the base ones one by one.
+    # Available keys: "method", "url", "anonymous", "idempotent" (defaults to True for GET requests)
+    # "timeout" (defaults to the "TIMEOUT" value), "cache_ttl" (duration in seconds during which a response
+    # is cached if "RESPONSE_CACHE" is enabled), "invalidates" (names of API calls to remove from cache)
+    # and "rate_class" (key in "RATE_LIMITS", API calls without rate class are not limited).
     'API_CALLS': {
-        'PING': {'method': 'get', 'url': '/api/', 'anonymous': True},
-        'TIME': {'method': 'get', 'url': '/api/time/', 'anonymous': True},
-        'INFO': {'method': 'get', 'url': '/api/info/', 'anonymous': True},
+        'PING': {'method': 'get', 'url': '/api/', 'anonymous': True, 'rate_class': 'reads'},
+        'TIME': {'method': 'get', 'url': '/api/time/', 'anonymous': True, 'cache_ttl': 1, 'rate_class': 'reads'},
+        'INFO': {'method': 'get', 'url': '/api/info/', 'anonymous': True, 'cache_ttl': 60, 'rate_class': 'reads'},
         'LONG_POLLING': {'method': 'get', 'url': '/remote-event/v3'},
         'SET_COMMAND_STATUS': {'method': 'post', 'url': '/api/v3/fleet/control/set-command-status/'},
-        'GET_INFO': {'method': 'get', 'url': '/api/v3/fleet/systems/get-info/'},
-        'SET_INFO': {'method': 'post', 'url': '/api/v3/fleet/systems/set-info/'},
-        'GET_STATUS': {'method': 'get', 'url': '/api/v3/fleet/systems/get-status/'},
-        'SET_STATUS': {'method': 'post', 'url': '/api/v3/fleet/systems/set-status/'},
-        'SET_SCREENSHOT': {'method': 'post', 'url': '/api/v3/fleet/systems/set-screenshot/'},
+        'GET_INFO': {
+            'method': 'get', 'url': '/api/v3/fleet/systems/get-info/', 'cache_ttl': 30, 'rate_class': 'reads'
+        },
+        'SET_INFO': {
+            'method': 'post', 'url': '/api/v3/fleet/systems/set-info/', 'invalidates': ['GET_INFO'],
+            'rate_class': 'status'
+        },
+        'GET_STATUS': {
+            'method': 'get', 'url': '/api/v3/fleet/systems/get-status/', 'cache_ttl': 2, 'rate_class': 'reads'
+        },
+        'SET_STATUS': {
+            'method': 'post', 'url': '/api/v3/fleet/systems/set-status/', 'invalidates': ['GET_STATUS'],
+            'rate_class': 'status'
+        },
+        'SET_SCREENSHOT': {
+            'method': 'post', 'url': '/api/v3/fleet/systems/set-screenshot/', 'invalidates': ['GET_STATUS'],
+            'rate_class': 'uploads'
+        },
         'REGISTER_SYSTEM': {'method': 'post', 'url': '/api/v3/fleet/systems/register/'},
-        'GET_MESSAGE': {'method': 'get', 'url': '/api/v3/fleet/messages/get/'},
-        'ADD_MESSAGE': {'method': 'post', 'url': '/api/v3/fleet/messages/add/'},
-        'ARCHIVE_MESSAGE': {'method': 'post', 'url': '/api/v3/fleet/messages/archive/'},
-        'DELETE_MESSAGE': {'method': 'post', 'url': '/api/v3/fleet/messages/delete/'},
+        'GET_MESSAGE': {'method': 'get', 'url': '/api/v3/fleet/messages/get/', 'rate_class': 'reads'},
+        'ADD_MESSAGE': {'method': 'post', 'url': '/api/v3/fleet/messages/add/', 'rate_class': 'messages'},
+        'ARCHIVE_MESSAGE': {'method': 'post', 'url': '/api/v3/fleet/messages/archive/', 'rate_class': 'messages'},
+        'DELETE_MESSAGE': {'method': 'post', 'url': '/api/v3/fleet/messages/delete/', 'rate_class': 'messages'},
         'PREPARE_TUNNEL': {'method': 'post', 'url': '/api/v3/fleet/proxy/prepare-tunnel/'},
-        'SET_PROFILES': {'method': 'post', 'url': '/api/v3/fleet/profiles/set/'},
+        'SET_PROFILES': {'method': 'post', 'url': '/api/v3/fleet/profiles/set/', 'rate_class': 'status'},
         'CHECK_TOKEN': {'method': 'post', 'url': '/api/v3/users/check-token/'},
-        'GET_RELEASE': {'method': 'get', 'url': '/api/v3/packaging/check-for-update/'}
+        'CREATE_TOKEN': {'method': 'post', 'url': '/api/v3/users/create-token/', 'rate_class': 'tokens'},
+        'RUN_COMMAND': {
+            'method': 'post', 'url': '/api/v3/fleet/control/run-command/', 'invalidates': ['GET_STATUS'],
+            'rate_class': 'control'
+        },
+        # Status requests of fleet control, never cached
+        'POLL_STATUS': {'method': 'get', 'url': '/api/v3/fleet/systems/get-status/', 'rate_class': 'control'},
+        'GET_CALENDAR_EVENTS': {
+            'method': 'get', 'url': '/api/v3/fleet/calendars/get-events/', 'rate_class': 'calendar'
+        },
+        'ADD_CALENDAR_EVENT': {
+            'method': 'post', 'url': '/api/v3/fleet/calendars/add-event/', 'rate_class': 'calendar'
+        },
+        'EDIT_CALENDAR_EVENT': {
+            'method': 'post', 'url': '/api/v3/fleet/calendars/edit-event/', 'rate_class': 'calendar'
+        },
+        'DELETE_CALENDAR_EVENT': {
+            'method': 'post', 'url': '/api/v3/fleet/calendars/delete-event/', 'rate_class': 'calendar'
+        },
+        'GET_RELEASE': {
+            'method': 'get', 'url': '/api/v3/packaging/check-for-update/', 'cache_ttl': 300, 'rate_class': 'reads'
+        },
     }
 }
@@ -0,0 +1,90 @@
+"""
+Miris Manager client actions registry
+This module is not intended to be used directly, only the client class should be used.
+
+Functions handling the actions sent by Miris Manager are registered with the
+"action" decorator of the client. Received commands are dispatched with a
+single dict lookup, their params are checked against the schema given at
+registration and the system capabilities are derived from the registered
+actions.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ActionHandler():
+    __slots__ = ('name', 'function', 'params', 'capability', 'timeout', 'concurrency', 'priority')
+
+    def __init__(self, name, function, params=None, capability=None, timeout=None, concurrency=None, priority=None):
+        self.name = name
+        self.function = function
+        # {param name: type or tuple of types}, a param is optional if None is one of its types
+        self.params = params
+        if isinstance(capability, str):
+            capability = (capability, )
+        self.capability = tuple(capability or ())
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.priority = priority
+
+    def validate_params(self, params):
+        if params is None:
+            params = {}
+        if not isinstance(params, dict):
+            raise ValueError(f'Invalid params for action "{self.name}": a dict is expected.')
+        if not self.params:
+            return params
+        for key, expected in self.params.items():
+            types = expected if isinstance(expected, tuple) else (expected, )
+            optional = None in types or type(None) in types
+            types = tuple(value_type for value_type in types if value_type is not None)
+            if key not in params or params[key] is None:
+                if not optional:
+                    raise ValueError(f'Missing parameter "{key}" for action "{self.name}".')
+                continue
+            value = params[key]
+            # "bool" is a subclass of "int", booleans are accepted only if "bool" is expected
+            if types and (not isinstance(value, types) or (isinstance(value, bool) and bool not in types)):
+                names = ' or '.join(value_type.__name__ for value_type in types)
+                raise ValueError(f'Invalid parameter "{key}" for action "{self.name}": {names} expected.')
+        return params
+
+    def __call__(self, uid, params):
+        return self.function(uid, self.validate_params(params))
+
+
+class ActionRegistry():
+
+    def __init__(self):
+        self._handlers = {}
+
+    def __contains__(self, name):
+        return name in self._handlers
+
+    def __len__(self):
+        return len(self._handlers)
+
+    def get(self, name):
+        return self._handlers.get(name)
+
+    def register(self, name, function, **kwargs):
+        if name in self._handlers:
+            logger.debug('Replacing handler of action "%s".', name)
+        handler = ActionHandler(name, function, **kwargs)
+        self._handlers[name] = handler
+        return handler
+
+    def get_capabilities(self, base=None):
+        # Capabilities of the registered actions, after the given base capabilities, without duplicates
+        capabilities = dict.fromkeys(base or ())
+        for handler in self._handlers.values():
+            capabilities.update(dict.fromkeys(handler.capability))
+        return list(capabilities)
+
+    def get_scheduling(self, attribute):
+        # Return {action: value} for an "ActionHandler" attribute (timeout, concurrency or priority)
+        return {
+            name: getattr(handler, attribute)
+            for name, handler in self._handlers.items() if getattr(handler, attribute) is not None
+        }
@@ -0,0 +1,390 @@
+"""
+Miris Manager calendar synchronization
+This module can be used by scripts importing schedules (pretalx, indico...) in
+the calendar of a system.
+
+The events of the schedule are normalized, the existing calendar of the system
+is fetched once and compared to the schedule: only the events to create, update
+or delete are sent, concurrently over the connections pool of the client.
+Events created by a synchronization carry a "sync_id" parameter so that they
+can be found again by the next synchronizations without touching the events
+created by other means.
+
+A local sync state can also be used: it maps the keys of events to their uid
+and content hash, so that the calendar does not need to be fetched, only the
+changed events are sent and an import can be rolled back at once.
+"""
+import datetime
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import threading
+
+from ..client import MirisManagerRequestError
+
+logger = logging.getLogger(__name__)
+
+CALENDAR_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class CalendarEvent():
+    """
+    Calendar event to synchronize.
+    "key" is the unique identifier of the event in its source (for example "pretalx:ABCD").
+    "start" and "end" are datetime objects with a timezone, "time_zone" defaults to the key of the
+    start date timezone (for zoneinfo timezones).
+    """
+    __slots__ = ('key', 'start', 'end', 'title', 'speaker', 'description', 'room', 'command', 'enabled', 'time_zone')
+
+    def __init__(self, key, start, end, title, speaker='', description='', room=None,
+                 command='record', enabled=False, time_zone=None):
+        if start.tzinfo is None or end.tzinfo is None:
+            raise ValueError(f'The dates of event "{key}" have no timezone.')
+        self.key = key
+        self.start = start
+        self.end = end
+        self.title = title
+        self.speaker = speaker or ''
+        self.description = description or ''
+        self.room = room
+        self.command = command
+        self.enabled = enabled
+        self.time_zone = time_zone or getattr(start.tzinfo, 'key', None)
+        if not self.time_zone:
+            raise ValueError(f'No time zone name for event "{key}".')
+
+    def __repr__(self):
+        return f'<CalendarEvent {self.key} {self.start.isoformat()} {self.title!r}>'
+
+    def get_parameters(self):
+        return {
+            'title': self.title,
+            'speaker': self.speaker,
+            'description': self.description,
+            'sync_id': self.key,
+        }
+
+    def to_data(self):
+        # Data of "add-event" and "edit-event" API calls, dates are given in the event time zone
+        import zoneinfo  # imported only when used to keep the package import fast
+        tz = zoneinfo.ZoneInfo(self.time_zone)
+        return {
+            'start_date': self.start.astimezone(tz).strftime(CALENDAR_DATE_FORMAT),
+            'end_date': self.end.astimezone(tz).strftime(CALENDAR_DATE_FORMAT),
+            'time_zone': self.time_zone,
+            'command': self.command,
+            'parameters': json.dumps(self.get_parameters(), sort_keys=True),
+            'enabled': 'yes' if self.enabled else 'no',
+        }
+
+    def get_hash(self):
+        return get_data_hash(self.to_data())
+
+
+def _normalize_data(data):
+    # Normalize event data sent to or received from the server to compare them
+    parameters = data.get('parameters') or {}
+    if isinstance(parameters, str):
+        try:
+            parameters = json.loads(parameters)
+        except ValueError:
+            parameters = {'raw': parameters}
+    enabled = data.get('enabled')
+    if isinstance(enabled, str):
+        enabled = enabled.lower() in ('yes', 'true', '1', 'on')
+    return {
+        'start_date': str(data.get('start_date') or '').replace('T', ' ')[:19],
+        'end_date': str(data.get('end_date') or '').replace('T', ' ')[:19],
+        'time_zone': data.get('time_zone') or '',
+        'command': data.get('command') or '',
+        'parameters': parameters,
+        'enabled': bool(enabled),
+    }
+
+
+def get_data_hash(data):
+    content = json.dumps(_normalize_data(data), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def get_sync_id(data):
+    parameters = _normalize_data(data)['parameters']
+    return parameters.get('sync_id') if isinstance(parameters, dict) else None
+
+
+class CalendarDiff():
+
+    def __init__(self):
+        # List of events
+        self.create = []
+        # List of tuples (uid, event)
+        self.update = []
+        # List of tuples (uid, key)
+        self.delete = []
+        self.unchanged = 0
+
+    def __len__(self):
+        return len(self.create) + len(self.update) + len(self.delete)
+
+    def __repr__(self):
+        return (f'<CalendarDiff create={len(self.create)} update={len(self.update)} '
+                f'delete={len(self.delete)} unchanged={self.unchanged}>')
+
+
+def compute_diff(events, existing, prefix=None, delete_missing=True):
+    """
+    Compare the events of a schedule to the existing events of a calendar.
+    Existing events are matched with their "sync_id" parameter, events without it are ignored.
+    If "prefix" is given, only existing events with a "sync_id" starting with it can be deleted.
+    """
+    diff = CalendarDiff()
+    existing_by_key = {}
+    for data in existing:
+        key = get_sync_id(data)
+        if not key or not data.get('uid'):
+            continue
+        if key in existing_by_key:
+            # Duplicated event, for example created by an interrupted synchronization
+            logger.info('Event "%s" is duplicated in calendar, removing uid "%s".', key, data['uid'])
+            diff.delete.append((data['uid'], key))
+            continue
+        existing_by_key[key] = data
+    seen = set()
+    for event in events:
+        if event.key in seen:
+            raise ValueError(f'Event "{event.key}" is given twice.')
+        seen.add(event.key)
+        data = existing_by_key.get(event.key)
+        if data is None:
+            diff.create.append(event)
+        elif get_data_hash(data) != event.get_hash():
+            diff.update.append((data['uid'], event))
+        else:
+            diff.unchanged += 1
+    if delete_missing:
+        for key, data in existing_by_key.items():
+            if key not in seen and (not prefix or key.startswith(prefix)):
+                diff.delete.append((data['uid'], key))
+    return diff
+
+
+class SyncState():
+    """
+    Local state of the synchronizations of a system, stored in a JSON file.
+    "events" is a dict {event key: {'uid': uid, 'hash': content hash}}.
+    """
+
+    def __init__(self, path, system=None):
+        self.path = Path(path)
+        self.system = system
+        self.events = {}
+        self.load()
+
+    def load(self):
+        if not self.path.exists():
+            return
+        with open(self.path, 'r') as fo:
+            data = json.load(fo)
+        if self.system and data.get('system') and data['system'] != self.system:
+            raise ValueError(f'The sync state "{self.path}" belongs to system "{data["system"]}".')
+        self.events = data.get('events') or {}
+
+    def save(self):
+        if not self.events and not self.path.exists():
+            return
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w') as fo:
+            json.dump({'system': self.system, 'events': self.events}, fo, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def compute_diff(self, events, prefix=None, delete_missing=True):
+        """
+        Compare the events of a schedule to the events of the state, the calendar is not fetched.
+        """
+        diff = CalendarDiff()
+        seen = set()
+        for event in events:
+            if event.key in seen:
+                raise ValueError(f'Event "{event.key}" is given twice.')
+            seen.add(event.key)
+            entry = self.events.get(event.key)
+            if entry is None:
+                diff.create.append(event)
+            elif entry['hash'] != event.get_hash():
+                diff.update.append((entry['uid'], event))
+            else:
+                diff.unchanged += 1
+        if delete_missing:
+            for key, entry in self.events.items():
+                if key not in seen and (not prefix or key.startswith(prefix)):
+                    diff.delete.append((entry['uid'], key))
+        return diff
+
+    def get_rollback_diff(self, prefix=None):
+        diff = CalendarDiff()
+        diff.delete = [
+            (entry['uid'], key) for key, entry in self.events.items()
+            if not prefix or key.startswith(prefix)
+        ]
+        return diff
+
+    def set_result(self, operation, key, uid, event=None):
+        # Store the result of an operation ("event" is given for creations and updates)
+        if operation == 'delete':
+            self.events.pop(key, None)
+        elif uid:
+            self.events[key] = {'uid': uid, 'hash': event.get_hash()}
+
+
+class SyncReport():
+
+    def __init__(self):
+        # {event key: uid}
+        self.created = {}
+        self.updated = {}
+        self.deleted = {}
+        # List of tuples (operation, event key, exception)
+        self.errors = []
+
+    def __repr__(self):
+        return (f'<SyncReport created={len(self.created)} updated={len(self.updated)} '
+                f'deleted={len(self.deleted)} errors={len(self.errors)}>')
+
+
+class CalendarSync():
+    """
+    Synchronize a schedule with the calendar of a system using a client instance.
+    "progress" is an optional function called after each operation with:
+    (number of done operations, total number of operations, operation, event key, exception or None).
+    """
+
+    def __init__(self, client, system, workers=8, progress=None):
+        self.client = client
+        self.system = system
+        self.workers = workers
+        self.progress = progress
+
+    def _call(self, action, data=None, params=None):
+        return self.client.api_request(action, headers={'system': self.system}, data=data, params=params)
+
+    def get_events(self):
+        response = self._call('GET_CALENDAR_EVENTS', params={'system': self.system})
+        if isinstance(response, dict):
+            response = response.get('events', [])
+        return response
+
+    def compute_diff(self, events, prefix=None, delete_missing=True):
+        try:
+            existing = self.get_events()
+        except MirisManagerRequestError as e:
+            if e.status_code != 404:
+                raise
+            # The server cannot list the events of a calendar: all the events are added
+            logger.warning('The calendar events cannot be listed (%s), events will only be added.', e)
+            return compute_diff(events, [], delete_missing=False)
+        return compute_diff(events, existing, prefix=prefix, delete_missing=delete_missing)
+
+    def _run_operation(self, operation, item):
+        if operation == 'create':
+            response = self._call('ADD_CALENDAR_EVENT', data=item.to_data())
+            return item.key, response.get('uid')
+        if operation == 'update':
+            uid, event = item
+            self._call('EDIT_CALENDAR_EVENT', data=dict(event.to_data(), uid=uid))
+            return event.key, uid
+        uid, key = item
+        self._call('DELETE_CALENDAR_EVENT', data={'uid': uid})
+        return key, uid
+
+    def apply(self, diff, dry_run=False, state=None):
+        """
+        Send the changes of a diff, return a "SyncReport".
+        If a "SyncState" is given, it is updated after each operation and saved even if the synchronization
+        is interrupted, so that the events already created are known by the next synchronization.
+        """
+        from concurrent.futures import ThreadPoolExecutor  # imported only when used
+
+        report = SyncReport()
+        operations = (
+            [('delete', item) for item in diff.delete]
+            + [('update', item) for item in diff.update]
+            + [('create', item) for item in diff.create]
+        )
+        total = len(operations)
+        done = [0]
+        lock = threading.Lock()
+
+        def run(operation, item):
+            event = item if operation == 'create' else item[1] if operation == 'update' else None
+            key = item[1] if operation == 'delete' else event.key
+            error = None
+            try:
+                if dry_run:
+                    logger.info('Dry run: %s event "%s".', operation, key)
+                    uid = None if operation == 'create' else item[0]
+                else:
+                    key, uid = self._run_operation(operation, item)
+            except Exception as e:
+                logger.warning('Failed to %s event "%s": %s', operation, key, e)
+                error = e
+            with lock:
+                done[0] += 1
+                if error is not None:
+                    report.errors.append((operation, key, error))
+                else:
+                    if operation == 'create':
+                        report.created[key] = uid
+                    elif operation == 'update':
+                        report.updated[key] = uid
+                    else:
+                        report.deleted[key] = uid
+                    if state is not None and not dry_run:
+                        state.set_result(operation, key, uid, event)
+                if self.progress:
+                    self.progress(done[0], total, operation, key, error)
+
+        if operations:
+            executor = ThreadPoolExecutor(max_workers=max(1, min(self.workers, total)))
+            try:
+                for operation, item in operations:
+                    executor.submit(run, operation, item)
+                executor.shutdown(wait=True)
+            except BaseException:
+                # Interrupted: the pending operations are cancelled, the running ones are waited for
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
+            finally:
+                if state is not None and not dry_run:
+                    state.save()
+        logger.info('Calendar of "%s" synchronized: %s.', self.system, report)
+        return report
+
+    def sync(self, events, prefix=None, delete_missing=True, dry_run=False, state=None):
+        """
+        Synchronize the events. If a "SyncState" is given, the changes are computed from it instead
+        of the calendar and it is updated with the result.
+        """
+        if state is not None:
+            diff = state.compute_diff(events, prefix=prefix, delete_missing=delete_missing)
+        else:
+            diff = self.compute_diff(events, prefix=prefix, delete_missing=delete_missing)
+        logger.info('Calendar of "%s": %s.', self.system, diff)
+        return self.apply(diff, dry_run=dry_run, state=state)
+
+    def rollback(self, state, prefix=None, dry_run=False):
+        """
+        Delete all the events of a "SyncState" (or the ones with a key starting with "prefix").
+        """
+        diff = state.get_rollback_diff(prefix=prefix)
+        logger.info('Rolling back calendar of "%s": %s.', self.system, diff)
+        return self.apply(diff, dry_run=dry_run, state=state)
+
+
+def parse_duration(value):
+    # Parse a duration like "00:20" or "1:30:00"
+    parts = [int(part) for part in value.split(':')]
+    while len(parts) < 3:
+        parts.append(0)
+    return datetime.timedelta(hours=parts[0], minutes=parts[1], seconds=parts[2])
@@ -0,0 +1,118 @@
+"""
+Miris Manager server clock offset tracking
+This module is not intended to be used directly, only the client class should be used.
+
+The offset between the local clock and the server clock is estimated from the
+"Date" header of the API responses (no extra request is needed) and, when a
+drift is detected, more precisely from the "TIME" API call. Round trip times
+are compensated like in NTP: the server time is assumed to be read at the
+middle of the request.
+"""
+import datetime
+from email.utils import parsedate_to_datetime
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_TIME_FORMAT = '%Y-%m-%d_%H-%M-%S_%f'
+# Samples with a larger uncertainty (in seconds) are not used for the initial estimation
+MAX_INITIAL_UNCERTAINTY = 5
+
+
+def parse_server_time(value):
+    """
+    Get a UTC timestamp from a time value returned by the server.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str) or not value:
+        raise ValueError(f'Invalid server time: {value!r}.')
+    try:
+        date = datetime.datetime.strptime(value, SIGNATURE_TIME_FORMAT)
+    except ValueError:
+        date = datetime.datetime.fromisoformat(value)
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.UTC)
+    return date.timestamp()
+
+
+class ClockOffsetTracker():
+
+    def __init__(self, drift_threshold=5, retry_delay=60):
+        self.drift_threshold = drift_threshold
+        # Delay in seconds before retrying a failed refresh
+        self.retry_delay = retry_delay
+        # Estimated value of "server time - local time" in seconds
+        self.offset = None
+        self.uncertainty = None
+        self.needs_refresh = False
+        # Monotonic time before which the offset is not refreshed after a failure
+        self._retry_at = 0
+        self._last_date_sample = None
+        self._lock = threading.Lock()
+
+    def get_offset(self):
+        return self.offset or 0
+
+    def now(self):
+        # Estimated server time (UTC)
+        return datetime.datetime.now(datetime.UTC) + datetime.timedelta(seconds=self.get_offset())
+
+    def should_refresh(self):
+        # Return True if the offset should be refreshed with the "TIME" API call
+        return self.needs_refresh and time.monotonic() >= self._retry_at
+
+    def refresh_failed(self):
+        # The "TIME" API call failed (network error for example), it is not retried for each request
+        self._retry_at = time.monotonic() + self.retry_delay
+
+    def add_date_sample(self, date_header, sent, received):
+        """
+        Use the "Date" header of a response to estimate the offset or to detect a drift.
+        The "sent" and "received" arguments are the local timestamps of the request.
+        """
+        try:
+            server_time = parsedate_to_datetime(date_header).timestamp()
+        except (TypeError, ValueError):
+            return
+        # The header has a precision of one second (the value is truncated)
+        offset = server_time + 0.5 - (sent + received) / 2
+        uncertainty = (received - sent) / 2 + 0.5
+        with self._lock:
+            if uncertainty <= MAX_INITIAL_UNCERTAINTY:
+                self._last_date_sample = (offset, uncertainty)
+            if self.offset is None:
+                if uncertainty <= MAX_INITIAL_UNCERTAINTY:
+                    self._set_offset(offset, uncertainty, 'response date')
+            elif abs(offset - self.offset) > self.drift_threshold + uncertainty + self.uncertainty:
+                if not self.needs_refresh:
+                    logger.info('Clock drift detected (%.1fs), the offset will be refreshed.', offset - self.offset)
+                self.needs_refresh = True
+
+    def add_time_sample(self, server_time, sent, received):
+        """
+        Use the time returned by the "TIME" API call to estimate the offset.
+        """
+        offset = server_time - (sent + received) / 2
+        uncertainty = (received - sent) / 2
+        with self._lock:
+            self.needs_refresh = False
+            if self._last_date_sample is not None:
+                date_offset, date_uncertainty = self._last_date_sample
+                if abs(offset - date_offset) > date_uncertainty + uncertainty + 1:
+                    # The "Date" header is always in UTC, so if both values do not match, the "TIME" API call
+                    # does not return a UTC time and the offset estimated with the response date is used.
+                    logger.debug('Server time %s does not match response date, ignoring it.', server_time)
+                    self._set_offset(date_offset, date_uncertainty, 'response date')
+                    return
+            self._set_offset(offset, uncertainty, 'time API call')
+
+    def _set_offset(self, offset, uncertainty, source):
+        if abs(offset) > 1:
+            logger.info('Clock offset with server: %.3fs (+/- %.3fs, from %s).', offset, uncertainty, source)
+        else:
+            logger.debug('Clock offset with server: %.3fs (+/- %.3fs, from %s).', offset, uncertainty, source)
+        self.offset = offset
+        self.uncertainty = uncertainty
@@ -0,0 +1,100 @@
+"""
+Miris Manager client JSON codecs
+This module is not intended to be used directly, only the client class should be used.
+
+The fastest available JSON library is used: orjson, then msgspec and
+finally the standard json module. Documents are decoded from bytes and
+encoded to bytes to avoid intermediate strings.
+"""
+import gzip
+import json
+import logging
+from urllib.parse import urlencode
+
+logger = logging.getLogger(__name__)
+
+CODEC_NAMES = ('orjson', 'msgspec', 'json')
+
+
+class JSONCodec():
+    name = 'json'
+
+    def loads(self, content):
+        return json.loads(content)
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class OrjsonCodec(JSONCodec):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def loads(self, content):
+        return self._orjson.loads(content)
+
+    def dumps(self, obj):
+        return self._orjson.dumps(obj, option=self._orjson.OPT_NON_STR_KEYS)
+
+
+class MsgspecCodec(JSONCodec):
+    name = 'msgspec'
+
+    def __init__(self):
+        import msgspec
+        self._msgspec = msgspec
+        self._decoder = msgspec.json.Decoder()
+        self._encoder = msgspec.json.Encoder()
+
+    def loads(self, content):
+        try:
+            return self._decoder.decode(content)
+        except self._msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+    def dumps(self, obj):
+        return self._encoder.encode(obj)
+
+
+CODECS = {
+    'orjson': OrjsonCodec,
+    'msgspec': MsgspecCodec,
+    'json': JSONCodec,
+}
+
+
+def get_codec(name='auto'):
+    """
+    Get a codec instance. If "name" is "auto", the fastest installed codec is used.
+    """
+    if name and name != 'auto':
+        if name not in CODECS:
+            raise ValueError(f'Unsupported JSON codec "{name}", available codecs are: {", ".join(CODEC_NAMES)}.')
+        return CODECS[name]()
+    for codec_name in CODEC_NAMES:
+        try:
+            codec = CODECS[codec_name]()
+        except ImportError:
+            continue
+        logger.debug('Using "%s" JSON codec.', codec.name)
+        return codec
+
+
+def compress_form_data(data, threshold, level=6):
+    """
+    Encode form data and compress it with gzip if its size is above the threshold.
+    Return a tuple: (body, headers) or (None, None) if the data should be sent as is.
+    """
+    if not threshold or not data or not isinstance(data, dict):
+        return None, None
+    body = urlencode(data, doseq=True).encode('utf-8')
+    if len(body) < threshold:
+        return None, None
+    headers = {
+        'Content-Type': 'application/x-www-form-urlencoded',
+        'Content-Encoding': 'gzip',
+    }
+    return gzip.compress(body, compresslevel=level), headers
@@ -0,0 +1,97 @@
+"""
+Miris Manager received commands history
+This module is not intended to be used directly, only the client class should be used.
+
+The server can send the same command again if the connection was lost before
+the command status was received. The history keeps the last status of the
+recent commands so that a command received again is not run twice: its last
+status is sent again instead. The history can be saved in a file to be kept
+after a restart.
+"""
+from collections import OrderedDict
+import json
+import logging
+import os
+from pathlib import Path
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CommandHistory():
+
+    def __init__(self, max_size=256, ttl=3600, path=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = Path(path) if path else None
+        # {uid: (status, data, timestamp, persistent)}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not self.path or not self.path.exists():
+            return
+        try:
+            content = json.loads(self.path.read_text())
+            entries = [(uid, status, data, float(timestamp)) for uid, status, data, timestamp in content]
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning('Unable to read commands history file "%s": %s', self.path, e)
+            return
+        with self._lock:
+            for uid, status, data, timestamp in entries:
+                self._entries[uid] = (status, data, timestamp, True)
+            self._purge()
+        logger.debug('%s commands loaded from history file "%s".', len(self._entries), self.path)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            content = [
+                [uid, status, data, timestamp]
+                for uid, (status, data, timestamp, persistent) in self._entries.items() if persistent
+            ]
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        try:
+            tmp_path.write_text(json.dumps(content))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning('Unable to write commands history file "%s": %s', self.path, e)
+
+    def _purge(self):
+        limit = time.time() - self.ttl
+        while self._entries:
+            uid, entry = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_size and entry[2] >= limit:
+                break
+            del self._entries[uid]
+
+    def get(self, uid):
+        """
+        Get the last status of a command as a tuple (status, data) or None if the command is unknown.
+        """
+        if not uid:
+            return None
+        with self._lock:
+            self._purge()
+            entry = self._entries.get(uid)
+        if entry is None:
+            return None
+        return entry[0], entry[1]
+
+    def set(self, uid, status, data='', persistent=True):
+        """
+        Store the last status of a command.
+        Statuses not persistent are not written in the history file (for example the status of
+        a command being processed because it should be run again if the process is restarted).
+        """
+        if not uid:
+            return
+        with self._lock:
+            self._entries.pop(uid, None)
+            self._entries[uid] = (status, data or '', time.time(), persistent)
+            self._purge()
+        if persistent:
+            self.save()
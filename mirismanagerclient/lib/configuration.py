@@ -2,6 +2,7 @@
 Miris Manager client library
 This module is not intended to be used directly, only the client class should be used.
 """
+import copy
 import json
 import logging
 from pathlib import Path
@@ -12,9 +13,31 @@ from ..conf import BASE_CONF
 logger = logging.getLogger(__name__)
 
 
+def merge_api_calls(api_calls, overrides):
+    """
+    Get a copy of "api_calls" with the given API calls overridden field by field
+    (the fields of an API call which are not overridden keep their value).
+    """
+    merged = copy.deepcopy(api_calls or {})
+    for name, definition in (overrides or {}).items():
+        if isinstance(definition, dict) and isinstance(merged.get(name), dict):
+            merged[name].update(copy.deepcopy(definition))
+        else:
+            merged[name] = copy.deepcopy(definition)
+    return merged
+
+
+def _set_value(conf, key, val):
+    if key == 'API_CALLS' and isinstance(val, dict):
+        # API calls are overridden one by one to keep the other base API calls
+        conf[key] = merge_api_calls(conf[key], val)
+    else:
+        conf[key] = val
+
+
 def load_conf(default_conf=None, local_conf=None):
-    # copy default configuration
-    conf = BASE_CONF.copy()
+    # copy default configuration (deep copy to avoid sharing nested values between instances)
+    conf = copy.deepcopy(BASE_CONF)
     # update with default and local configuration
     for _index, conf_override in enumerate((default_conf, local_conf)):
         if not conf_override:
@@ -24,7 +47,7 @@ def load_conf(default_conf=None, local_conf=None):
         if isinstance(conf_override, dict):
             for key, val in conf_override.items():
                 if not key.startswith('_'):
-                    conf[key] = val
+                    _set_value(conf, key, val)
         elif isinstance(conf_override, Path):
             if conf_override.exists():
                 content = conf_override.read_text()
@@ -36,16 +59,27 @@ def load_conf(default_conf=None, local_conf=None):
                     logger.debug('Config file "%s" loaded.', conf_override)
                     if not isinstance(conf_mod, dict):
                         raise ValueError(f'The configuration in "{conf_override}" is not a dict.')
-                    conf.update(conf_mod)
+                    for key, val in conf_mod.items():
+                        _set_value(conf, key, val)
             else:
                 logger.debug('Config file does not exists, using default config.')
         else:
             raise ValueError('Unsupported type for configuration.')
-    if conf['SERVER_URL'].endswith('/'):
+    if isinstance(conf['SERVER_URL'], (list, tuple)):
+        conf['SERVER_URL'] = [url.rstrip('/') for url in conf['SERVER_URL']]
+    elif conf['SERVER_URL'].endswith('/'):
         conf['SERVER_URL'] = conf['SERVER_URL'].rstrip('/')
     return conf
 
 
+def get_server_urls(conf):
+    # "SERVER_URL" can be a single URL or a list of URLs
+    urls = conf.get('SERVER_URL')
+    if isinstance(urls, (list, tuple)):
+        return list(urls)
+    return [urls] if urls else []
+
+
 def update_conf(local_conf, key, value):
     if not local_conf:
         logger.debug('Cannot update configuration, "local_conf" is not set.')
@@ -70,6 +104,10 @@ def update_conf(local_conf, key, value):
 
 def check_conf(conf):
     # check that mandatory configuration values are set
-    if not conf.get('SERVER_URL') or conf['SERVER_URL'] == 'https://mirismanager':
+    urls = get_server_urls(conf)
+    if not urls or 'https://mirismanager' in urls or not all(urls):
         raise ValueError('The value of "SERVER_URL" is not set. Please configure it.')
-    conf['SERVER_URL'] = conf['SERVER_URL'].strip('/')
+    if isinstance(conf['SERVER_URL'], (list, tuple)):
+        conf['SERVER_URL'] = [url.strip('/') for url in urls]
+    else:
+        conf['SERVER_URL'] = conf['SERVER_URL'].strip('/')
@@ -0,0 +1,114 @@
+"""
+Miris Manager servers endpoints selection
+This module is not intended to be used directly, only the client class should be used.
+
+When several server URLs are configured, requests are sent to a single active
+endpoint. A failed request makes the client fail over immediately to the
+fastest healthy endpoint. The round trip time of each endpoint is measured
+with "PING" requests and smoothed with an exponentially weighted moving
+average. To avoid switching back and forth, the client fails back to another
+endpoint only if it has been healthy for a while and is clearly faster.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Endpoint():
+    __slots__ = ('url', 'rtt', 'healthy', 'healthy_since', 'failures')
+
+    def __init__(self, url):
+        self.url = url
+        # Smoothed round trip time in seconds, None if unknown
+        self.rtt = None
+        self.healthy = True
+        self.healthy_since = 0
+        self.failures = 0
+
+
+class EndpointSelector():
+
+    def __init__(self, urls, alpha=0.3, failback_ratio=0.7, failback_delay=30):
+        if not urls:
+            raise ValueError('At least one server URL is required.')
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.alpha = alpha
+        self.failback_ratio = failback_ratio
+        self.failback_delay = failback_delay
+        self.current = self.endpoints[0]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.endpoints)
+
+    @property
+    def url(self):
+        return self.current.url
+
+    def _get(self, url):
+        for endpoint in self.endpoints:
+            if endpoint.url == url:
+                return endpoint
+        return None
+
+    def record_success(self, url, rtt=None):
+        with self._lock:
+            endpoint = self._get(url)
+            if endpoint is None:
+                return
+            if not endpoint.healthy:
+                logger.info('Server "%s" is reachable again.', url)
+                endpoint.healthy = True
+                endpoint.healthy_since = time.monotonic()
+            endpoint.failures = 0
+            if rtt is not None:
+                endpoint.rtt = rtt if endpoint.rtt is None else self.alpha * rtt + (1 - self.alpha) * endpoint.rtt
+            self._select()
+
+    def record_failure(self, url):
+        with self._lock:
+            endpoint = self._get(url)
+            if endpoint is None:
+                return
+            endpoint.failures += 1
+            endpoint.healthy = False
+            self._select()
+
+    def _rtt_key(self, endpoint):
+        # Endpoints with an unknown round trip time are used last, in the configuration order
+        return (endpoint.rtt is None, endpoint.rtt or 0, self.endpoints.index(endpoint))
+
+    def _select(self):
+        current = self.current
+        healthy = [endpoint for endpoint in self.endpoints if endpoint.healthy]
+        if not current.healthy:
+            # Fail over immediately
+            if healthy:
+                selected = min(healthy, key=self._rtt_key)
+            else:
+                selected = self.endpoints[(self.endpoints.index(current) + 1) % len(self.endpoints)]
+        else:
+            # Fail back only to an endpoint healthy for a while and clearly faster
+            now = time.monotonic()
+            candidates = [
+                endpoint for endpoint in healthy
+                if endpoint.rtt is not None and now - endpoint.healthy_since >= self.failback_delay
+            ]
+            selected = min(candidates, key=self._rtt_key) if candidates else current
+            if current.rtt is not None and selected.rtt >= current.rtt * self.failback_ratio:
+                selected = current
+        if selected is not current:
+            logger.warning('Switching from server "%s" to "%s".', current.url, selected.url)
+            self.current = selected
+
+    def get_stats(self):
+        with self._lock:
+            return [{
+                'url': endpoint.url,
+                'rtt': endpoint.rtt,
+                'healthy': endpoint.healthy,
+                'failures': endpoint.failures,
+                'current': endpoint is self.current,
+            } for endpoint in self.endpoints]
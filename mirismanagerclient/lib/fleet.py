@@ -0,0 +1,164 @@
+"""
+Miris Manager fleet control
+This module can be used by scripts controlling many profiles (rooms) at once with a user API key.
+
+The commands are sent to all profiles concurrently over the connections pool
+of the client, then the status of each profile is polled until it reaches the
+expected status. Profiles which are initializing are polled often, the others
+less often, and the result of each profile is reported as soon as it is known.
+"""
+import heapq
+import logging
+import time
+
+from ..client import MirisManagerRequestError
+
+logger = logging.getLogger(__name__)
+
+# Status expected after the command of an action
+TARGET_STATUSES = {
+    'START_RECORDING': 'RUNNING',
+    'STOP_RECORDING': 'READY',
+}
+
+
+class ProfileResult():
+
+    def __init__(self, profile, action):
+        self.profile = profile
+        self.action = action
+        self.ok = False
+        self.status = None
+        self.error = None
+        self.message = None
+        # Duration of the command request
+        self.command_time = None
+        # Duration between the start of the run and the result
+        self.latency = None
+        self.polls = 0
+
+    def __repr__(self):
+        state = 'ok' if self.ok else f'failed: {self.error}'
+        latency = f'{self.latency:.2f}s' if self.latency is not None else '-'
+        return f'<ProfileResult {self.profile} {self.action} {state} status={self.status} latency={latency}>'
+
+
+class FleetController():
+    """
+    Run an action on several profiles concurrently using a client instance.
+    "on_result" is an optional function called with each "ProfileResult" as soon as it is known.
+    """
+
+    def __init__(self, client, workers=16, fast_interval=0.5, slow_interval=2, timeout=120, on_result=None):
+        self.client = client
+        self.workers = workers
+        self.fast_interval = fast_interval
+        self.slow_interval = slow_interval
+        self.timeout = timeout
+        self.on_result = on_result
+
+    def _run_command(self, action, profile, params):
+        data = dict(params or {}, profile=profile, action=action)
+        data.setdefault('async', 'no')
+        start = time.monotonic()
+        response = self.client.api_request('RUN_COMMAND', data=data)
+        if not isinstance(response, dict):
+            raise ValueError(f'Invalid command response: {response!r}.')
+        return response, time.monotonic() - start
+
+    def _get_status(self, profile):
+        response = self.client.api_request('POLL_STATUS', params={'profile': profile})
+        return response.get('status')
+
+    def run(self, action, profiles, params=None, target_status=None):
+        """
+        Send the command of an action to the profiles and wait for them to reach the target status
+        (defaults to the status of "TARGET_STATUSES", the status is not checked if there is none).
+        Return a dict {profile: ProfileResult}.
+        """
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait  # imported only when used
+
+        target_status = target_status or TARGET_STATUSES.get(action)
+        results = {profile: ProfileResult(profile, action) for profile in profiles}
+        started = time.monotonic()
+        deadline = started + self.timeout
+        # Heap of tuples (poll time, profile)
+        polls = []
+
+        def finish(result, error=None):
+            result.ok = error is None
+            result.error = error
+            result.latency = time.monotonic() - started
+            if error:
+                logger.warning('Action "%s" failed on profile "%s": %s', action, result.profile, error)
+            if self.on_result:
+                self.on_result(result)
+
+        def schedule(result):
+            now = time.monotonic()
+            if now >= deadline:
+                finish(result, f'Timeout while waiting for status "{target_status}" (status: {result.status}).')
+                return
+            interval = self.fast_interval if result.status in (None, 'INITIALIZING') else self.slow_interval
+            heapq.heappush(polls, (min(now + interval, deadline), result.profile))
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(results)))) as executor:
+            in_flight = {
+                executor.submit(self._run_command, action, profile, params): ('command', profile)
+                for profile in results
+            }
+            while in_flight or polls:
+                now = time.monotonic()
+                while polls and polls[0][0] <= now:
+                    _poll_time, profile = heapq.heappop(polls)
+                    in_flight[executor.submit(self._get_status, profile)] = ('status', profile)
+                wait_timeout = max(0, polls[0][0] - now) if polls else None
+                if not in_flight:
+                    time.sleep(wait_timeout)
+                    continue
+                done, _not_done = wait(in_flight, timeout=wait_timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, profile = in_flight.pop(future)
+                    result = results[profile]
+                    try:
+                        value = future.result()
+                    except Exception as e:
+                        # Errors are reported per profile, they do not stop the run for the other profiles
+                        temporary = isinstance(e, (MirisManagerRequestError, OSError))
+                        if kind == 'status' and temporary:
+                            # Temporary polling errors are ignored until the timeout
+                            logger.info('Failed to get status of profile "%s": %s', profile, e)
+                            schedule(result)
+                        else:
+                            finish(result, str(e) if temporary else f'{e.__class__.__name__}: {e}')
+                        continue
+                    if kind == 'command':
+                        response, result.command_time = value
+                        if response.get('error'):
+                            finish(result, response['error'])
+                            continue
+                        result.message = response.get('message')
+                        if target_status:
+                            schedule(result)
+                        else:
+                            finish(result)
+                        continue
+                    result.polls += 1
+                    result.status = value
+                    if value == target_status:
+                        finish(result)
+                    elif value == 'UNAVAILABLE':
+                        finish(result, 'The profile does not exist or no system is online.')
+                    else:
+                        schedule(result)
+        return results
+
+    def get_stats(self, results):
+        latencies = sorted(result.latency for result in results.values() if result.ok)
+        return {
+            'profiles': len(results),
+            'succeeded': len(latencies),
+            'failed': len(results) - len(latencies),
+            'max_latency': latencies[-1] if latencies else None,
+            'median_latency': latencies[len(latencies) // 2] if latencies else None,
+        }
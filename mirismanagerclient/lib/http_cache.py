@@ -0,0 +1,107 @@
+"""
+Miris Manager client download cache
+This module can be used by scripts downloading documents (schedules...) several times.
+
+Downloaded documents are kept on disk with their "ETag" and "Last-Modified"
+headers. A cached document is used without any request during its TTL, then
+it is revalidated with a conditional GET so that an unchanged document is not
+downloaded again. Downloads are streamed to a temporary file which replaces
+the cached file only once complete.
+"""
+import json
+import logging
+import os
+import time
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class CachedDownload():
+    """
+    Cache of the document of an URL stored in "path", its metadata are stored in "<path>.meta".
+    """
+
+    def __init__(self, url, path, ttl=300, session=None, timeout=(10, 60), chunk_size=65536):
+        self.url = url
+        self.path = str(path)
+        self.meta_path = self.path + '.meta'
+        self.ttl = ttl
+        self.session = session
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+
+    def load_meta(self):
+        if not os.path.exists(self.path) or not os.path.exists(self.meta_path):
+            return {}
+        try:
+            with open(self.meta_path, 'r') as fo:
+                meta = json.load(fo)
+        except (OSError, ValueError) as e:
+            logger.warning('Failed to read cache metadata "%s": %s', self.meta_path, e)
+            return {}
+        if meta.get('url') != self.url:
+            return {}
+        return meta
+
+    def _write_meta(self, meta):
+        tmp_path = self.meta_path + '.tmp'
+        with open(tmp_path, 'w') as fo:
+            json.dump(meta, fo)
+        os.replace(tmp_path, self.meta_path)
+
+    def _download(self, meta):
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        get = self.session.get if self.session is not None else requests.get
+        with get(self.url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304 and meta:
+                logger.debug('Cached document of "%s" is still valid.', self.url)
+                return False
+            response.raise_for_status()
+            tmp_path = self.path + '.tmp'
+            try:
+                with open(tmp_path, 'wb') as fo:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        fo.write(chunk)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            meta.clear()
+            meta.update(
+                url=self.url,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+            )
+            logger.debug('Document of "%s" downloaded in "%s".', self.url, self.path)
+            return True
+
+    def get_path(self, revalidate=False):
+        """
+        Return the path of the cached document, the document is downloaded or revalidated
+        if needed. If "revalidate" is True, the TTL is ignored.
+        If the server cannot be reached, an expired cached document is used.
+        """
+        meta = self.load_meta()
+        if meta and not revalidate and time.time() - meta.get('checked', 0) < self.ttl:
+            return self.path
+        try:
+            self._download(meta)
+        except requests.RequestException as e:
+            if not meta:
+                raise
+            logger.warning('Failed to revalidate "%s", using cached document: %s', self.url, e)
+            return self.path
+        meta['checked'] = time.time()
+        self._write_meta(meta)
+        return self.path
+
+    def get_json(self, revalidate=False):
+        with open(self.get_path(revalidate), 'r') as fo:
+            return json.load(fo)
@@ -0,0 +1,180 @@
+"""
+Miris Manager indico timetable reader
+This module can be used by scripts importing indico timetables in the calendar of a system.
+
+Indico timetable exports of large conferences can weigh hundreds of MB. The
+export is read incrementally: the outer objects ("results", events and days)
+are walked key by key and only one session is decoded at a time, so the
+memory used does not depend on the size of the file. Timezones and rooms
+names are shared between events.
+"""
+import datetime
+import json
+import logging
+import re
+import sys
+
+from .calendar_sync import CalendarEvent
+
+logger = logging.getLogger(__name__)
+
+WHITESPACE = ' \t\n\r'
+# Characters which can continue a number decoded at the end of the buffer
+NUMBER_TAIL = re.compile(r'[0-9.eE+-]*$')
+
+
+class JSONStreamReader():
+    """
+    Incremental reader of JSON objects from a text file object.
+    """
+
+    def __init__(self, file_obj, chunk_size=65536):
+        self.file_obj = file_obj
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size=None):
+        # Read a new chunk, return False at the end of the file
+        if self.eof:
+            return False
+        chunk = self.file_obj.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop the consumed part of the buffer
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        # Return the next non whitespace character without consuming it ('' at the end of the file)
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f'Invalid JSON: "{char}" expected at position {self.pos}, "{found}" found.')
+        self.pos += 1
+
+    def read_value(self):
+        """
+        Decode the next JSON value.
+        """
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # The value may be incomplete, read more data: the size of the value read is at least
+                # doubled so that large values are not decoded again for each chunk
+                if not self._fill(max(self.chunk_size, len(self.buffer) - self.pos)):
+                    raise
+                continue
+            if not self.eof and self.buffer[self.pos] not in '{["' and NUMBER_TAIL.match(self.buffer, end):
+                # A number may be truncated (for example before its decimal part or its exponent)
+                if self._fill():
+                    continue
+            self.pos = end
+            return value
+
+    def iter_object(self):
+        """
+        Iterate on the keys of the next JSON object. After each key, the value must be consumed with
+        "read_value", "iter_object" or "skip_value".
+        """
+        self._expect('{')
+        if self._peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.read_value()
+            if not isinstance(key, str):
+                raise ValueError('Invalid JSON: object key expected.')
+            self._expect(':')
+            yield key
+            separator = self._peek()
+            self.pos += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise ValueError(f'Invalid JSON: "," or "}}" expected, "{separator}" found.')
+
+    def skip_value(self):
+        if self._peek() == '{':
+            for _key in self.iter_object():
+                self.skip_value()
+        else:
+            self.read_value()
+
+
+class TimezoneCache():
+
+    def __init__(self):
+        self._timezones = {}
+
+    def get(self, name):
+        timezone = self._timezones.get(name)
+        if timezone is None:
+            import zoneinfo  # imported only when used to keep the package import fast
+            timezone = self._timezones[name] = zoneinfo.ZoneInfo(name)
+        return timezone
+
+    def parse(self, value):
+        # Parse indico dates: {"date": "2023-09-20", "time": "09:00:00", "tz": "Europe/Paris"}
+        return datetime.datetime.combine(
+            datetime.date.fromisoformat(value['date']),
+            datetime.time.fromisoformat(value['time']),
+            tzinfo=self.get(value['tz']),
+        )
+
+
+def iter_sessions(file_obj, chunk_size=65536):
+    """
+    Yield tuples (day, session) of an indico timetable export, sessions are decoded one by one.
+    """
+    reader = JSONStreamReader(file_obj, chunk_size)
+    for key in reader.iter_object():
+        if key != 'results':
+            reader.skip_value()
+            continue
+        for _event_id in reader.iter_object():
+            for day in reader.iter_object():
+                for _session_id in reader.iter_object():
+                    yield day, reader.read_value()
+
+
+def iter_indico_events(file_obj, room=None, enabled=False, chunk_size=65536, prefix='indico:'):
+    """
+    Yield the contributions of sessions of an indico timetable export as "CalendarEvent" objects.
+    If "room" is given, only the contributions of this room are yielded.
+    The keys of the events are the contribution ids preceded by "prefix".
+    """
+    timezones = TimezoneCache()
+    for _day, session in iter_sessions(file_obj, chunk_size):
+        if not isinstance(session, dict) or session.get('entryType') != 'Session':
+            continue
+        for entry in (session.get('entries') or {}).values():
+            if entry.get('entryType') != 'Contribution':
+                continue
+            entry_room = sys.intern(entry.get('room') or session.get('title') or 'unknown')
+            if room and entry_room != room:
+                continue
+            yield CalendarEvent(
+                key=prefix + str(entry.get('uniqueId') or entry.get('contributionId') or entry['id']),
+                start=timezones.parse(entry['startDate']),
+                end=timezones.parse(entry['endDate']),
+                title=entry['title'],
+                speaker=', '.join(presenter['name'] for presenter in entry.get('presenters') or []),
+                description=entry.get('description') or '',
+                room=entry_room,
+                enabled=enabled,
+            )
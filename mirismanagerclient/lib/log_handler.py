@@ -0,0 +1,174 @@
+"""
+Miris Manager logging handler
+This module is not intended to be used directly, only the client class should be used.
+
+Log records are forwarded as messages of the system. The handler only puts
+records in a bounded queue (records are dropped if it is full), so logging
+never waits for the server. A background thread sends the messages: the first
+occurrence of a message is sent at once, the identical messages which follow
+it during a time window are merged in a single message with their count and
+the dates of the first and last ones, and the rate of messages is limited.
+"""
+import datetime
+import logging
+import queue
+import threading
+import time
+
+from .rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Message level for each logging level
+MESSAGE_LEVELS = (
+    (logging.ERROR, 'error'),
+    (logging.WARNING, 'warning'),
+    (logging.NOTSET, 'info'),
+)
+_STOP = object()
+
+
+def get_message_level(levelno):
+    for threshold, level in MESSAGE_LEVELS:
+        if levelno >= threshold:
+            return level
+    return 'info'
+
+
+def format_time(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class MergedMessage():
+
+    def __init__(self, level, content, window_end):
+        self.level = level
+        self.content = content
+        self.content_debug = ''
+        # Number of occurrences since the last sent message
+        self.count = 0
+        self.first = None
+        self.last = None
+        self.window_end = window_end
+
+    def add(self, record_time, content_debug):
+        self.count += 1
+        if self.first is None:
+            self.first = record_time
+        self.last = record_time
+        self.content_debug = content_debug
+
+
+class MessageHandler(logging.Handler):
+    """
+    Logging handler sending records as messages with a client instance.
+    "window" is the duration in seconds during which identical messages are merged, "rate" the maximum
+    number of messages sent per second and "burst" the number of messages which can be sent at once.
+    """
+
+    def __init__(self, client, level=logging.WARNING, window=60, rate=0.2, burst=10, queue_size=1000,
+                 max_pending=200):
+        super().__init__(level)
+        self.client = client
+        self.window = window
+        self.max_pending = max_pending
+        self.bucket = TokenBucket(rate, burst)
+        self.dropped = 0
+        self.sent = 0
+        self._queue = queue.Queue(queue_size)
+        # {(level, content): MergedMessage}
+        self._pending = {}
+        self._thread = threading.Thread(target=self._loop, name='mm-log-handler', daemon=True)
+        self._thread.start()
+
+    def emit(self, record):
+        if threading.current_thread() is self._thread:
+            # Records logged while sending messages are ignored to avoid loops
+            return
+        try:
+            content = record.getMessage()
+            content_debug = self.format(record) if record.exc_info or record.stack_info else ''
+            self._queue.put_nowait((record.created, get_message_level(record.levelno), content, content_debug))
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+    def _send(self, level, content, content_debug=''):
+        delay = self.bucket.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            self.client.api_request('ADD_MESSAGE', data=dict(
+                content=content,
+                content_debug=content_debug,
+                level=level,
+            ))
+        except Exception as e:
+            logger.warning('Unable to send log message: %s', e)
+        else:
+            self.sent += 1
+
+    def _send_merged(self, message):
+        if message.count == 1:
+            content = message.content
+        else:
+            content = '%s\n(%s times from %s to %s)' % (
+                message.content, message.count, format_time(message.first), format_time(message.last))
+        self._send(message.level, content, message.content_debug)
+
+    def _add(self, record_time, level, content, content_debug):
+        key = (level, content)
+        message = self._pending.get(key)
+        if message is not None:
+            message.add(record_time, content_debug)
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending[key] = MergedMessage(level, content, time.monotonic() + self.window)
+        self._send(level, content, content_debug)
+
+    def _flush_pending(self, force=False):
+        now = time.monotonic()
+        for key, message in list(self._pending.items()):
+            if not force and message.window_end > now:
+                continue
+            if message.count:
+                self._send_merged(message)
+            if message.count and not force:
+                # Messages are still repeated: keep merging them
+                message.count = 0
+                message.first = message.last = None
+                message.window_end = now + self.window
+            else:
+                del self._pending[key]
+
+    def _loop(self):
+        while True:
+            if self._pending:
+                timeout = max(0, min(message.window_end for message in self._pending.values()) - time.monotonic())
+            else:
+                timeout = None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._flush_pending(force=True)
+                return
+            if item is not None:
+                self._add(*item)
+            self._flush_pending()
+
+    def close(self, timeout=5):
+        """
+        Send the pending merged messages and stop the background thread.
+        """
+        if self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+        super().close()
@@ -1,6 +1,20 @@
 """
 Miris Manager long polling management
 This module is not intended to be used directly, only the client class should be used.
+
+In streaming mode ("LONG_POLLING_STREAM" setting), the server can send several
+signed commands through the same long polling connection, either as
+newline delimited JSON or as server-sent events. A server answering with a
+single JSON document is handled like in the default one-shot mode.
+
+The long polling read timeout can be adaptive: some NAT and proxies silently
+drop idle connections long before the end of the long polling request, so the
+timeout is lowered below the idle duration after which a connection has been
+dropped and raised again progressively while connections survive.
+
+When "COMMAND_WORKERS" is set, received commands are run by a scheduler
+(see scheduler module) instead of being run one after the other in the
+long polling thread.
 """
 import logging
 import os
@@ -9,10 +23,104 @@ import sys
 import time
 import traceback
 
+import requests
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+
+from ..client import MirisManagerRequestError
+from .scheduler import CommandScheduler
 from .signing import check_signature
 
 logger = logging.getLogger(__name__)
 
+STREAM_ACCEPT = 'application/x-ndjson, text/event-stream;q=0.9, application/json;q=0.5'
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/jsonl', 'application/json-seq')
+SSE_CONTENT_TYPE = 'text/event-stream'
+
+
+class LongPollingCommandError(Exception):
+    pass
+
+
+def classify_error(error):
+    """
+    Get the kind of a long polling request error: "timeout" (no command received before the read
+    timeout), "dropped" (connection closed by the network or the server) or "error".
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return 'error'
+    if isinstance(error, requests.exceptions.ReadTimeout):
+        return 'timeout'
+    if isinstance(error, requests.exceptions.ChunkedEncodingError):
+        return 'dropped'
+    if isinstance(error, requests.exceptions.ConnectionError):
+        reason = error.args[0] if error.args else None
+        if isinstance(reason, ReadTimeoutError):
+            # Read timeout of a streamed response
+            return 'timeout'
+        if isinstance(reason, ProtocolError):
+            return 'dropped'
+    return 'error'
+
+
+class LongPollingTimeout():
+    # Number of successful requests after which a longer timeout is tried again
+    PROBE_AFTER = 10
+
+    def __init__(self, max_timeout=300, min_timeout=30, adaptive=True):
+        self.max_timeout = max_timeout
+        self.min_timeout = min(min_timeout, max_timeout)
+        self.adaptive = adaptive
+        self.value = max_timeout
+        # Largest idle duration survived by a connection
+        self.survived = 0
+        # Shortest idle duration after which a connection has been dropped
+        self.ceiling = None
+        self._successes = 0
+
+    def on_success(self, duration):
+        # The connection was still open after being idle for "duration" seconds
+        self.survived = max(self.survived, duration)
+        if self.ceiling is not None and duration >= self.ceiling:
+            self.ceiling = None
+        if not self.adaptive:
+            return
+        self._successes += 1
+        if self.ceiling is not None and self._successes >= self.PROBE_AFTER:
+            # The network path may have changed
+            self.ceiling *= 1.25
+            self._successes = 0
+        limit = self.max_timeout if self.ceiling is None else self.ceiling * 0.8
+        self.value = max(self.min_timeout, min(limit, self.max_timeout, self.value * 1.25))
+
+    def on_dropped(self, duration):
+        # The connection was dropped after being idle for "duration" seconds
+        self.ceiling = duration if self.ceiling is None else min(self.ceiling, duration)
+        self._successes = 0
+        if self.adaptive:
+            self.value = max(self.min_timeout, min(self.value, duration * 0.8))
+
+
+def iter_ndjson_commands(req, codec):
+    for line in req.iter_lines():
+        line = line.strip().lstrip(b'\x1e')  # "application/json-seq" uses a record separator
+        if line:
+            yield codec.loads(line)
+
+
+def iter_sse_commands(req, codec):
+    data_lines = []
+    for line in req.iter_lines():
+        if not line:
+            # An empty line ends an event
+            if data_lines:
+                yield codec.loads(b'\n'.join(data_lines))
+                data_lines = []
+        elif line.startswith(b'data:'):
+            data_lines.append(line[5:].lstrip(b' '))
+        # Comments (keep alive) and other fields are ignored
+    if data_lines:
+        yield codec.loads(b'\n'.join(data_lines))
+
 
 class LongPollingManager():
 
@@ -21,16 +129,43 @@ class LongPollingManager():
         self.run_systemd_notify = False
         self.last_error = None
         self.loop_running = False
+        self.stream_supported = None
+        self.scheduler = None
+        conf = client.conf
+        self.timeout = LongPollingTimeout(
+            conf['LONG_POLLING_TIMEOUT'], conf['LONG_POLLING_MIN_TIMEOUT'], conf['LONG_POLLING_ADAPTIVE_TIMEOUT'])
+
+    def get_scheduler(self):
+        conf = self.client.conf
+        if not conf.get('COMMAND_WORKERS'):
+            return None
+        if self.scheduler is None:
+            # Settings given when registering actions override the configuration ones
+            actions = self.client.actions
+            self.scheduler = CommandScheduler(
+                execute=self.execute_command,
+                report=self.client.set_command_status,
+                workers=conf['COMMAND_WORKERS'],
+                priorities=dict(conf.get('ACTION_PRIORITIES') or {}, **actions.get_scheduling('priority')),
+                concurrency=dict(conf.get('ACTION_CONCURRENCY') or {}, **actions.get_scheduling('concurrency')),
+                timeouts=dict(conf.get('ACTION_TIMEOUTS') or {}, **actions.get_scheduling('timeout')),
+                default_timeout=conf.get('COMMAND_TIMEOUT'),
+            )
+        self.scheduler.start()
+        return self.scheduler
 
     def loop(self, single_loop=False):
         # Check if systemd-notify should be called
         self.run_systemd_notify = self.client.conf.get('WATCHDOG') and os.system('which systemd-notify') == 0
         # Start connection loop
-        logger.info('Starting long polling to %s', self.client.conf['SERVER_URL'])
+        logger.info('Starting long polling to %s', self.client.get_server_url())
         self.loop_running = True
+        scheduler = self.get_scheduler()
 
         def exit_handler(*args, **kwargs):
             self.loop_running = False
+            if scheduler:
+                scheduler.stop()
             logger.info('Long polling loop stopped')
             sys.exit(1)
 
@@ -48,46 +183,123 @@ class LongPollingManager():
                 if duration < 5:
                     time.sleep(5 - duration)
 
+    def get_read_timeout(self):
+        if len(self.client.endpoints) > 1:
+            # The request is made again at each servers check so that a switch to another server is applied
+            # within seconds, even if the current server hangs without closing the connection
+            return min(self.timeout.value, self.client.conf['SERVER_CHECK_INTERVAL'])
+        return self.timeout.value
+
+    def iter_commands(self):
+        """
+        Make a long polling request and yield received commands.
+        """
+        timeout = (self.client.conf['TIMEOUT'], self.get_read_timeout())
+        if self.client.conf.get('LONG_POLLING_STREAM') and self.stream_supported is not False:
+            try:
+                req = self.client.api_stream('LONG_POLLING', headers={'Accept': STREAM_ACCEPT}, timeout=timeout)
+            except MirisManagerRequestError as e:
+                if e.status_code not in (400, 406):
+                    raise
+                logger.info('Long polling streaming is not supported by the server, using one-shot requests.')
+                self.stream_supported = False
+            else:
+                try:
+                    content_type = req.headers.get('Content-Type', '').split(';')[0].strip().lower()
+                    if content_type in NDJSON_CONTENT_TYPES:
+                        self.stream_supported = True
+                        yield from iter_ndjson_commands(req, self.client.codec)
+                    elif content_type == SSE_CONTENT_TYPE:
+                        self.stream_supported = True
+                        yield from iter_sse_commands(req, self.client.codec)
+                    else:
+                        # One-shot response
+                        yield self.client._parse_response(req)
+                finally:
+                    req.close()
+                return
+        yield self.client.api_request('LONG_POLLING', timeout=timeout)
+
     def call_long_polling(self):
-        success = False
+        received = failed = False
+        last_activity = time.monotonic()
+        read_timeout = self.get_read_timeout()
         try:
-            logger.debug('Make long polling request')
-            response = self.client.api_request('LONG_POLLING', timeout=300)
+            logger.debug('Make long polling request (read timeout: %ss)', read_timeout)
+            for response in self.iter_commands():
+                self.last_error = None
+                self.timeout.on_success(time.monotonic() - last_activity)
+                if response:
+                    logger.info('Received long polling response: %s', response)
+                    received = True
+                    if not self.run_command(response):
+                        failed = True
+                last_activity = time.monotonic()
+        except LongPollingCommandError:
+            raise
         except Exception as e:
-            if 'timeout=300' not in str(e):
+            idle = time.monotonic() - last_activity
+            kind = classify_error(e)
+            if kind == 'timeout' and idle < read_timeout * 0.9:
+                # A connection dropped silently is detected by TCP keepalive as a timeout
+                kind = 'dropped'
+            if kind == 'timeout':
+                logger.debug('No command received in %ss.', read_timeout)
+                self.timeout.on_success(idle)
+            elif kind == 'dropped':
+                self.timeout.on_dropped(idle)
+                logger.info(
+                    'Long polling connection dropped after %.0fs without activity (%s), read timeout set to %.0fs.',
+                    idle, e.__class__.__name__, self.timeout.value)
+            else:
                 msg = 'Long polling connection failed: %s: %s' % (e.__class__.__name__, e)
                 if self.last_error == e.__class__.__name__:
                     logger.debug(msg)  # Avoid spamming
                 else:
                     logger.warning(msg)
                     self.last_error = e.__class__.__name__
-        else:
-            self.last_error = None
-            if response:
-                logger.info('Received long polling response: %s', response)
-                success = True
-                uid = response.get('uid')
-                try:
-                    status, data = self.process_long_polling(response)
-                except Exception as e:
-                    success = False
-                    logger.warning('Failed to process response: %s\n%s', e, traceback.format_exc())
-                    self.client.set_command_status(uid, 'FAILED', str(e))
-                    if os.environ.get('CI_PIPELINE_ID'):
-                        # Propagate exception so that it can be detected in CI
-                        raise
-                else:
-                    self.client.set_command_status(uid, status, data)
         finally:
             if self.run_systemd_notify:
                 logger.debug('Notifying systemd watchdog.')
                 os.system('systemd-notify WATCHDOG=1')
-        return success
+        return received and not failed
+
+    def run_command(self, response):
+        uid = response.get('uid')
+        try:
+            if self.scheduler is not None:
+                action, params, result = self.check_command(response)
+                if result is None:
+                    # The status is sent by the scheduler when the command is completed
+                    self.scheduler.submit(uid, action, params)
+                    return True
+                status, data = result
+            else:
+                status, data = self.process_long_polling(response)
+        except Exception as e:
+            logger.warning('Failed to process response: %s\n%s', e, traceback.format_exc())
+            self.client.set_command_status(uid, 'FAILED', str(e))
+            if os.environ.get('CI_PIPELINE_ID'):
+                # Propagate exception so that it can be detected in CI
+                raise LongPollingCommandError(str(e)) from e
+            return False
+        self.client.set_command_status(uid, status, data)
+        return True
 
     def process_long_polling(self, response):
+        action, params, result = self.check_command(response)
+        if result is not None:
+            return result
+        return self.execute_command(response.get('uid'), action, params)
+
+    def check_command(self, response):
+        """
+        Check a received command and return a tuple: (action, params, result).
+        "result" is the tuple (status, data) to send if the command should not be run, None otherwise.
+        """
         logger.debug('Processing response.')
         if self.client.conf.get('API_KEY'):
-            invalid = check_signature(self.client.conf, response)
+            invalid = check_signature(self.client.conf, response, self.client.clock.get_offset())
             if invalid:
                 raise ValueError('Invalid signature: %s' % invalid)
         uid = response.get('uid')
@@ -97,7 +309,16 @@ class LongPollingManager():
         params = response.get('params', {})
         logger.debug('Received command "%s": %s.', uid, action)
         if action == 'PING':
-            return 'DONE', ''
+            return action, params, ('DONE', '')
+        previous = self.client.command_history.get(uid)
+        if previous is not None:
+            logger.info('Command "%s" has already been received, sending its last status again.', uid)
+            return action, params, previous
+        # Mark the command as being processed (not saved in file to run it again if the process is restarted)
+        self.client.command_history.set(uid, 'IN_PROGRESS', '', persistent=False)
+        return action, params, None
+
+    def execute_command(self, uid, action, params):
         status, data = self.client.handle_action(uid=uid, action=action, params=params)
         if status not in ('DONE', 'IN_PROGRESS', 'FAILED'):
             logger.warning('Your client has returned an invalid status in "handle_action".')
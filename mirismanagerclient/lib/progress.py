@@ -0,0 +1,196 @@
+"""
+Miris Manager commands progress tracking
+This module is not intended to be used directly, only the client class should be used.
+
+Commands answered with the "IN_PROGRESS" status are completed later by the
+application. The progress updates of a command are coalesced: only the last
+one is sent, at most once per interval. Final statuses are sent as soon as
+possible and retried until they are delivered. Undelivered final statuses can
+be saved in a file to be sent again after a restart.
+"""
+from collections import OrderedDict
+import json
+import logging
+import os
+from pathlib import Path
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def is_retryable(error):
+    # Network errors and server errors (5xx) are temporary, other rejections (4xx) are permanent
+    status_code = getattr(error, 'status_code', None)
+    if status_code is None:
+        return True
+    return status_code >= 500 or status_code in (408, 429)
+
+
+class CommandProgress():
+    """
+    Progress handle of a command, it can be used from any thread.
+    """
+
+    def __init__(self, tracker, uid):
+        self.tracker = tracker
+        self.uid = uid
+        self.completed = False
+
+    def update(self, data=''):
+        # Updates received after the final status are ignored
+        if not self.completed:
+            self.tracker.update(self.uid, data)
+
+    def done(self, data=''):
+        self.completed = True
+        self.tracker.finish(self.uid, 'DONE', data)
+
+    def failed(self, data=''):
+        self.completed = True
+        self.tracker.finish(self.uid, 'FAILED', data)
+
+
+class CommandTracker():
+
+    def __init__(self, send, interval=2, retry_delay=5, max_retry_delay=300, path=None):
+        # "send" is called with (uid, status, data) and must raise an exception if the status is not delivered
+        self.send = send
+        self.interval = interval
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.path = Path(path) if path else None
+        # {uid: data}
+        self._progress = OrderedDict()
+        # {uid: [status, data, attempts, due]}
+        self._finals = OrderedDict()
+        # {uid: last progress sending time}
+        self._last_sent = {}
+        self._sending = 0
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self.load()
+
+    def load(self):
+        if not self.path or not self.path.exists():
+            return
+        try:
+            content = json.loads(self.path.read_text())
+            finals = [(uid, status, data) for uid, status, data in content]
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning('Unable to read commands statuses file "%s": %s', self.path, e)
+            return
+        with self._condition:
+            for uid, status, data in finals:
+                self._finals[uid] = [status, data, 0, 0]
+        if finals:
+            logger.info('%s undelivered commands statuses loaded from "%s".', len(finals), self.path)
+            self._start()
+
+    def save(self):
+        if not self.path:
+            return
+        with self._condition:
+            content = [[uid, final[0], final[1]] for uid, final in self._finals.items()]
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        try:
+            tmp_path.write_text(json.dumps(content))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning('Unable to write commands statuses file "%s": %s', self.path, e)
+
+    def track(self, uid):
+        return CommandProgress(self, uid)
+
+    def update(self, uid, data=''):
+        with self._condition:
+            if uid in self._finals:
+                logger.debug('Ignoring progress of command "%s" because it is completed.', uid)
+                return
+            self._progress[uid] = data or ''
+            self._condition.notify_all()
+        self._start()
+
+    def finish(self, uid, status, data=''):
+        with self._condition:
+            self._progress.pop(uid, None)
+            self._last_sent.pop(uid, None)
+            self._finals[uid] = [status, data or '', 0, 0]
+            self._condition.notify_all()
+        self.save()
+        self._start()
+
+    def flush(self, timeout=None):
+        """
+        Wait until all updates and final statuses are sent. Return False if the timeout is reached.
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._progress and not self._finals and not self._sending, timeout)
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+    def _start(self):
+        with self._condition:
+            if self._thread is not None or self._stopped:
+                return
+            self._thread = threading.Thread(target=self._loop, name='mm-command-tracker', daemon=True)
+            self._thread.start()
+
+    def _next_item(self):
+        # Return (uid, status, data, next wake up time), final statuses are sent first
+        now = time.monotonic()
+        wake_up = None
+        for uid, (status, data, _attempts, due) in self._finals.items():
+            if due <= now:
+                return uid, status, data, None
+            wake_up = due if wake_up is None else min(wake_up, due)
+        for uid, data in self._progress.items():
+            due = self._last_sent.get(uid, 0) + self.interval
+            if due <= now:
+                del self._progress[uid]
+                self._last_sent[uid] = now
+                return uid, 'IN_PROGRESS', data, None
+            wake_up = due if wake_up is None else min(wake_up, due)
+        return None, None, None, wake_up
+
+    def _loop(self):
+        while True:
+            with self._condition:
+                while True:
+                    if self._stopped:
+                        return
+                    uid, status, data, wake_up = self._next_item()
+                    if uid is not None:
+                        break
+                    self._condition.wait(None if wake_up is None else max(0, wake_up - time.monotonic()))
+                self._sending += 1
+            try:
+                self.send(uid, status, data)
+            except Exception as e:
+                delivered = False
+                retryable = is_retryable(e)
+                if retryable:
+                    logger.warning('Unable to send status "%s" of command "%s": %s', status, uid, e)
+                else:
+                    logger.error('Status "%s" of command "%s" rejected by the server, dropping it: %s', status, uid, e)
+            else:
+                delivered = True
+                retryable = False
+            with self._condition:
+                final = self._finals.get(uid)
+                if status != 'IN_PROGRESS' and final is not None and final[0] == status:
+                    if delivered or not retryable:
+                        del self._finals[uid]
+                    else:
+                        final[2] += 1
+                        final[3] = time.monotonic() + min(self.max_retry_delay, self.retry_delay * 2 ** (final[2] - 1))
+            if (delivered or not retryable) and status != 'IN_PROGRESS':
+                self.save()
+            with self._condition:
+                self._sending -= 1
+                self._condition.notify_all()
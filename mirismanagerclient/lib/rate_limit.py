@@ -0,0 +1,89 @@
+"""
+Miris Manager API calls rate limiting
+This module is not intended to be used directly, only the client class should be used.
+
+API calls are limited with one token bucket per class of route (status, messages,
+uploads, reads...). A call that exceeds the rate of its class is delayed, not
+rejected. Delays are reserved under a lock and then waited without it, so
+buckets can be shared by threads and by asyncio tasks.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket():
+
+    def __init__(self, rate, burst):
+        if rate <= 0 or burst < 1:
+            raise ValueError(f'Invalid token bucket settings: rate={rate}, burst={burst}.')
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a token and return the duration to wait before using it.
+        The tokens count can be negative: it is the list of calls waiting for a token.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self.rate
+
+
+class RateLimiter():
+
+    def __init__(self, limits):
+        # "limits" is a dict: {rate class: {'rate': tokens per second, 'burst': max tokens} or None}
+        self.buckets = {}
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        for rate_class, limit in (limits or {}).items():
+            if limit:
+                self.buckets[rate_class] = TokenBucket(limit['rate'], limit.get('burst', 1))
+                self._stats[rate_class] = {'calls': 0, 'delayed': 0, 'delay': 0.0}
+
+    def _reserve(self, rate_class):
+        bucket = self.buckets.get(rate_class) if rate_class else None
+        if bucket is None:
+            return 0
+        delay = bucket.reserve()
+        with self._stats_lock:
+            stats = self._stats[rate_class]
+            stats['calls'] += 1
+            if delay > 0:
+                stats['delayed'] += 1
+                stats['delay'] += delay
+        if delay > 1:
+            logger.info('Too many "%s" API calls, the call is delayed by %.1fs.', rate_class, delay)
+        return delay
+
+    def acquire(self, rate_class):
+        """
+        Wait until a call of the given class is allowed. Return the waited duration.
+        """
+        delay = self._reserve(rate_class)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self, rate_class):
+        import asyncio  # imported only when used because asyncio is slow to import
+        delay = self._reserve(rate_class)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def get_stats(self):
+        # Return the number of calls, of delayed calls and the total delay per rate class
+        with self._stats_lock:
+            return {rate_class: dict(stats) for rate_class, stats in self._stats.items()}
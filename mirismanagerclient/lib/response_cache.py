@@ -0,0 +1,114 @@
+"""
+Miris Manager responses cache
+This module is not intended to be used directly, only the client class should be used.
+
+Responses of read only API calls are kept in a bounded LRU cache during the
+TTL of their route. Once expired, entries having an "ETag" or a
+"Last-Modified" value are revalidated with a conditional request.
+"""
+from collections import OrderedDict
+import copy
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry():
+    __slots__ = ('response', 'expires', 'etag', 'last_modified')
+
+    def __init__(self, response, expires, etag=None, last_modified=None):
+        self.response = response
+        self.expires = expires
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def is_fresh(self):
+        return time.monotonic() < self.expires
+
+    def get_validators(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache():
+
+    def __init__(self, max_size=128):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    @staticmethod
+    def make_key(route_name, url, params=None):
+        if params:
+            params = tuple(sorted((str(key), str(val)) for key, val in params.items()))
+        return (route_name, url, params or None)
+
+    def get(self, key):
+        # Get an entry, even if it is expired (it can be revalidated)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if entry.is_fresh():
+                self.hits += 1
+            return entry
+
+    def get_response(self, entry):
+        # Return a copy to avoid changes of the cached response by callers
+        return copy.deepcopy(entry.response)
+
+    def _add(self, key, entry):
+        # Add an entry as the most recently used one and evict the least recently used ones, the caller must
+        # hold the lock
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def store(self, key, response, ttl, headers=None):
+        headers = headers or {}
+        entry = CacheEntry(
+            copy.deepcopy(response),
+            time.monotonic() + ttl,
+            etag=headers.get('ETag'),
+            last_modified=headers.get('Last-Modified'),
+        )
+        with self._lock:
+            self._add(key, entry)
+
+    def refresh(self, key, entry, ttl, headers=None):
+        # Called when the server confirms that the response has not changed (HTTP 304)
+        headers = headers or {}
+        with self._lock:
+            self.revalidations += 1
+            entry.expires = time.monotonic() + ttl
+            entry.etag = headers.get('ETag') or entry.etag
+            entry.last_modified = headers.get('Last-Modified') or entry.last_modified
+            # The entry may have been evicted during the request
+            self._add(key, entry)
+
+    def invalidate(self, route_names):
+        with self._lock:
+            keys = [key for key in self._entries if key[0] in route_names]
+            for key in keys:
+                del self._entries[key]
+        if keys:
+            logger.debug('%s cached responses invalidated (%s).', len(keys), ', '.join(route_names))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,124 @@
+"""
+Miris Manager API routes table
+This module is not intended to be used directly, only the client class should be used.
+
+The "API_CALLS" configuration is compiled into an immutable table of routes.
+The routes of the base configuration are compiled only once and shared by all
+client instances, only overridden routes are compiled for each instance.
+"""
+import logging
+import types
+
+from ..conf import BASE_CONF
+
+logger = logging.getLogger(__name__)
+
+
+class Route():
+    """
+    Immutable description of an API call.
+    A route without method uses the method given to the API request ("get" by default).
+    """
+    __slots__ = (
+        'name', 'method', 'url', 'anonymous', 'idempotent', 'timeout', 'cache_ttl', 'invalidates', 'rate_class'
+    )
+
+    def __init__(self, name, url, method=None, anonymous=False, idempotent=None, timeout=None,
+                 cache_ttl=None, invalidates=None, rate_class=None):
+        method = method.lower() if method else None
+        if idempotent is None:
+            idempotent = method in (None, 'get', 'head', 'options')
+        if cache_ttl is not None and method not in (None, 'get'):
+            raise ValueError(f'Only GET API calls can be cached, "{name}" uses {method}.')
+        for key, value in (
+            ('name', name),
+            ('method', method),
+            ('url', url),
+            ('anonymous', bool(anonymous)),
+            ('idempotent', bool(idempotent)),
+            ('timeout', timeout),
+            ('cache_ttl', cache_ttl),
+            ('invalidates', tuple(invalidates or ())),
+            ('rate_class', rate_class),
+        ):
+            object.__setattr__(self, key, value)
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f'Route "{self.name}" is immutable.')
+
+    def __delattr__(self, key):
+        raise AttributeError(f'Route "{self.name}" is immutable.')
+
+    def __repr__(self):
+        return f'<Route {self.name}: {self.method} {self.url}>'
+
+    def __eq__(self, other):
+        if not isinstance(other, Route):
+            return NotImplemented
+        return all(getattr(self, key) == getattr(other, key) for key in self.__slots__)
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, key) for key in self.__slots__))
+
+    # Dict like access kept for compatibility with code using the "API_CALLS" dicts
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        if key not in self.__slots__:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def replace(self, **changes):
+        kwargs = {key: getattr(self, key) for key in self.__slots__}
+        kwargs.update(changes)
+        return Route(**kwargs)
+
+
+def compile_route(name, definition):
+    if isinstance(definition, Route):
+        return definition
+    if not isinstance(definition, dict) or not definition.get('url'):
+        raise ValueError(f'Invalid definition for API call "{name}": {definition}.')
+    kwargs = {key: val for key, val in definition.items() if key in Route.__slots__ and key != 'name'}
+    unknown = set(definition) - set(Route.__slots__)
+    if unknown:
+        logger.debug('Ignoring unknown keys in definition of API call "%s": %s.', name, ', '.join(sorted(unknown)))
+    return Route(name, **kwargs)
+
+
+def _compile_base_routes():
+    return {name: compile_route(name, definition) for name, definition in BASE_CONF['API_CALLS'].items()}
+
+
+BASE_ROUTES = types.MappingProxyType(_compile_base_routes())
+
+
+def build_routes(api_calls):
+    """
+    Get an immutable routes table for the given "API_CALLS" configuration.
+    Routes identical to the base ones are shared between all tables.
+    """
+    routes = {}
+    for name, definition in (api_calls or {}).items():
+        base_route = BASE_ROUTES.get(name)
+        if base_route is not None and definition == BASE_CONF['API_CALLS'][name]:
+            routes[name] = base_route
+        else:
+            routes[name] = compile_route(name, definition)
+    return types.MappingProxyType(routes)
+
+
+def override_routes(routes, name, **changes):
+    """
+    Get a new routes table with the given route added or modified.
+    """
+    table = dict(routes)
+    if name in table:
+        table[name] = table[name].replace(**changes)
+    else:
+        table[name] = compile_route(name, changes)
+    return types.MappingProxyType(table)
@@ -0,0 +1,194 @@
+"""
+Miris Manager commands scheduler
+This module is not intended to be used directly, only the client class should be used.
+
+Received commands are queued by priority (lower values first) and run by a
+pool of worker threads. The number of commands of an action running at the
+same time can be limited, and a command running for longer than the timeout
+of its action is reported as failed. Urgent commands (priority lower than or
+equal to "urgent_priority") never wait for a free worker.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledCommand():
+    __slots__ = ('uid', 'action', 'params', 'priority', 'queued', 'started', 'reported', 'lock')
+
+    def __init__(self, uid, action, params, priority):
+        self.uid = uid
+        self.action = action
+        self.params = params
+        self.priority = priority
+        self.queued = time.monotonic()
+        self.started = None
+        self.reported = False
+        self.lock = threading.Lock()
+
+    def claim_report(self):
+        # Return True only for the first caller, the status of a command is reported once
+        with self.lock:
+            if self.reported:
+                return False
+            self.reported = True
+            return True
+
+
+class CommandScheduler():
+
+    def __init__(self, execute, report, workers=4, priorities=None, concurrency=None, timeouts=None,
+                 default_priority=5, default_timeout=None, urgent_priority=0):
+        # "execute" is called with (uid, action, params) and returns a tuple (status, data)
+        # "report" is called with (uid, status, data)
+        self.execute = execute
+        self.report = report
+        self.workers_count = workers
+        self.priorities = priorities or {}
+        self.concurrency = concurrency or {}
+        self.timeouts = timeouts or {}
+        self.default_priority = default_priority
+        self.default_timeout = default_timeout
+        self.urgent_priority = urgent_priority
+        self._queue = []
+        self._deferred = {}
+        self._running = {}
+        self._pending = 0
+        self._idle_workers = 0
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._stats = {}
+        self._workers = []
+        self._stopped = False
+
+    def start(self):
+        with self._condition:
+            self._stopped = False
+            while len(self._workers) < self.workers_count:
+                worker = threading.Thread(
+                    target=self._worker_loop, name='mm-command-%s' % len(self._workers), daemon=True)
+                self._workers.append(worker)
+                worker.start()
+
+    def stop(self):
+        # The running commands are completed, the queued ones are dropped
+        with self._condition:
+            self._stopped = True
+            dropped = self._queue + [entry for entries in self._deferred.values() for entry in entries]
+            self._queue = []
+            self._deferred = {}
+            self._pending -= len(dropped)
+            self._condition.notify_all()
+        if dropped:
+            logger.warning(
+                'Scheduler stopped, %s queued commands dropped: %s.',
+                len(dropped), ', '.join(command.uid for _priority, _index, command in dropped))
+
+    def submit(self, uid, action, params):
+        command = ScheduledCommand(uid, action, params, self.priorities.get(action, self.default_priority))
+        with self._condition:
+            self._pending += 1
+            if command.priority <= self.urgent_priority and not self._idle_workers and self._can_run(command):
+                # Do not wait for a worker to be available
+                self._running[action] = self._running.get(action, 0) + 1
+                logger.debug('Running urgent command "%s" (%s) in a dedicated thread.', uid, action)
+                threading.Thread(target=self._run, args=(command, ), daemon=True).start()
+                return command
+            heapq.heappush(self._queue, (command.priority, next(self._counter), command))
+            self._condition.notify()
+        return command
+
+    def wait_idle(self, timeout=None):
+        """
+        Wait until all submitted commands are completed. Return False if the timeout is reached.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._pending == 0, timeout)
+
+    def _can_run(self, command):
+        limit = self.concurrency.get(command.action)
+        return not limit or self._running.get(command.action, 0) < limit
+
+    def _worker_loop(self):
+        while True:
+            with self._condition:
+                self._idle_workers += 1
+                while not self._queue and not self._stopped:
+                    self._condition.wait()
+                self._idle_workers -= 1
+                if self._stopped:
+                    return
+                entry = heapq.heappop(self._queue)
+                command = entry[2]
+                if not self._can_run(command):
+                    # Wait for a command of the same action to finish, deferred commands are kept ordered by priority
+                    heapq.heappush(self._deferred.setdefault(command.action, []), entry)
+                    continue
+                self._running[command.action] = self._running.get(command.action, 0) + 1
+            self._run(command)
+
+    def _run(self, command):
+        command.started = time.monotonic()
+        timeout = self.timeouts.get(command.action, self.default_timeout)
+        timer = None
+        if timeout:
+            timer = threading.Timer(timeout, self._on_timeout, args=(command, timeout))
+            timer.daemon = True
+            timer.start()
+        try:
+            status, data = self.execute(command.uid, command.action, command.params)
+        except Exception as e:
+            logger.warning('Failed to process command "%s": %s\n%s', command.uid, e, traceback.format_exc())
+            status, data = 'FAILED', str(e)
+        finally:
+            if timer:
+                timer.cancel()
+        if command.claim_report():
+            self.report(command.uid, status, data)
+        else:
+            logger.warning(
+                'Command "%s" (%s) completed after its timeout with status %s, the status is not sent.',
+                command.uid, command.action, status)
+        self._done(command)
+
+    def _on_timeout(self, command, timeout):
+        if command.claim_report():
+            logger.warning('Command "%s" (%s) has not completed in %ss.', command.uid, command.action, timeout)
+            with self._condition:
+                self._get_action_stats(command.action)['timeouts'] += 1
+            self.report(command.uid, 'FAILED', 'The command has not completed in %ss.' % timeout)
+
+    def _get_action_stats(self, action):
+        return self._stats.setdefault(action, {
+            'count': 0, 'timeouts': 0, 'wait_time': 0.0, 'max_wait_time': 0.0, 'run_time': 0.0, 'max_run_time': 0.0
+        })
+
+    def _done(self, command):
+        now = time.monotonic()
+        wait_time = command.started - command.queued
+        run_time = now - command.started
+        with self._condition:
+            stats = self._get_action_stats(command.action)
+            stats['count'] += 1
+            stats['wait_time'] += wait_time
+            stats['max_wait_time'] = max(stats['max_wait_time'], wait_time)
+            stats['run_time'] += run_time
+            stats['max_run_time'] = max(stats['max_run_time'], run_time)
+            self._running[command.action] -= 1
+            deferred = self._deferred.get(command.action)
+            if deferred:
+                heapq.heappush(self._queue, heapq.heappop(deferred))
+            self._pending -= 1
+            self._condition.notify_all()
+        logger.debug(
+            'Command "%s" (%s) completed: waited %.3fs, ran %.3fs.', command.uid, command.action, wait_time, run_time)
+
+    def get_stats(self):
+        # Return the number of commands, of timeouts, and the total and max wait and run times per action
+        with self._condition:
+            return {action: dict(stats) for action, stats in self._stats.items()}
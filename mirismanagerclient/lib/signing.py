@@ -11,10 +11,18 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-def get_signature(conf):
+def _utcnow(offset=0):
+    # "offset" is the estimated difference in seconds between the server clock and the local clock
+    utcnow = datetime.datetime.now(datetime.UTC)
+    if offset:
+        utcnow += datetime.timedelta(seconds=offset)
+    return utcnow
+
+
+def get_signature(conf, offset=0):
     if not conf.get('SECRET_KEY') or not conf.get('API_KEY'):
         return {}
-    utime = datetime.datetime.now(datetime.UTC).strftime('%Y-%m-%d_%H-%M-%S_%f')
+    utime = _utcnow(offset).strftime('%Y-%m-%d_%H-%M-%S_%f')
     to_sign = 'time=%s|api_key=%s' % (utime, conf['API_KEY'])
     hm = hmac.new(
         conf['SECRET_KEY'].encode('utf-8'),
@@ -25,7 +33,7 @@ def get_signature(conf):
     return {'time': utime, 'hmac': hm}
 
 
-def check_signature(conf, rdata):
+def check_signature(conf, rdata, offset=0):
     if not conf.get('SECRET_KEY') or not conf.get('API_KEY'):
         return None
     remote_time = rdata.get('time')
@@ -40,9 +48,9 @@ def check_signature(conf, rdata):
         rhmac = base64.b64decode(remote_hmac)
     except Exception:
         return 'the received hmac is invalid.'
-    utcnow = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+    utcnow = _utcnow(offset).replace(tzinfo=None)
     diff = utcnow - rdate if utcnow > rdate else rdate - utcnow
-    if diff.seconds > 300:
+    if diff.total_seconds() > 300:
         return 'the difference between the request time and the current time is too large.'
     to_sign = 'time=%s|api_key=%s' % (remote_time, conf['API_KEY'])
     hm = hmac.new(
@@ -113,6 +113,8 @@ class SSHTunnelManager():
         ]
         self.loop_ssh_tunnel = False
         self.process = None
+        # URL of the server to which the tunnel is established
+        self.server_url = None
         self.stdout_queue = None
         self.stdout_reader = None
         self.stderr_reader = None
@@ -129,7 +131,8 @@ class SSHTunnelManager():
     def establish_tunnel(self):
         public_key = None
         response = None
-        logger.debug('Establishing new tunnel to %s', self.client.conf['SERVER_URL'])
+        self.server_url = self.client.get_server_url()
+        logger.debug('Establishing new tunnel to %s', self.server_url)
         self._stop_reader()
         self._try_closing_process()
         self.update_ssh_state('state', 'prepare tunnel')
@@ -141,7 +144,7 @@ class SSHTunnelManager():
             self.update_ssh_state('state', 'prepare tunnel failed')
             self.update_ssh_state('control_port', 0)
             self.update_ssh_state('maintenance_port', 0)
-            self.update_ssh_state('command', ['PREPARE_TUNNEL', self.client.conf['SERVER_URL']])
+            self.update_ssh_state('command', ['PREPARE_TUNNEL', self.server_url])
             logger.warning('Cannot prepare ssh tunnel: %s', e)
             return
         ssh_user = response.get('ssh_user')
@@ -156,7 +159,7 @@ class SSHTunnelManager():
         port = response.get('control_port') or response.get('port')
         if port is not None:
             self.update_ssh_state('control_port', port)
-            host = self.client.conf['SERVER_URL'].split('://', 1)[-1]
+            host = self.server_url.split('://', 1)[-1]
             host = host.rsplit(':', 1)[0].rstrip('/')
             cmd = prepare_ssh_command(host, self.ssh_tunnel_state)
             self.update_ssh_state('command', cmd)
@@ -245,11 +248,14 @@ class SSHTunnelManager():
         self.update_ssh_state('state', 'loading')
         self.update_ssh_state('control_port', 0)
         self.update_ssh_state('maintenance_port', 0)
-        self.update_ssh_state('command', ['Load', self.client.conf['SERVER_URL']])
+        self.update_ssh_state('command', ['Load', self.client.get_server_url()])
         while self.loop_ssh_tunnel:
             need_retry = False
             if self.process is not None:
                 need_retry = self.read_ssh_stdout()
+                if not need_retry and self.server_url != self.client.get_server_url():
+                    logger.info('The server has changed, reconnecting the tunnel to %s.', self.client.get_server_url())
+                    need_retry = True
             else:
                 need_retry = True
             if need_retry:
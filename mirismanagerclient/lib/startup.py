@@ -0,0 +1,60 @@
+"""
+Miris Manager client startup helpers
+This module is not intended to be used directly, only the client class should be used.
+
+The startup sequence resolves the servers host names and opens the pooled
+connections before the first API calls, then runs the independent API calls
+at the same time so that the system is shown online as fast as possible.
+"""
+import logging
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_hosts(urls):
+    """
+    Resolve the host names of the given URLs, the results are kept in the system resolver cache if any.
+    Return the list of host names that could not be resolved.
+    """
+    failed = []
+    for url in urls:
+        parts = urlsplit(url)
+        if not parts.hostname:
+            continue
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        try:
+            socket.getaddrinfo(parts.hostname, port, proto=socket.IPPROTO_TCP)
+        except OSError as e:
+            logger.warning('Unable to resolve "%s": %s', parts.hostname, e)
+            failed.append(parts.hostname)
+    return failed
+
+
+def run_concurrently(tasks):
+    """
+    Run functions in threads and wait for them.
+    "tasks" is a dict {name: function}, return a dict {name: (result, exception, duration)}.
+    """
+    results = {}
+
+    def run(name, function):
+        start = time.monotonic()
+        try:
+            results[name] = (function(), None, time.monotonic() - start)
+        except Exception as e:
+            logger.warning('Startup task "%s" failed: %s', name, e)
+            results[name] = (None, e, time.monotonic() - start)
+
+    threads = [
+        threading.Thread(target=run, args=(name, function), name=f'mm-startup-{name}', daemon=True)
+        for name, function in tasks.items()
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
@@ -0,0 +1,128 @@
+"""
+Miris Manager system status info
+This module is not intended to be used directly, only the client class should be used.
+
+The status info is a JSON document sent with the system status. Each top level
+field is serialized separately and the serialized fields are kept, so only
+the fields changed since the last update are serialized again.
+"""
+import copy
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class StatusInfo():
+    """
+    Structured status info.
+    Values must be changed with "set", "update" or item assignment to be
+    detected as changed, nested values returned by "get" should not be modified.
+    """
+
+    def __init__(self, codec, data=None):
+        self._codec = codec
+        self._data = {}
+        self._fragments = {}
+        self._dirty_paths = set()
+        self._changed = False
+        self._version = 0
+        self._serialized_version = 0
+        self._lock = threading.Lock()
+        if data:
+            self.update(data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        with self._lock:
+            del self._data[key]
+            self._fragments.pop(key, None)
+            self._dirty_paths.add((key,))
+            self._changed = True
+            self._version += 1
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def to_dict(self):
+        with self._lock:
+            return copy.deepcopy(self._data)
+
+    @property
+    def changed(self):
+        return self._changed
+
+    @property
+    def dirty_paths(self):
+        # Paths changed since the last sent status, as dotted strings
+        return sorted('.'.join(str(part) for part in path) for path in self._dirty_paths)
+
+    def set(self, path, value):
+        """
+        Set a value. The path can be a top level key or a dotted path for nested values (for example
+        "audio.master.volume"). Return True if the value has changed.
+        """
+        parts = tuple(path.split('.')) if isinstance(path, str) else tuple(path)
+        if not parts:
+            raise ValueError('An empty path cannot be used.')
+        with self._lock:
+            container = self._data
+            for index, part in enumerate(parts[:-1]):
+                child = container.get(part)
+                if not isinstance(child, dict):
+                    if child is not None:
+                        raise ValueError(f'The value at "{".".join(parts[:index + 1])}" is not a dict.')
+                    child = container[part] = {}
+                container = child
+            if parts[-1] in container and container[parts[-1]] == value:
+                return False
+            container[parts[-1]] = copy.deepcopy(value)
+            self._fragments.pop(parts[0], None)
+            self._dirty_paths.add(parts)
+            self._changed = True
+            self._version += 1
+            return True
+
+    def update(self, values=None, **kwargs):
+        changed = False
+        for key, value in dict(values or {}, **kwargs).items():
+            changed = self.set((key,), value) or changed
+        return changed
+
+    def clear(self):
+        with self._lock:
+            self._dirty_paths.update((key,) for key in self._data)
+            if self._data:
+                self._changed = True
+                self._version += 1
+            self._data.clear()
+            self._fragments.clear()
+
+    def serialize(self):
+        """
+        Get the status info as a JSON string, only changed fields are serialized.
+        """
+        with self._lock:
+            fragments = []
+            for key, value in self._data.items():
+                fragment = self._fragments.get(key)
+                if fragment is None:
+                    fragment = self._fragments[key] = self._codec.dumps(key) + b':' + self._codec.dumps(value)
+                fragments.append(fragment)
+            self._serialized_version = self._version
+            return (b'{' + b','.join(fragments) + b'}').decode('utf-8')
+
+    def mark_sent(self):
+        # Changes done after the last serialization are kept
+        with self._lock:
+            if self._serialized_version == self._version:
+                self._dirty_paths.clear()
+                self._changed = False
@@ -0,0 +1,177 @@
+"""
+Miris Manager profiles status watcher
+This module can be used by scripts monitoring many profiles (rooms) with a user API key.
+
+All the profiles are polled over the connections pool of the client, each
+with its own interval: the interval is reset to the minimum when the status of
+the profile changes or while it is initializing and grows while nothing
+changes. Only the changes are yielded (status transitions, new errors and
+remaining space thresholds crossings), not the full status responses.
+"""
+import heapq
+import logging
+import threading
+import time
+
+from ..client import MirisManagerRequestError
+
+logger = logging.getLogger(__name__)
+
+
+class StatusChange():
+    """
+    Change of the status of a profile.
+    "kind" is one of "status", "online", "error", "space" or "poll_error".
+    "status" is the last status response of the profile (None for "poll_error").
+    """
+
+    def __init__(self, profile, kind, old, new, status=None):
+        self.profile = profile
+        self.kind = kind
+        self.old = old
+        self.new = new
+        self.status = status
+        self.time = time.time()
+
+    def __repr__(self):
+        return f'<StatusChange {self.profile} {self.kind}: {self.old!r} -> {self.new!r}>'
+
+
+class ProfileWatch():
+
+    def __init__(self, profile, interval):
+        self.profile = profile
+        self.interval = interval
+        self.status = None
+        self.failing = False
+        self.polls = 0
+
+
+def get_space_level(remaining_space, thresholds):
+    # Number of thresholds under which the remaining space is (thresholds are sorted in descending order)
+    if remaining_space is None:
+        return 0
+    return len([threshold for threshold in thresholds if remaining_space < threshold])
+
+
+def compute_changes(profile, old, new, thresholds):
+    """
+    Return the list of changes between two status responses of a profile ("old" is None for the first one).
+    """
+    changes = []
+    old = old or {}
+    if old.get('status') != new.get('status'):
+        changes.append(StatusChange(profile, 'status', old.get('status'), new.get('status'), new))
+    if old and old.get('online') != new.get('online'):
+        changes.append(StatusChange(profile, 'online', old.get('online'), new.get('online'), new))
+    if new.get('last_error_date') and old.get('last_error_date') != new.get('last_error_date'):
+        changes.append(StatusChange(
+            profile, 'error', old.get('last_error_message'), new.get('last_error_message'), new))
+    old_level = get_space_level(old.get('remaining_space'), thresholds) if old else 0
+    new_level = get_space_level(new.get('remaining_space'), thresholds)
+    if old_level != new_level:
+        changes.append(StatusChange(profile, 'space', old.get('remaining_space'), new.get('remaining_space'), new))
+    return changes
+
+
+class StatusWatcher():
+    """
+    Watch the status of several profiles using a client instance.
+    "space_thresholds" are remaining space values (in MB) for which a change is yielded when crossed.
+    """
+
+    def __init__(self, client, profiles, min_interval=2, max_interval=30, space_thresholds=(10000, 2000),
+                 workers=8):
+        self.client = client
+        # Duplicate profiles are polled once
+        self.profiles = list(dict.fromkeys(profiles))
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.space_thresholds = sorted(space_thresholds, reverse=True)
+        self.workers = workers
+        self.watches = {profile: ProfileWatch(profile, min_interval) for profile in self.profiles}
+        self._stop_event = threading.Event()
+
+    def _get_status(self, profile):
+        return self.client.api_request('POLL_STATUS', params={'profile': profile})
+
+    def _process(self, watch, status):
+        # Update the state of a profile with a status response, return the list of changes
+        changes = compute_changes(watch.profile, watch.status, status, self.space_thresholds)
+        watch.status = status
+        watch.polls += 1
+        if watch.failing:
+            watch.failing = False
+            changes.insert(0, StatusChange(watch.profile, 'poll_error', True, False, status))
+        if changes or status.get('status') == 'INITIALIZING':
+            watch.interval = self.min_interval
+        else:
+            watch.interval = min(watch.interval * 2, self.max_interval)
+        return changes
+
+    def stop(self):
+        self._stop_event.set()
+
+    def watch(self, duration=None):
+        """
+        Generator yielding "StatusChange" objects until "stop" is called or "duration" is elapsed.
+        The first status of each profile is yielded as a "status" change.
+        """
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait  # imported only when used
+
+        self._stop_event.clear()
+        end = time.monotonic() + duration if duration is not None else None
+        # Heap of tuples (poll time, profile)
+        polls = [(0, profile) for profile in self.profiles]
+        in_flight = {}
+        executor = ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(self.profiles))))
+        try:
+            while not self._stop_event.is_set():
+                now = time.monotonic()
+                if end is not None and now >= end:
+                    break
+                while polls and polls[0][0] <= now:
+                    _poll_time, profile = heapq.heappop(polls)
+                    in_flight[executor.submit(self._get_status, profile)] = profile
+                wait_timeout = max(0, polls[0][0] - now) if polls else self.min_interval
+                if end is not None:
+                    wait_timeout = min(wait_timeout, max(0, end - now))
+                # Wake up regularly to check if the watcher has been stopped
+                wait_timeout = min(wait_timeout, 1)
+                if not in_flight:
+                    self._stop_event.wait(wait_timeout)
+                    continue
+                done, _not_done = wait(in_flight, timeout=wait_timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    watch = self.watches[in_flight.pop(future)]
+                    try:
+                        changes = self._process(watch, future.result())
+                    except Exception as e:
+                        # Invalid responses are reported like request errors, only for the profile concerned
+                        if isinstance(e, (MirisManagerRequestError, OSError)):
+                            logger.info('Failed to get status of profile "%s": %s', watch.profile, e)
+                        else:
+                            logger.warning('Invalid status of profile "%s": %s: %s', watch.profile,
+                                           e.__class__.__name__, e)
+                        changes = []
+                        if not watch.failing:
+                            watch.failing = True
+                            changes.append(StatusChange(watch.profile, 'poll_error', False, True))
+                        watch.interval = min(watch.interval * 2, self.max_interval)
+                    heapq.heappush(polls, (time.monotonic() + watch.interval, watch.profile))
+                    yield from changes
+        finally:
+            # Also run when the generator is closed: the polls in progress are not waited for
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self):
+        return [
+            {
+                'profile': watch.profile,
+                'status': (watch.status or {}).get('status'),
+                'interval': watch.interval,
+                'polls': watch.polls,
+                'failing': watch.failing,
+            }
+            for watch in self.watches.values()
+        ]
@@ -0,0 +1,174 @@
+"""
+Miris Manager one-time access tokens pool
+This module is not intended to be used directly, only the client class should be used.
+
+Creating an access token for the web interface of a recorder needs a request
+to the server. Tokens are created in advance for each system, purpose and
+data, kept until shortly before their expiration and given only once. A
+background thread refills the pools, so getting a token is usually immediate.
+"""
+import collections
+import datetime
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def parse_expires(value):
+    """
+    Get a UTC timestamp from the expiration date of a token (dates without timezone are in UTC).
+    """
+    date = datetime.datetime.fromisoformat(str(value))
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.UTC)
+    return date.timestamp()
+
+
+def get_pool_key(system, purpose, data):
+    if data is not None and not isinstance(data, str):
+        data = json.dumps(data, sort_keys=True)
+    return (system, purpose, data or '')
+
+
+class TokenPool():
+    """
+    "create" is a function called with (system, purpose, data) returning the response of the token
+    creation ({'token': ..., 'expires': ...}) and "server_time" a function returning the server time
+    as a UTC timestamp.
+    Tokens are given until "margin" seconds before their expiration and at most "max_age" seconds after
+    their creation. Pools which have not been used for "idle_timeout" seconds are not refilled anymore.
+    """
+
+    def __init__(self, create, server_time=time.time, size=5, margin=30, max_age=600, idle_timeout=900,
+                 retry_delay=5):
+        self.create = create
+        self.server_time = server_time
+        self.size = size
+        self.margin = margin
+        self.max_age = max_age
+        self.idle_timeout = idle_timeout
+        self.retry_delay = retry_delay
+        # {pool key: deque of tuples (deadline, token)}, deadlines are monotonic times
+        self._pools = {}
+        # {pool key: last use monotonic time or None for pools to refill permanently}
+        self._keys = {}
+        self._stats = {'hits': 0, 'misses': 0, 'created': 0, 'expired': 0, 'errors': 0}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        # {pool key: monotonic time before which the pool is not refilled after an error}
+        self._retry_at = {}
+
+    def _create_token(self, key):
+        system, purpose, data = key
+        response = self.create(system, purpose, data or None)
+        lifetime = parse_expires(response['expires']) - self.server_time()
+        deadline = time.monotonic() + min(lifetime - self.margin, self.max_age)
+        with self._cond:
+            self._stats['created'] += 1
+        return deadline, response['token']
+
+    def _prune(self, key, now):
+        # Remove the expired tokens of a pool, the caller must hold the lock
+        tokens = self._pools.setdefault(key, collections.deque())
+        while tokens and tokens[0][0] <= now:
+            tokens.popleft()
+            self._stats['expired'] += 1
+        return tokens
+
+    def _start(self):
+        # The caller must hold the lock
+        if self._thread is None and not self._stopped:
+            self._thread = threading.Thread(target=self._refill_loop, name='mm-token-pool', daemon=True)
+            self._thread.start()
+        self._cond.notify_all()
+
+    def warm(self, system, purpose='control', data=None):
+        """
+        Keep a pool of tokens filled until the pool is stopped.
+        """
+        with self._cond:
+            self._keys[get_pool_key(system, purpose, data)] = None
+            self._start()
+
+    def get(self, system, purpose='control', data=None):
+        """
+        Get a token, from the pool if possible.
+        """
+        key = get_pool_key(system, purpose, data)
+        with self._cond:
+            if self._keys.get(key, 0) is not None:
+                self._keys[key] = time.monotonic()
+            tokens = self._prune(key, time.monotonic())
+            token = tokens.popleft()[1] if tokens else None
+            self._stats['hits' if token else 'misses'] += 1
+            self._start()
+        if token is None:
+            token = self._create_token(key)[1]
+        return token
+
+    def _get_missing(self, now):
+        # Return the key of a pool to refill and the delay before the next check, the caller must hold the lock
+        next_check = None
+        for key, last_use in list(self._keys.items()):
+            if last_use is not None and now - last_use > self.idle_timeout:
+                del self._keys[key]
+                self._pools.pop(key, None)
+                self._retry_at.pop(key, None)
+                continue
+            tokens = self._prune(key, now)
+            if len(tokens) < self.size:
+                retry_at = self._retry_at.get(key, 0)
+                if retry_at <= now:
+                    return key, 0
+                # The refill of this pool failed, it is retried after a delay
+                delay = retry_at - now
+            elif tokens:
+                delay = tokens[0][0] - now
+            else:
+                continue
+            next_check = delay if next_check is None else min(next_check, delay)
+        return None, next_check
+
+    def _refill_loop(self):
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                key, delay = self._get_missing(time.monotonic())
+                if key is None:
+                    self._cond.wait(delay)
+                    continue
+            try:
+                token = self._create_token(key)
+            except Exception as e:
+                logger.warning('Unable to create access token for system "%s": %s', key[0], e)
+                with self._cond:
+                    self._stats['errors'] += 1
+                    self._retry_at[key] = time.monotonic() + self.retry_delay
+                continue
+            with self._cond:
+                if token[0] <= time.monotonic():
+                    logger.warning('Access tokens of system "%s" expire too soon to be kept.', key[0])
+                    self._stats['errors'] += 1
+                    self._retry_at[key] = time.monotonic() + self.retry_delay
+                else:
+                    self._retry_at.pop(key, None)
+                    if key in self._keys:
+                        self._pools.setdefault(key, collections.deque()).append(token)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['available'] = sum(len(tokens) for tokens in self._pools.values())
+        return stats
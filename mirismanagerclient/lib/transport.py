@@ -0,0 +1,66 @@
+"""
+Miris Manager client HTTP transport
+This module is not intended to be used directly, only the client class should be used.
+
+All requests of a client go through the same session so that connections are
+reused. TCP keepalive is enabled on the pooled sockets: the keepalive packets
+keep the NAT and proxies mappings of idle long polling connections open, and a
+connection silently dropped by the network is detected after a few failed
+probes instead of at the end of the request timeout.
+"""
+import logging
+import socket
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+logger = logging.getLogger(__name__)
+
+
+def get_keepalive_options(idle, interval=None, count=None):
+    """
+    Get socket options to enable TCP keepalive.
+    "idle" is the idle duration before sending probes, "interval" the duration between probes and
+    "count" the number of failed probes after which the connection is considered as dropped.
+    Options not supported by the platform are ignored.
+    """
+    options = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    # The idle option is named TCP_KEEPALIVE on macOS
+    idle_option = getattr(socket, 'TCP_KEEPIDLE', None) or getattr(socket, 'TCP_KEEPALIVE', None)
+    for option, value in ((idle_option, idle),
+                          (getattr(socket, 'TCP_KEEPINTVL', None), interval),
+                          (getattr(socket, 'TCP_KEEPCNT', None), count)):
+        if option is not None and value:
+            options.append((socket.IPPROTO_TCP, option, int(value)))
+    return options
+
+
+class KeepAliveAdapter(HTTPAdapter):
+
+    def __init__(self, socket_options=None, **kwargs):
+        self.socket_options = socket_options
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.socket_options:
+            kwargs['socket_options'] = HTTPConnection.default_socket_options + self.socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        if self.socket_options:
+            proxy_kwargs['socket_options'] = HTTPConnection.default_socket_options + self.socket_options
+        return super().proxy_manager_for(proxy, **proxy_kwargs)
+
+
+def create_session(keepalive=None, pool_size=10):
+    """
+    Create a requests session. "keepalive" is a dict with the "idle", "interval" and "count"
+    values of TCP keepalive (None to disable it).
+    """
+    socket_options = get_keepalive_options(**keepalive) if keepalive else None
+    session = requests.Session()
+    adapter = KeepAliveAdapter(socket_options=socket_options, pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
@@ -0,0 +1,110 @@
+"""
+Miris Manager client wake on lan sender
+This module can be used by clients relaying wake on lan requests to their network.
+
+Magic packets are sent directly with an UDP socket, so no external tool is
+needed and a batch of targets is sent from a single socket. The packets are
+repeated because they can be lost, and the packets sent to a same destination
+(usually the broadcast address of a subnet) are paced to avoid bursts.
+"""
+import ipaddress
+import logging
+import re
+import socket
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DESTINATION = '255.255.255.255'
+MAC_PATTERN = re.compile(r'^[\da-f]{12}$')
+
+
+def parse_mac(mac_address):
+    """
+    Return the bytes of a mac address ("aa:bb:cc:dd:ee:ff", "aa-bb-cc-dd-ee-ff" or "aabbccddeeff").
+    """
+    value = str(mac_address).strip().lower().replace(':', '').replace('-', '').replace('.', '')
+    if not MAC_PATTERN.match(value):
+        raise ValueError(f'The mac address "{mac_address}" is not valid.')
+    return bytes.fromhex(value)
+
+
+def build_magic_packet(mac_address):
+    return b'\xff' * 6 + parse_mac(mac_address) * 16
+
+
+def get_targets(params):
+    """
+    Get the list of targets of the parameters of a "WAKE_ON_LAN" command: either a list of dicts
+    {'mac': mac address, 'ip': destination address (optional)} in "targets" or a single target.
+    """
+    if params.get('targets'):
+        targets = params['targets']
+        if not isinstance(targets, list):
+            raise ValueError('The targets should be a list.')
+        return [target if isinstance(target, dict) else {'mac': target} for target in targets]
+    if params.get('mac'):
+        return [{'mac': params['mac'], 'ip': params.get('ip')}]
+    raise ValueError('No mac address in request.')
+
+
+class WakeOnLanSender():
+    """
+    "repeat" is the number of packets sent to each target, "interval" the delay between the repetitions
+    and "pace" the minimal delay between two packets sent to the same destination.
+    """
+
+    def __init__(self, port=9, repeat=3, interval=0.1, pace=0.002):
+        self.port = port
+        self.repeat = max(1, repeat)
+        self.interval = interval
+        self.pace = pace
+
+    def send(self, targets):
+        """
+        Send magic packets to a list of targets (dicts with "mac" and optionally "ip").
+        Return a list of dicts {'mac', 'ip', 'sent': number of packets sent, 'error': message or None},
+        one per target in the same order.
+        """
+        results = []
+        # {destination: [(result, packet)]}
+        destinations = {}
+        for target in targets:
+            result = {'mac': target.get('mac'), 'ip': target.get('ip') or None, 'sent': 0, 'error': None}
+            results.append(result)
+            try:
+                packet = build_magic_packet(result['mac'])
+                destination = str(ipaddress.IPv4Address(result['ip'])) if result['ip'] else DEFAULT_DESTINATION
+            except ValueError as e:
+                result['error'] = str(e)
+                continue
+            destinations.setdefault(destination, []).append((result, packet))
+        if not destinations:
+            return results
+
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            queues = list(destinations.items())
+            for repetition in range(self.repeat):
+                if repetition:
+                    time.sleep(self.interval)
+                # One packet per destination at each step so that destinations are served in parallel
+                for step in range(max(len(items) for _destination, items in queues)):
+                    if step and self.pace:
+                        time.sleep(self.pace)
+                    for destination, items in queues:
+                        if step >= len(items):
+                            continue
+                        result, packet = items[step]
+                        try:
+                            sock.sendto(packet, (destination, self.port))
+                        except OSError as e:
+                            result['error'] = f'Failed to send packet to {destination}: {e}'
+                        else:
+                            result['sent'] += 1
+        for result in results:
+            if result['sent'] and result['error']:
+                # Some packets have been sent
+                result['error'] = None
+            logger.debug('Wake on lan result: %s', result)
+        return results
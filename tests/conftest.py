@@ -15,3 +15,78 @@ def add_client_to_path():
     path = Path(__file__).resolve().parent.parent
     sys.path.pop(0)  # Remove current dir
     sys.path.insert(0, str(path))
+
+
+class StubServer:
+    """
+    Local HTTP server used to test the client against a real HTTP stack.
+    Routes are functions receiving the request and returning a tuple (status code, json data),
+    or None if the function has written the response itself using the request handler.
+    """
+
+    def __init__(self):
+        import http.server
+        import json
+        import threading
+        from urllib.parse import parse_qs, urlsplit
+
+        self.routes = {}
+        self.requests = []
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                url = urlsplit(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                request = {
+                    'method': self.command,
+                    'path': url.path,
+                    'params': {key: val[0] for key, val in parse_qs(url.query).items()},
+                    'data': {key: val[0] for key, val in parse_qs(body.decode('utf-8', 'replace')).items()},
+                    'headers': dict(self.headers),
+                    'handler': self,
+                }
+                with stub.lock:
+                    stub.requests.append(request)
+                route = stub.routes.get(url.path)
+                result = route(request) if route else (404, {'error': 'Not found.'})
+                if result is None:
+                    return
+                status, data = result
+                content = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = _handle  # noqa: N815
+            do_POST = _handle  # noqa: N815
+
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = 'http://127.0.0.1:%s' % self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05, ), daemon=True)
+        self.thread.start()
+
+    def count(self, path):
+        with self.lock:
+            return len([request for request in self.requests if request['path'] == path])
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture()
+def stub_server():
+    server = StubServer()
+    yield server
+    server.close()
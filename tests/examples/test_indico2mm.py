@@ -0,0 +1,46 @@
+import argparse
+import importlib.util
+import json
+from pathlib import Path
+
+
+def _get_entry(entry_id, room):
+    return {
+        'entryType': 'Contribution',
+        'id': entry_id,
+        'title': 'Talk %s' % entry_id,
+        'room': room,
+        'startDate': {'date': '2023-09-20', 'time': '09:00:00', 'tz': 'Europe/Paris'},
+        'endDate': {'date': '2023-09-20', 'time': '09:30:00', 'tz': 'Europe/Paris'},
+    }
+
+
+def test_indico2mm_rooms(stub_server, tmp_path):
+    path = Path(__file__).resolve().parent.parent.parent / 'examples' / 'indico2mm.py'
+    spec = importlib.util.spec_from_file_location('indico2mm', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    stub_server.routes['/api/v3/fleet/calendars/add-event/'] = lambda request: (200, {
+        'uid': 'uid-' + json.loads(request['data']['parameters'])['sync_id']})
+    stub_server.routes['/api/v3/fleet/calendars/delete-event/'] = lambda request: (200, {})
+    json_path = tmp_path / 'calendar.json'
+    json_path.write_text(json.dumps({'results': {'5': {'20230920': {'s1': {
+        'entryType': 'Session',
+        'title': 'Main',
+        'entries': {'c1': _get_entry('c1', 'Room A'), 'c2': _get_entry('c2', 'Room B')},
+    }}}}}))
+
+    def run(room):
+        return module.main(argparse.Namespace(
+            jsonfile=str(json_path), room=room, enable_event=False, mm_url=stub_server.url, mm_api_key='key',
+            system='ubi-box-1', state=None, rollback=False, dry_run=False))
+
+    assert list(run('Room A').created) == ['indico:Room A:c1']
+    # Importing another room in the same system does not delete the events of the first room
+    report = run('Room B')
+    assert list(report.created) == ['indico:Room B:c2']
+    assert report.deleted == {}
+    assert stub_server.count('/api/v3/fleet/calendars/delete-event/') == 0
+    assert sorted(path.name for path in tmp_path.glob('*.json')) == [
+        'calendar.json', 'indico2mm-ubi-box-1-Room_A.json', 'indico2mm-ubi-box-1-Room_B.json']
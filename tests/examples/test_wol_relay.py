@@ -0,0 +1,28 @@
+import importlib.util
+import json
+from pathlib import Path
+import socket
+
+
+def test_wol_relay_action():
+    from mirismanagerclient import MirisManagerClient
+    from mirismanagerclient.lib.long_polling import LongPollingManager
+    from mirismanagerclient.lib.wake_on_lan import WakeOnLanSender
+
+    path = Path(__file__).resolve().parent.parent.parent / 'examples' / 'wol_relay.py'
+    spec = importlib.util.spec_from_file_location('wol_relay', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    # The relay constructor runs the long polling loop, so only the client part is initialized
+    relay = module.WOLRelay.__new__(module.WOLRelay)
+    MirisManagerClient.__init__(relay, local_conf={'SERVER_URL': 'http://127.0.0.1:1'}, setup_logging=False)
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as receiver:
+        receiver.bind(('127.0.0.1', 0))
+        relay.wol_sender = WakeOnLanSender(port=receiver.getsockname()[1], repeat=1)
+        params = {'targets': [{'mac': 'aa:bb:cc:dd:ee:01', 'ip': '127.0.0.1'}, {'mac': 'invalid'}]}
+        status, data = LongPollingManager(relay).execute_command('uid', 'WAKE_ON_LAN', params)
+    assert status == 'DONE'
+    results = json.loads(data)['results']
+    assert results[0]['sent'] == 1
+    assert results[1]['error']
@@ -0,0 +1,82 @@
+import pytest
+
+CONFIG = {
+    'SECRET_KEY': 'the secret key',
+    'API_KEY': 'test API key',
+    'CAPABILITIES': ['shutdown'],
+}
+
+
+def _get_client(**conf):
+    from mirismanagerclient import MirisManagerClient
+
+    client = MirisManagerClient(local_conf=dict(CONFIG, **conf), setup_logging=False)
+
+    @client.action('SIMULATE_CLICK', params={'x': int, 'y': int, 'button': (str, None)}, capability='screen_control')
+    def simulate_click(uid, params):
+        return 'DONE', '%s,%s' % (params['x'], params['y'])
+
+    @client.action('GET_SCREENSHOT', capability=['screenshot', 'screen_control'], concurrency=1, priority=8)
+    def get_screenshot(uid, params):
+        return 'IN_PROGRESS', uid
+
+    return client
+
+
+def test_actions__dispatch():
+    client = _get_client()
+    assert client.handle_action('uid-1', 'SIMULATE_CLICK', {'x': 1, 'y': 2}) == ('DONE', '1,2')
+    assert client.handle_action('uid-2', 'GET_SCREENSHOT', {}) == ('IN_PROGRESS', 'uid-2')
+    with pytest.raises(NotImplementedError, match='Unsupported action: REBOOT.'):
+        client.handle_action('uid-3', 'REBOOT', {})
+
+
+@pytest.mark.parametrize('params, error', [
+    ({'x': 1}, 'Missing parameter "y" for action "SIMULATE_CLICK".'),
+    ({'x': 1, 'y': '2'}, 'Invalid parameter "y" for action "SIMULATE_CLICK": int expected.'),
+    ({'x': 1, 'y': 2, 'button': 3}, 'Invalid parameter "button" for action "SIMULATE_CLICK": str expected.'),
+    ({'x': True, 'y': 2}, 'Invalid parameter "x" for action "SIMULATE_CLICK": int expected.'),
+    ([1, 2], 'Invalid params for action "SIMULATE_CLICK": a dict is expected.'),
+])
+def test_actions__invalid_params(params, error):
+    client = _get_client()
+    with pytest.raises(ValueError) as exc_info:
+        client.handle_action('uid-1', 'SIMULATE_CLICK', params)
+    assert str(exc_info.value) == error
+
+
+
+def test_actions__bool_params():
+    from mirismanagerclient.lib.actions import ActionHandler
+
+    handler = ActionHandler('SET_VOLUME', None, params={'muted': bool, 'volume': (int, bool)})
+    assert handler.validate_params({'muted': False, 'volume': True}) == {'muted': False, 'volume': True}
+    with pytest.raises(ValueError, match='bool expected'):
+        handler.validate_params({'muted': 0, 'volume': 1})
+
+
+def test_actions__capabilities(stub_server):
+    client = _get_client(SERVER_URL=stub_server.url)
+    assert client.get_capabilities() == ['shutdown', 'screen_control', 'screenshot']
+    stub_server.routes['/api/v3/fleet/systems/set-info/'] = lambda request: (200, {})
+    client.update_capabilities()
+    assert stub_server.requests[-1]['data'] == {'capabilities': 'shutdown screen_control screenshot'}
+
+
+def test_actions__scheduling():
+    from mirismanagerclient.lib.long_polling import LongPollingManager
+
+    client = _get_client(COMMAND_WORKERS=1, ACTION_CONCURRENCY={'UPGRADE': 1})
+    scheduler = LongPollingManager(client).get_scheduler()
+    scheduler.stop()
+    assert scheduler.concurrency == {'UPGRADE': 1, 'GET_SCREENSHOT': 1}
+    assert scheduler.priorities['GET_SCREENSHOT'] == 8
+    assert scheduler.priorities['STOP_RECORDING'] == 0
+
+
+def test_actions__not_registered():
+    from mirismanagerclient import MirisManagerClient
+
+    client = MirisManagerClient(local_conf=CONFIG, setup_logging=False)
+    with pytest.raises(NotImplementedError, match='override the "handle_action" method'):
+        client.handle_action('uid-1', 'REBOOT', {})
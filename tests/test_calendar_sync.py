@@ -0,0 +1,204 @@
+import datetime
+import json
+import signal
+import threading
+import time
+import zoneinfo
+
+import pytest
+
+PARIS = zoneinfo.ZoneInfo('Europe/Paris')
+
+
+def _get_event(key, hour, title='Talk'):
+    from mirismanagerclient.lib.calendar_sync import CalendarEvent
+
+    start = datetime.datetime(2024, 7, 6, hour, 0, tzinfo=datetime.timezone.utc)
+    return CalendarEvent(key, start, start + datetime.timedelta(minutes=30), title, speaker='Speaker',
+                         time_zone='Europe/Paris')
+
+
+def test_calendar_event__data():
+    from mirismanagerclient.lib.calendar_sync import CalendarEvent, parse_duration
+
+    event = _get_event('pretalx:A', 13)
+    data = event.to_data()
+    assert data['start_date'] == '2024-07-06 15:00:00'
+    assert data['end_date'] == '2024-07-06 15:30:00'
+    assert data['time_zone'] == 'Europe/Paris'
+    assert json.loads(data['parameters'])['sync_id'] == 'pretalx:A'
+    assert data['enabled'] == 'no'
+
+    start = datetime.datetime(2024, 7, 6, 15, 0, tzinfo=PARIS)
+    assert CalendarEvent('key', start, start + parse_duration('01:20'), 'Title').time_zone == 'Europe/Paris'
+    assert parse_duration('1:30:15') == datetime.timedelta(hours=1, minutes=30, seconds=15)
+
+
+def test_calendar_diff():
+    from mirismanagerclient.lib.calendar_sync import compute_diff
+
+    unchanged = _get_event('pretalx:A', 13)
+    changed = _get_event('pretalx:B', 14)
+    new = _get_event('pretalx:C', 15)
+    existing = [
+        dict(unchanged.to_data(), uid='uid-a', enabled=False, start_date='2024-07-06T15:00:00'),
+        dict(_get_event('pretalx:B', 14, title='Old title').to_data(), uid='uid-b'),
+        dict(_get_event('pretalx:D', 16).to_data(), uid='uid-d'),
+        dict(_get_event('pretalx:D', 16).to_data(), uid='uid-d2'),
+        dict(_get_event('indico:E', 16).to_data(), uid='uid-e'),
+        {'uid': 'uid-manual', 'parameters': '{"title": "Manual"}'},
+    ]
+    diff = compute_diff([unchanged, changed, new], existing, prefix='pretalx:')
+    assert diff.create == [new]
+    assert diff.update == [('uid-b', changed)]
+    assert sorted(diff.delete) == [('uid-d', 'pretalx:D'), ('uid-d2', 'pretalx:D')]
+    assert diff.unchanged == 1
+    assert len(diff) == 4
+
+    diff = compute_diff([unchanged], existing, delete_missing=False)
+    assert diff.delete == [('uid-d2', 'pretalx:D')]
+
+
+def test_calendar_sync(stub_server):
+    from mirismanagerclient import MirisManagerClient
+
+    existing = [
+        dict(_get_event('pretalx:B', 14, title='Old title').to_data(), uid='uid-b'),
+        dict(_get_event('pretalx:D', 16).to_data(), uid='uid-d'),
+    ]
+
+    def add_event(request):
+        if request['data']['start_date'].startswith('2024-07-06 17'):
+            return 400, {'error': 'Invalid date.'}
+        return 200, {'uid': 'uid-' + json.loads(request['data']['parameters'])['sync_id']}
+
+    stub_server.routes['/api/v3/fleet/calendars/get-events/'] = lambda request: (200, {'events': existing})
+    stub_server.routes['/api/v3/fleet/calendars/add-event/'] = add_event
+    stub_server.routes['/api/v3/fleet/calendars/edit-event/'] = lambda request: (200, {})
+    stub_server.routes['/api/v3/fleet/calendars/delete-event/'] = lambda request: (200, {})
+    conf = {'SERVER_URL': stub_server.url, 'API_KEY': 'user key', 'AUTO_REGISTRATION': False}
+    client = MirisManagerClient(local_conf=conf, setup_logging=False)
+    calls = []
+    events = [_get_event('pretalx:A', 13), _get_event('pretalx:B', 14), _get_event('pretalx:C', 15)]
+    report = client.sync_calendar(
+        'ubi-box-1', events, workers=4, progress=lambda *args: calls.append(args))
+    assert report.created == {'pretalx:A': 'uid-pretalx:A'}
+    assert report.updated == {'pretalx:B': 'uid-b'}
+    assert report.deleted == {'pretalx:D': 'uid-d'}
+    assert [(operation, key) for operation, key, _error in report.errors] == [('create', 'pretalx:C')]
+    assert sorted(call[0] for call in calls) == [1, 2, 3, 4]
+    assert stub_server.count('/api/v3/fleet/calendars/get-events/') == 1
+    assert all(request['headers']['system'] == 'ubi-box-1' for request in stub_server.requests)
+
+    stub_server.requests.clear()
+    report = client.sync_calendar('ubi-box-1', events, dry_run=True)
+    assert [request['path'] for request in stub_server.requests] == ['/api/v3/fleet/calendars/get-events/']
+    assert len(report.created) == 2
+
+
+
+def test_calendar_sync__no_listing(stub_server):
+    from mirismanagerclient import MirisManagerClient
+
+    # Servers without the events listing route: events are only added
+    stub_server.routes['/api/v3/fleet/calendars/get-events/'] = lambda request: (404, {'error': 'Not found.'})
+    stub_server.routes['/api/v3/fleet/calendars/add-event/'] = lambda request: (200, {'uid': 'uid-new'})
+    conf = {'SERVER_URL': stub_server.url, 'API_KEY': 'user key', 'AUTO_REGISTRATION': False}
+    client = MirisManagerClient(local_conf=conf, setup_logging=False)
+    events = [_get_event('pretalx:A', 13), _get_event('pretalx:B', 14)]
+    report = client.sync_calendar('ubi-box-1', events, prefix='pretalx:', dry_run=True)
+    assert sorted(report.created) == ['pretalx:A', 'pretalx:B']
+    assert stub_server.count('/api/v3/fleet/calendars/add-event/') == 0
+
+    report = client.sync_calendar('ubi-box-1', events, prefix='pretalx:')
+    assert report.created == {'pretalx:A': 'uid-new', 'pretalx:B': 'uid-new'}
+    assert report.updated == report.deleted == {}
+    assert not report.errors
+    assert stub_server.count('/api/v3/fleet/calendars/add-event/') == 2
+
+
+def test_sync_state(tmp_path):
+    from mirismanagerclient.lib.calendar_sync import SyncState
+
+    path = str(tmp_path / 'state.json')
+    state = SyncState(path, 'ubi-box-1')
+    events = [_get_event('indico:A', 13), _get_event('indico:B', 14)]
+    diff = state.compute_diff(events)
+    assert diff.create == events
+
+    state.set_result('create', 'indico:A', 'uid-a', events[0])
+    state.set_result('create', 'indico:B', None, events[1])
+    state.save()
+    state = SyncState(path, 'ubi-box-1')
+    # Events created without uid are not stored
+    assert state.events == {'indico:A': {'uid': 'uid-a', 'hash': events[0].get_hash()}}
+
+    state.events['indico:C'] = {'uid': 'uid-c', 'hash': 'old'}
+    diff = state.compute_diff([events[0], _get_event('indico:C', 15)], prefix='indico:')
+    assert diff.unchanged == 1
+    assert [uid for uid, _event in diff.update] == ['uid-c']
+    diff = state.compute_diff([], prefix='pretalx:')
+    assert len(diff) == 0
+    assert sorted(state.get_rollback_diff().delete) == [('uid-a', 'indico:A'), ('uid-c', 'indico:C')]
+
+    with pytest.raises(ValueError):
+        SyncState(path, 'ubi-box-2')
+
+
+def test_calendar_sync__state(stub_server, tmp_path):
+    from mirismanagerclient import MirisManagerClient
+
+    stub_server.routes['/api/v3/fleet/calendars/add-event/'] = lambda request: (200, {
+        'uid': 'uid-' + json.loads(request['data']['parameters'])['sync_id']})
+    stub_server.routes['/api/v3/fleet/calendars/edit-event/'] = lambda request: (200, {})
+    stub_server.routes['/api/v3/fleet/calendars/delete-event/'] = lambda request: (200, {})
+    conf = {'SERVER_URL': stub_server.url, 'API_KEY': 'user key', 'AUTO_REGISTRATION': False}
+    client = MirisManagerClient(local_conf=conf, setup_logging=False)
+    # The state path can be a "pathlib.Path" object
+    path = tmp_path / 'state.json'
+
+    events = [_get_event('indico:A', 13), _get_event('indico:B', 14)]
+    report = client.sync_calendar('ubi-box-1', events, prefix='indico:', state_path=path)
+    assert len(report.created) == 2
+    assert stub_server.count('/api/v3/fleet/calendars/get-events/') == 0
+
+    # Only the changed events are sent
+    stub_server.requests.clear()
+    events = [_get_event('indico:A', 13), _get_event('indico:B', 14, title='New title'), _get_event('indico:C', 15)]
+    report = client.sync_calendar('ubi-box-1', events, prefix='indico:', state_path=path)
+    assert sorted(request['path'] for request in stub_server.requests) == [
+        '/api/v3/fleet/calendars/add-event/', '/api/v3/fleet/calendars/edit-event/']
+    report = client.sync_calendar('ubi-box-1', events, prefix='indico:', state_path=path)
+    assert len(stub_server.requests) == 2
+
+    report = client.rollback_calendar('ubi-box-1', path, dry_run=True)
+    assert len(report.deleted) == 3
+    report = client.rollback_calendar('ubi-box-1', path)
+    assert sorted(report.deleted.values()) == ['uid-indico:A', 'uid-indico:B', 'uid-indico:C']
+    assert stub_server.count('/api/v3/fleet/calendars/delete-event/') == 3
+    with open(path) as fo:
+        assert json.load(fo)['events'] == {}
+
+
+def test_calendar_sync__state_interrupted(stub_server, tmp_path):
+    from mirismanagerclient import MirisManagerClient
+    from mirismanagerclient.lib.calendar_sync import SyncState
+
+    stub_server.routes['/api/v3/fleet/calendars/add-event/'] = lambda request: (200, {
+        'uid': 'uid-' + json.loads(request['data']['parameters'])['sync_id']})
+    conf = {'SERVER_URL': stub_server.url, 'API_KEY': 'user key', 'AUTO_REGISTRATION': False}
+    client = MirisManagerClient(local_conf=conf, setup_logging=False)
+    path = str(tmp_path / 'state.json')
+    events = [_get_event('indico:A', 13), _get_event('indico:B', 14), _get_event('indico:C', 15)]
+
+    def progress(done, total, operation, key, error):
+        if key == 'indico:B':
+            # Interrupt the synchronization (Ctrl+C) while an operation is running
+            signal.pthread_kill(threading.main_thread().ident, signal.SIGINT)
+            time.sleep(0.2)
+
+    with pytest.raises(KeyboardInterrupt):
+        client.sync_calendar('ubi-box-1', events, prefix='indico:', state_path=path, workers=1, progress=progress)
+    # The events created before the interruption are in the saved state, the pending ones are cancelled
+    assert sorted(SyncState(path, 'ubi-box-1').events) == ['indico:A', 'indico:B']
+    assert stub_server.count('/api/v3/fleet/calendars/add-event/') == 2
@@ -11,8 +11,10 @@ CONFIG = {
 class MockResponse:
     def __init__(self, json_data, status_code):
         self.text = json.dumps(json_data)
+        self.content = self.text.encode()
         self.json_data = json_data
         self.status_code = status_code
+        self.headers = {}
 
     def json(self):
         return self.json_data
@@ -37,8 +39,8 @@ def mocked_request(*args, **kwargs):
     return MockResponse(None, 404)
 
 
-@patch('requests.post', side_effect=mocked_request)
-@patch('requests.get', side_effect=mocked_request)
+@patch('requests.Session.post', side_effect=mocked_request)
+@patch('requests.Session.get', side_effect=mocked_request)
 def test_client(mock_get, mock_post):
     from mirismanagerclient import MirisManagerClient
     mmc = MirisManagerClient(local_conf=CONFIG)
@@ -50,8 +52,8 @@ def test_client(mock_get, mock_post):
     assert len(mock_post.call_args_list) == 0
 
 
-@patch('requests.post', side_effect=mocked_request)
-@patch('requests.get', side_effect=mocked_request)
+@patch('requests.Session.post', side_effect=mocked_request)
+@patch('requests.Session.get', side_effect=mocked_request)
 def test_long_polling(mock_get, mock_post):
     from mirismanagerclient import MirisManagerClient
 
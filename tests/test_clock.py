@@ -0,0 +1,128 @@
+import datetime
+from email.utils import format_datetime
+import json
+import time
+from unittest.mock import patch
+
+CONFIG = {
+    'SERVER_URL': 'https://mmctest',
+    'SECRET_KEY': 'the secret key',
+    'API_KEY': 'test API key',
+}
+# The server clock is 10 minutes ahead of the local clock
+SERVER_OFFSET = 600
+
+
+class MockResponse:
+    def __init__(self, json_data, status_code):
+        self.text = json.dumps(json_data)
+        self.content = self.text.encode()
+        self.json_data = json_data
+        self.status_code = status_code
+        server_now = datetime.datetime.now(datetime.UTC) + datetime.timedelta(seconds=SERVER_OFFSET)
+        self.headers = {'Date': format_datetime(server_now, usegmt=True)}
+
+    def json(self):
+        return self.json_data
+
+
+def mocked_request(*args, **kwargs):
+    url = kwargs['url']
+    if url == CONFIG['SERVER_URL'] + '/api/time/':
+        server_now = datetime.datetime.now(datetime.UTC) + datetime.timedelta(seconds=SERVER_OFFSET)
+        return MockResponse({'utc_time': server_now.isoformat()}, 200)
+    return MockResponse({}, 200)
+
+
+def _date_header(offset):
+    return format_datetime(datetime.datetime.now(datetime.UTC) + datetime.timedelta(seconds=offset), usegmt=True)
+
+
+def test_clock__date_sample():
+    from mirismanagerclient.lib.clock import ClockOffsetTracker
+
+    clock = ClockOffsetTracker(drift_threshold=5)
+    assert clock.get_offset() == 0
+    now = time.time()
+    clock.add_date_sample(_date_header(SERVER_OFFSET), now, now + 0.1)
+    assert abs(clock.get_offset() - SERVER_OFFSET) < 2
+    assert clock.needs_refresh is False
+    # Slow responses are not considered as drifts
+    clock.add_date_sample(_date_header(SERVER_OFFSET), now - 20, now)
+    assert clock.needs_refresh is False
+    # A drift requires a refresh
+    now = time.time()
+    clock.add_date_sample(_date_header(SERVER_OFFSET + 60), now, now + 0.1)
+    assert clock.needs_refresh is True
+    clock.add_date_sample('invalid', now, now)
+
+
+def test_clock__time_sample():
+    from mirismanagerclient.lib.clock import ClockOffsetTracker, parse_server_time
+
+    clock = ClockOffsetTracker()
+    # The round trip time is compensated
+    clock.add_time_sample(1000.5, 900, 901)
+    assert clock.get_offset() == 100
+    assert clock.uncertainty == 0.5
+    assert parse_server_time('2020-01-01_00-00-00_000000') == parse_server_time('2020-01-01T00:00:00+00:00')
+
+
+def test_clock__signature_with_offset():
+    from mirismanagerclient.lib.signing import check_signature, get_signature
+
+    signature = get_signature(CONFIG, SERVER_OFFSET)
+    assert check_signature(CONFIG, signature, SERVER_OFFSET) is None
+    assert check_signature(CONFIG, signature) == (
+        'the difference between the request time and the current time is too large.')
+
+
+@patch('requests.Session.post', side_effect=mocked_request)
+@patch('requests.Session.get', side_effect=mocked_request)
+def test_client__clock_sync(mock_get, mock_post):
+    from mirismanagerclient import MirisManagerClient
+    from mirismanagerclient.lib.signing import check_signature
+
+    mmc = MirisManagerClient(local_conf=CONFIG)
+    mmc.api_request('PING')
+    assert abs(mmc.clock.get_offset() - SERVER_OFFSET) < 2
+    mmc.api_request('GET_STATUS')
+    # The request has been signed using the server time
+    headers = mock_get.call_args_list[-1].kwargs['headers']
+    assert check_signature(CONFIG, headers, SERVER_OFFSET) is None
+    # The time API call is used only when a drift is detected
+    assert len(mock_get.call_args_list) == 2
+    mmc.clock.needs_refresh = True
+    mmc.api_request('GET_STATUS')
+    assert mock_get.call_args_list[2].kwargs['url'] == CONFIG['SERVER_URL'] + '/api/time/'
+    assert abs(mmc.clock.get_offset() - SERVER_OFFSET) < 1
+    assert mmc.clock.needs_refresh is False
+
+
+@patch('requests.Session.post', side_effect=mocked_request)
+@patch('requests.Session.get', side_effect=mocked_request)
+def test_client__clock_sync_failure(mock_get, mock_post):
+    import requests
+
+    from mirismanagerclient import MirisManagerClient
+
+    def failing_request(*args, **kwargs):
+        if kwargs['url'] == CONFIG['SERVER_URL'] + '/api/time/':
+            raise requests.ConnectionError('Connection refused')
+        return mocked_request(*args, **kwargs)
+
+    mock_get.side_effect = failing_request
+    mmc = MirisManagerClient(local_conf=CONFIG)
+    mmc.clock.needs_refresh = True
+    for _index in range(3):
+        mmc.api_request('GET_STATUS')
+    # The time API call is not retried for each request after a failure
+    time_calls = [call for call in mock_get.call_args_list if call.kwargs['url'].endswith('/api/time/')]
+    assert len(time_calls) == 1
+    assert mmc.clock.needs_refresh is True
+
+    mmc.clock.retry_delay = 0
+    mmc.clock.refresh_failed()
+    mock_get.side_effect = mocked_request
+    mmc.api_request('GET_STATUS')
+    assert mmc.clock.needs_refresh is False
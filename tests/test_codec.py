@@ -0,0 +1,81 @@
+import gzip
+import json
+from unittest.mock import patch
+from urllib.parse import parse_qs
+
+import pytest
+
+PAYLOADS = [
+    pytest.param({}, id='empty'),
+    pytest.param({'playlist': '/videos/BigBuckBunny_320x180.m3u8'}, id='status_info'),
+    pytest.param({
+        'main': {'has_password': False, 'can_live': False, 'name': 'main', 'label': 'Main', 'type': 'recorder'}
+    }, id='profiles'),
+    pytest.param({'text': 'Special characters: đ€¶←←ħ¶ŧħ<< "\' fF5ef', 'list': [1, 2.5, None, True]}, id='unicode'),
+]
+
+
+def _get_codecs():
+    from mirismanagerclient.lib.codec import CODEC_NAMES, get_codec
+
+    codecs = []
+    for name in CODEC_NAMES:
+        try:
+            codecs.append(get_codec(name))
+        except ImportError:
+            pass
+    return codecs
+
+
+@pytest.mark.parametrize('payload', PAYLOADS)
+def test_codec__roundtrip(payload):
+    for codec in _get_codecs():
+        content = codec.dumps(payload)
+        assert isinstance(content, bytes)
+        assert json.loads(content) == payload
+        assert codec.loads(json.dumps(payload).encode()) == payload
+
+
+def test_codec__invalid():
+    from mirismanagerclient.lib.codec import get_codec
+
+    assert get_codec('auto').name in ('orjson', 'msgspec', 'json')
+    with pytest.raises(ValueError):
+        get_codec('unknown')
+    for codec in _get_codecs():
+        with pytest.raises(ValueError):
+            codec.loads(b'{invalid')
+
+
+def test_compress_form_data():
+    from mirismanagerclient.lib.codec import compress_form_data
+
+    data = {'status_info': json.dumps({'text': 'x' * 2000})}
+    assert compress_form_data(data, None) == (None, None)
+    assert compress_form_data({'status': 'ready'}, 1000) == (None, None)
+    body, headers = compress_form_data(data, 1000)
+    assert headers['Content-Encoding'] == 'gzip'
+    assert len(body) < 1000
+    assert parse_qs(gzip.decompress(body).decode()) == {'status_info': [data['status_info']]}
+
+
+class MockResponse:
+    status_code = 200
+    headers = {}
+    content = b' {"version": "8.0.0"}\n'
+
+
+@patch('requests.Session.post', return_value=MockResponse())
+def test_client__compressed_request(mock_post):
+    from mirismanagerclient import MirisManagerClient
+
+    mmc = MirisManagerClient(local_conf={
+        'SERVER_URL': 'https://mmctest',
+        'API_KEY': 'test API key',
+        'COMPRESS_REQUESTS_ABOVE': 100,
+    })
+    assert mmc.set_status(status='ready') == {'version': '8.0.0'}
+    assert isinstance(mock_post.call_args.kwargs['data'], dict)
+    mmc.set_status(status='ready', status_info='x' * 200)
+    assert 'Content-Encoding' in mock_post.call_args.kwargs['headers']
+    assert isinstance(mock_post.call_args.kwargs['data'], bytes)
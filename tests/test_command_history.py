@@ -0,0 +1,62 @@
+import time
+
+
+def test_command_history__bounded():
+    from mirismanagerclient.lib.command_history import CommandHistory
+
+    history = CommandHistory(max_size=2, ttl=60)
+    assert history.get('uid-1') is None
+    history.set('uid-1', 'DONE', 'result')
+    assert history.get('uid-1') == ('DONE', 'result')
+    history.set('uid-2', 'FAILED')
+    history.set('uid-3', 'IN_PROGRESS')
+    assert history.get('uid-1') is None
+    assert history.get('uid-2') == ('FAILED', '')
+    assert history.get(None) is None
+
+
+def test_command_history__ttl():
+    from mirismanagerclient.lib.command_history import CommandHistory
+
+    history = CommandHistory(ttl=0.05)
+    history.set('uid-1', 'DONE')
+    assert history.get('uid-1') == ('DONE', '')
+    time.sleep(0.1)
+    assert history.get('uid-1') is None
+
+
+def test_command_history__persistence(tmp_path):
+    from mirismanagerclient.lib.command_history import CommandHistory
+
+    path = tmp_path / 'history.json'
+    history = CommandHistory(path=path)
+    history.set('uid-1', 'DONE', 'result')
+    history.set('uid-2', 'IN_PROGRESS', persistent=False)
+    reloaded = CommandHistory(path=path)
+    assert reloaded.get('uid-1') == ('DONE', 'result')
+    # Commands being processed when the process stopped can be run again
+    assert reloaded.get('uid-2') is None
+
+    path.write_text('invalid')
+    assert CommandHistory(path=path).get('uid-1') is None
+
+
+def test_client__command_in_progress_restart(stub_server, tmp_path):
+    from mirismanagerclient import MirisManagerClient
+
+    stub_server.routes['/api/v3/fleet/control/set-command-status/'] = lambda request: (200, {})
+    conf = {
+        'SERVER_URL': stub_server.url,
+        'API_KEY': 'the key',
+        'SECRET_KEY': 'the secret',
+        'COMMAND_HISTORY_PATH': str(tmp_path / 'history.json'),
+    }
+    client = MirisManagerClient(local_conf=conf, setup_logging=False)
+    client.set_command_status('uid-1', 'IN_PROGRESS', 'Started')
+    client.set_command_status('uid-2', 'DONE', 'Finished')
+    assert client.command_history.get('uid-1') == ('IN_PROGRESS', 'Started')
+
+    # After a restart, the command in progress is run again when the server sends it again
+    restarted = MirisManagerClient(local_conf=conf, setup_logging=False)
+    assert restarted.command_history.get('uid-1') is None
+    assert restarted.command_history.get('uid-2') == ('DONE', 'Finished')
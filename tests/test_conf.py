@@ -73,3 +73,15 @@ def test_conf_check(conf, is_valid):
     else:
         with pytest.raises(ValueError):
             check_conf(conf)
+
+
+def test_conf_server_urls():
+    from mirismanagerclient.lib.configuration import check_conf, get_server_urls, load_conf
+
+    conf = load_conf(local_conf={'SERVER_URL': ['https://primary/', 'https://secondary']})
+    assert conf['SERVER_URL'] == ['https://primary', 'https://secondary']
+    assert get_server_urls(conf) == ['https://primary', 'https://secondary']
+    check_conf(conf)
+    assert get_server_urls({'SERVER_URL': 'https://test'}) == ['https://test']
+    with pytest.raises(ValueError):
+        check_conf({'SERVER_URL': []})
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+
+def test_endpoints__failover():
+    from mirismanagerclient.lib.endpoints import EndpointSelector
+
+    selector = EndpointSelector(['https://primary', 'https://secondary', 'https://tertiary'])
+    assert selector.url == 'https://primary'
+    selector.record_success('https://tertiary', 0.05)
+    selector.record_failure('https://primary')
+    # The fastest healthy endpoint is used
+    assert selector.url == 'https://tertiary'
+    selector.record_failure('https://tertiary')
+    assert selector.url == 'https://secondary'
+    selector.record_failure('https://secondary')
+    # No healthy endpoint: the next one is tried
+    assert selector.url == 'https://tertiary'
+    assert [stats['failures'] for stats in selector.get_stats()] == [1, 1, 1]
+
+
+def test_endpoints__failback_hysteresis():
+    from mirismanagerclient.lib.endpoints import EndpointSelector
+
+    selector = EndpointSelector(['https://primary', 'https://secondary'], alpha=0.5, failback_delay=0.1)
+    selector.record_success('https://primary', 0.1)
+    selector.record_success('https://secondary', 0.08)
+    # Not fast enough to switch
+    assert selector.url == 'https://primary'
+    selector.record_success('https://secondary', 0.02)
+    assert selector.endpoints[1].rtt == pytest.approx(0.05)
+    assert selector.url == 'https://secondary'
+
+    selector.record_failure('https://primary')
+    selector.record_success('https://primary', 0.01)
+    # Recovered endpoints are used again only after a delay
+    assert selector.url == 'https://secondary'
+    time.sleep(0.15)
+    selector.record_success('https://primary', 0.01)
+    assert selector.url == 'https://primary'
+
+
+def test_client__failover(stub_server):
+    import requests
+
+    from mirismanagerclient import MirisManagerClient, MirisManagerRequestError
+
+    stub_server.routes['/api/'] = lambda request: (200, {'version': '8.0.0'})
+    # Two URLs of the same stub server
+    other_url = stub_server.url.replace('127.0.0.1', 'localhost')
+    conf = {'SERVER_URL': ['http://127.0.0.1:1', stub_server.url, other_url], 'RATE_LIMITS': None}
+    client = MirisManagerClient(local_conf=conf, setup_logging=False)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.api_request('PING')
+    assert client.get_server_url() == stub_server.url
+    assert client.api_request('PING') == {'version': '8.0.0'}
+
+    stub_server.routes['/api/'] = lambda request: (503, {'error': 'Unavailable.'})
+    with pytest.raises(MirisManagerRequestError):
+        client.api_request('PING')
+    assert client.get_server_url() == other_url
+
+    stub_server.routes['/api/'] = lambda request: (200, {'version': '8.0.0'})
+    stats = client.check_servers()
+    assert [endpoint['healthy'] for endpoint in stats] == [False, True, True]
+    assert stats[1]['rtt'] is not None
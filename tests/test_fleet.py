@@ -0,0 +1,91 @@
+import time
+
+
+def test_fleet_controller(stub_server):
+    from mirismanagerclient import MirisManagerClient
+    from mirismanagerclient.lib.fleet import FleetController
+
+    started = {}
+    statuses = {'room-1': 'READY', 'room-3': 'UNAVAILABLE', 'room-4': 'READY'}
+
+    def run_command(request):
+        profile = request['data']['profile']
+        if profile == 'room-2':
+            return 400, {'error': 'No system is available to record.'}
+        started[profile] = time.monotonic()
+        return 200, {'uid': 'uid-' + profile, 'status': 'DONE', 'message': 'Recording started'}
+
+    def get_status(request):
+        profile = request['params']['profile']
+        status = statuses[profile]
+        if profile == 'room-1':
+            status = 'RUNNING' if time.monotonic() - started[profile] > 0.2 else 'INITIALIZING'
+        return 200, {'status': status}
+
+    stub_server.routes['/api/v3/fleet/control/run-command/'] = run_command
+    stub_server.routes['/api/v3/fleet/systems/get-status/'] = get_status
+    conf = {'SERVER_URL': stub_server.url, 'API_KEY': 'user key', 'AUTO_REGISTRATION': False}
+    client = MirisManagerClient(local_conf=conf, setup_logging=False)
+    reported = []
+    controller = FleetController(
+        client, fast_interval=0.05, slow_interval=0.2, timeout=1, on_result=lambda result: reported.append(result))
+    results = controller.run('START_RECORDING', ['room-1', 'room-2', 'room-3', 'room-4'], params={'title': 'Test'})
+
+    # Results are reported as soon as they are known
+    assert [result.profile for result in reported] == ['room-2', 'room-3', 'room-1', 'room-4']
+    assert results['room-1'].ok
+    assert results['room-1'].status == 'RUNNING'
+    assert results['room-1'].polls >= 3
+    assert results['room-1'].message == 'Recording started'
+    assert 'No system' in results['room-2'].error
+    assert results['room-3'].error == 'The profile does not exist or no system is online.'
+    assert results['room-4'].error.startswith('Timeout')
+    # Profiles which are not initializing are polled slowly
+    assert results['room-4'].polls <= 6
+    assert stub_server.requests[0]['data']['title'] == 'Test'
+    assert stub_server.requests[0]['data']['async'] == 'no'
+    stats = controller.get_stats(results)
+    assert stats['succeeded'] == 1
+    assert stats['failed'] == 3
+
+    # Without target status, the status is not polled
+    stub_server.requests.clear()
+    results = client.control_profiles('MUTE', ['room-1'])
+    assert results['room-1'].ok
+    assert [request['path'] for request in stub_server.requests] == ['/api/v3/fleet/control/run-command/']
+
+
+def test_fleet_controller__unexpected_errors(stub_server):
+    from mirismanagerclient import MirisManagerClient
+    from mirismanagerclient.lib.fleet import FleetController
+
+    def run_command(request):
+        if request['data']['profile'] == 'room-1':
+            # Malformed JSON body
+            handler = request['handler']
+            handler.send_response(200)
+            handler.send_header('Content-Type', 'application/json')
+            handler.send_header('Content-Length', '6')
+            handler.end_headers()
+            handler.wfile.write(b'{"uid"')
+            return None
+        return 200, {'uid': 'uid', 'status': 'DONE'}
+
+    def get_status(request):
+        if request['params']['profile'] == 'room-2':
+            # Unexpected status payload
+            return 200, ['RUNNING']
+        return 200, {'status': 'RUNNING'}
+
+    stub_server.routes['/api/v3/fleet/control/run-command/'] = run_command
+    stub_server.routes['/api/v3/fleet/systems/get-status/'] = get_status
+    conf = {'SERVER_URL': stub_server.url, 'API_KEY': 'user key', 'AUTO_REGISTRATION': False}
+    client = MirisManagerClient(local_conf=conf, setup_logging=False)
+    controller = FleetController(client, fast_interval=0.05, slow_interval=0.05, timeout=1)
+    results = controller.run('START_RECORDING', ['room-1', 'room-2', 'room-3'])
+    # Each profile has its result even if the response of another one is invalid
+    assert not results['room-1'].ok
+    assert results['room-1'].error
+    assert not results['room-2'].ok
+    assert results['room-2'].error.startswith('AttributeError')
+    assert results['room-3'].ok
@@ -0,0 +1,62 @@
+import json
+import os
+import time
+
+import pytest
+
+
+def test_cached_download(stub_server, tmp_path):
+    import requests
+
+    from mirismanagerclient.lib.http_cache import CachedDownload
+
+    schedule = {'schedule': {'version': '1', 'talks': ['x' * 1000] * 100}}
+
+    def get_schedule(request):
+        handler = request['handler']
+        if request['headers'].get('If-None-Match') == '"v1"':
+            handler.send_response(304)
+            handler.send_header('Content-Length', '0')
+            handler.end_headers()
+            return None
+        content = json.dumps(schedule).encode('utf-8')
+        handler.send_response(200)
+        handler.send_header('ETag', '"v1"')
+        handler.send_header('Last-Modified', 'Sat, 06 Jul 2024 10:00:00 GMT')
+        handler.send_header('Content-Length', str(len(content)))
+        handler.end_headers()
+        handler.wfile.write(content)
+        return None
+
+    stub_server.routes['/schedule.json'] = get_schedule
+    path = tmp_path / 'schedule.json'
+    cache = CachedDownload(stub_server.url + '/schedule.json', path, ttl=60, chunk_size=1024)
+    assert cache.get_json() == schedule
+    assert cache.load_meta()['etag'] == '"v1"'
+    assert not os.path.exists(str(path) + '.tmp')
+
+    # Within the TTL, no request is done
+    assert cache.get_json() == schedule
+    assert stub_server.count('/schedule.json') == 1
+
+    # Revalidation of an unchanged document
+    mtime = os.path.getmtime(path)
+    time.sleep(0.01)
+    assert cache.get_json(revalidate=True) == schedule
+    assert stub_server.requests[-1]['headers']['If-Modified-Since'] == 'Sat, 06 Jul 2024 10:00:00 GMT'
+    assert os.path.getmtime(path) == mtime
+
+    # Expired cache and unreachable server: the cached document is used
+    cache.url = cache.url.replace(stub_server.url, 'http://127.0.0.1:1')
+    assert cache.load_meta() == {}
+    with pytest.raises(requests.ConnectionError):
+        cache.get_path()
+    cache.url = stub_server.url + '/schedule.json'
+    stub_server.routes['/schedule.json'] = lambda request: (500, {'error': 'Failed.'})
+    assert cache.get_json(revalidate=True) == schedule
+
+    # A changed document replaces the cached one
+    schedule['schedule']['version'] = '2'
+    stub_server.routes['/schedule.json'] = lambda request: (200, schedule)
+    assert cache.get_json(revalidate=True)['schedule']['version'] == '2'
+    assert cache.load_meta()['etag'] is None
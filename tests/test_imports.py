@@ -0,0 +1,63 @@
+from pathlib import Path
+import subprocess
+import sys
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def _run(code, *args):
+    result = subprocess.run(
+        [sys.executable, *args, '-c', code],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return result
+
+
+@pytest.mark.parametrize('statement, not_imported', [
+    pytest.param(
+        'import mirismanagerclient',
+        ['requests', 'mirismanagerclient.client'],
+        id='package'),
+    pytest.param(
+        'from mirismanagerclient import MirisManagerClient',
+        [
+            'asyncio',
+            'multiprocessing',
+            'subprocess',
+            'mirismanagerclient.lib.long_polling',
+            'mirismanagerclient.lib.ssh_tunnel',
+        ],
+        id='client'),
+])
+def test_lazy_imports(statement, not_imported):
+    code = f'{statement}\nimport sys\nprint(" ".join(sorted(sys.modules)))'
+    modules = _run(code).stdout.split()
+    imported = [name for name in not_imported if name in modules]
+    assert imported == []
+
+
+def test_lazy_imports__long_polling():
+    code = (
+        'import sys\n'
+        'from mirismanagerclient import MirisManagerClient\n'
+        'from mirismanagerclient.lib import long_polling\n'
+        'print("subprocess" in sys.modules)'
+    )
+    assert _run(code).stdout.strip() == 'False'
+
+
+def test_import_time():
+    # Duration of the client import in microseconds, "requests" is imported before because it is always needed
+    code = (
+        'import time\n'
+        'import requests\n'
+        'start = time.perf_counter()\n'
+        'from mirismanagerclient import MirisManagerClient\n'
+        'print(int((time.perf_counter() - start) * 1000000))'
+    )
+    assert int(_run(code).stdout.strip()) < 100000
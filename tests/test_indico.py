@@ -0,0 +1,105 @@
+import io
+import json
+
+import pytest
+
+
+def _get_entry(entry_id, title, room, start, end):
+    return {
+        'entryType': 'Contribution',
+        'id': entry_id,
+        'title': title,
+        'room': room,
+        'presenters': [{'name': 'Ada'}, {'name': 'Bob'}],
+        'description': 'Description of %s' % title,
+        'startDate': {'date': '2023-09-20', 'time': start, 'tz': 'Europe/Paris'},
+        'endDate': {'date': '2023-09-20', 'time': end, 'tz': 'Europe/Paris'},
+    }
+
+
+EXPORT = {
+    'count': 12345678,
+    'additionalInfo': {'nested': {'values': [1, 2.5, None, 'a "quoted" }']}},
+    'results': {
+        '5': {
+            '20230920': {
+                's1': {
+                    'entryType': 'Session',
+                    'title': 'Main',
+                    'entries': {
+                        'c1': _get_entry('c1', 'Talk 1', 'Room 1', '09:00:00', '09:30:00'),
+                        'c2': _get_entry('c2', 'Talk 2', 'Room 2', '09:00:00', '09:45:00'),
+                        'b1': {'entryType': 'Break', 'title': 'Coffee'},
+                    },
+                },
+                'b2': {'entryType': 'Break', 'title': 'Lunch'},
+                's2': {'entryType': 'Session', 'title': 'Room 1', 'entries': {
+                    'c3': dict(_get_entry('c3', 'Talk 3', None, '14:00:00', '14:20:00'), room=None),
+                }},
+            },
+            '20230921': {},
+        },
+    },
+}
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 65536])
+def test_iter_indico_events(chunk_size):
+    from mirismanagerclient.lib.indico import iter_indico_events
+
+    content = json.dumps(EXPORT, indent=2)
+    events = list(iter_indico_events(io.StringIO(content), chunk_size=chunk_size))
+    assert [event.key for event in events] == ['indico:c1', 'indico:c2', 'indico:c3']
+    assert events[0].speaker == 'Ada, Bob'
+    assert events[0].start.isoformat() == '2023-09-20T09:00:00+02:00'
+    assert events[0].time_zone == 'Europe/Paris'
+    # Timezones and rooms are shared
+    assert events[0].start.tzinfo is events[2].end.tzinfo
+    assert events[0].room is events[2].room
+
+    events = list(iter_indico_events(io.StringIO(content), room='Room 1', enabled=True, chunk_size=chunk_size))
+    assert [event.key for event in events] == ['indico:c1', 'indico:c3']
+    assert events[1].room == 'Room 1'
+    assert events[1].to_data()['enabled'] == 'yes'
+
+    events = list(iter_indico_events(io.StringIO(content), prefix='indico:Room 1:', chunk_size=chunk_size))
+    assert events[0].key == 'indico:Room 1:c1'
+
+
+def test_iter_sessions__bounded_buffer():
+    from mirismanagerclient.lib.indico import JSONStreamReader
+
+    sessions = {f's{index}': {'entryType': 'Session', 'title': 'x' * 100, 'entries': {}} for index in range(1000)}
+    content = json.dumps({'results': {'1': {'20230920': sessions}}})
+    reader = JSONStreamReader(io.StringIO(content), chunk_size=256)
+    max_buffer = 0
+    for _key in reader.iter_object():
+        for _event in reader.iter_object():
+            for _day in reader.iter_object():
+                for _session in reader.iter_object():
+                    reader.read_value()
+                    max_buffer = max(max_buffer, len(reader.buffer))
+    assert max_buffer < 1024
+
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3])
+def test_json_stream_reader__split_values(chunk_size):
+    from mirismanagerclient.lib.indico import JSONStreamReader
+
+    reader = JSONStreamReader(io.StringIO('{"a": -2.5e10, "b": 1, "c": "%s"}' % ('x' * 10000)), chunk_size=chunk_size)
+    decode = reader.decoder.raw_decode
+    calls = []
+    reader.decoder.raw_decode = lambda *args: calls.append(args) or decode(*args)
+    assert {key: reader.read_value() for key in reader.iter_object()} == {'a': -2.5e10, 'b': 1, 'c': 'x' * 10000}
+    # Large values are not decoded again for each chunk
+    assert len(calls) < 100
+
+
+def test_iter_sessions__invalid():
+    from mirismanagerclient.lib.indico import iter_sessions
+
+    with pytest.raises(ValueError):
+        list(iter_sessions(io.StringIO('{"results": {"5": {"20230920": {"s1": {"entryType": "Session"')))
+    with pytest.raises(ValueError):
+        list(iter_sessions(io.StringIO('{"results" {}}')))
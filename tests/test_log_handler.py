@@ -0,0 +1,85 @@
+import logging
+import time
+
+
+def test_message_handler(stub_server):
+    from mirismanagerclient import MirisManagerClient
+
+    def add_message(request):
+        time.sleep(0.05)
+        return 200, {}
+
+    stub_server.routes['/api/v3/fleet/messages/add/'] = add_message
+    conf = {
+        'SERVER_URL': stub_server.url,
+        'API_KEY': 'the key',
+        'SECRET_KEY': 'the secret',
+        'MESSAGES_LOG_LEVEL': 'WARNING',
+        'MESSAGES_LOG_WINDOW': 0.3,
+        'MESSAGES_LOG_RATE': 100,
+    }
+    client = MirisManagerClient(local_conf=conf, setup_logging=False)
+    handler = client.log_handler
+    assert client.forward_logs() is handler
+    assert handler in logging.getLogger().handlers
+    test_logger = logging.getLogger('test_message_handler')
+    test_logger.propagate = False
+    # The handler is added to the logger given in a second call
+    assert client.forward_logs(logger_name='test_message_handler') is handler
+    try:
+        start = time.monotonic()
+        for _index in range(200):
+            test_logger.error('Device %s is not responding.', 'hdmi-1')
+        test_logger.info('Not forwarded.')
+        try:
+            raise RuntimeError('failure')
+        except RuntimeError:
+            test_logger.warning('Capture failed.', exc_info=True)
+        # Logging never waits for the server
+        assert time.monotonic() - start < 0.05
+        time.sleep(0.6)
+    finally:
+        client.stop_forwarding_logs()
+        test_logger.propagate = True
+    assert client.log_handler is None
+    assert handler not in logging.getLogger().handlers
+    assert handler not in test_logger.handlers
+
+    messages = [request['data'] for request in stub_server.requests]
+    assert len(messages) == 3
+    assert messages[0] == {'content': 'Device hdmi-1 is not responding.', 'level': 'error'}
+    assert messages[1]['level'] == 'warning'
+    assert 'RuntimeError: failure' in messages[1]['content_debug']
+    # Identical messages are merged
+    assert messages[2]['content'].startswith('Device hdmi-1 is not responding.\n(199 times from ')
+    assert handler.sent == 3
+    assert handler.dropped == 0
+
+
+def test_message_handler__rate_and_queue():
+    from mirismanagerclient.lib.log_handler import MessageHandler
+
+    class Client():
+        def __init__(self):
+            self.messages = []
+
+        def api_request(self, action, data):
+            self.messages.append(data['content'])
+
+    client = Client()
+    handler = MessageHandler(client, rate=10, burst=2, queue_size=5, window=10)
+    test_logger = logging.getLogger('test_message_handler__rate')
+    test_logger.propagate = False
+    test_logger.addHandler(handler)
+    try:
+        start = time.monotonic()
+        for index in range(20):
+            test_logger.warning('Message %s', index)
+        assert time.monotonic() - start < 0.05
+        handler.close()
+    finally:
+        test_logger.removeHandler(handler)
+    # The queue is bounded and the rate is limited
+    assert handler.dropped >= 10
+    assert len(client.messages) == 20 - handler.dropped
+    assert time.monotonic() - start >= (len(client.messages) - 2) / 10 * 0.9
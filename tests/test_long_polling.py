@@ -0,0 +1,259 @@
+import json
+
+import pytest
+
+CONFIG = {
+    'SECRET_KEY': 'the secret key',
+    'API_KEY': 'test API key',
+    'LONG_POLLING_STREAM': True,
+}
+COMMANDS = [
+    ('uid-1', 'START_RECORDING', {'profile': 'main'}),
+    ('uid-2', 'GET_SCREENSHOT', {}),
+    ('uid-3', 'LIST_PROFILES', {}),
+]
+
+
+def _get_command(uid, action, params):
+    from mirismanagerclient.lib.signing import get_signature
+
+    data = get_signature(CONFIG)
+    data.update({'uid': uid, 'action': action, 'params': params})
+    return data
+
+
+def _write_chunked(request, content_type, chunks):
+    handler = request['handler']
+    handler.send_response(200)
+    handler.send_header('Content-Type', content_type)
+    handler.send_header('Transfer-Encoding', 'chunked')
+    handler.end_headers()
+    for chunk in chunks:
+        handler.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+        handler.wfile.flush()
+    handler.wfile.write(b'0\r\n\r\n')
+
+
+def _ndjson(request):
+    chunks = [json.dumps(_get_command(*command)).encode() + b'\n' for command in COMMANDS]
+    chunks.insert(1, b'\n')  # keep alive
+    _write_chunked(request, 'application/x-ndjson', chunks)
+
+
+def _sse(request):
+    chunks = [b': keep alive\n\n']
+    chunks += [b'data: ' + json.dumps(_get_command(*command)).encode() + b'\n\n' for command in COMMANDS]
+    _write_chunked(request, 'text/event-stream; charset=utf-8', chunks)
+
+
+def _one_shot(request):
+    return 200, _get_command(*COMMANDS[0])
+
+
+def _not_acceptable(request):
+    if 'ndjson' in request['headers'].get('Accept', ''):
+        return 406, {'error': 'Not acceptable.'}
+    return 200, _get_command(*COMMANDS[0])
+
+
+@pytest.mark.parametrize('long_polling, expected_uids, stream_supported', [
+    pytest.param(_ndjson, ['uid-1', 'uid-2', 'uid-3'], True, id='ndjson'),
+    pytest.param(_sse, ['uid-1', 'uid-2', 'uid-3'], True, id='sse'),
+    pytest.param(_one_shot, ['uid-1'], None, id='one-shot'),
+    pytest.param(_not_acceptable, ['uid-1'], False, id='not-acceptable'),
+])
+def test_long_polling__stream(stub_server, long_polling, expected_uids, stream_supported):
+    from mirismanagerclient import MirisManagerClient
+
+    commands = []
+
+    class LongPollingClient(MirisManagerClient):
+        def handle_action(self, uid, action, params):
+            commands.append((uid, action, params))
+            return 'DONE', action
+
+    stub_server.routes['/remote-event/v3'] = long_polling
+    stub_server.routes['/api/v3/fleet/control/set-command-status/'] = lambda request: (200, {})
+    mmc = LongPollingClient(local_conf=dict(CONFIG, SERVER_URL=stub_server.url), setup_logging=False)
+    mmc.long_polling_loop(single_loop=True)
+
+    assert [command[0] for command in commands] == expected_uids
+    statuses = [
+        request['data'] for request in stub_server.requests
+        if request['path'] == '/api/v3/fleet/control/set-command-status/'
+    ]
+    assert statuses == [
+        {'uid': uid, 'status': 'DONE', 'data': action}
+        for uid, action, _params in COMMANDS if uid in expected_uids
+    ]
+    assert mmc._long_polling_manager.stream_supported is stream_supported
+
+
+def test_long_polling__invalid_signature(stub_server):
+    from mirismanagerclient import MirisManagerClient
+
+    def long_polling(request):
+        data = _get_command(*COMMANDS[0])
+        data['hmac'] = 'aW52YWxpZA=='
+        _write_chunked(request, 'application/x-ndjson', [json.dumps(data).encode() + b'\n'])
+
+    stub_server.routes['/remote-event/v3'] = long_polling
+    stub_server.routes['/api/v3/fleet/control/set-command-status/'] = lambda request: (200, {})
+    mmc = MirisManagerClient(local_conf=dict(CONFIG, SERVER_URL=stub_server.url), setup_logging=False)
+    mmc.long_polling_loop(single_loop=True)
+    assert stub_server.requests[-1]['data']['status'] == 'FAILED'
+
+
+def test_long_polling__command_sent_again(stub_server):
+    from mirismanagerclient import MirisManagerClient
+
+    commands = []
+
+    class LongPollingClient(MirisManagerClient):
+        def handle_action(self, uid, action, params):
+            commands.append(uid)
+            return 'DONE', 'started'
+
+    def long_polling(request):
+        # The first command is sent again, for example because its status was not received
+        chunks = [json.dumps(_get_command(*COMMANDS[index])).encode() + b'\n' for index in (0, 1, 0)]
+        _write_chunked(request, 'application/x-ndjson', chunks)
+
+    stub_server.routes['/remote-event/v3'] = long_polling
+    stub_server.routes['/api/v3/fleet/control/set-command-status/'] = lambda request: (200, {})
+    mmc = LongPollingClient(local_conf=dict(CONFIG, SERVER_URL=stub_server.url), setup_logging=False)
+    mmc.long_polling_loop(single_loop=True)
+
+    assert commands == ['uid-1', 'uid-2']
+    statuses = [
+        request['data'] for request in stub_server.requests
+        if request['path'] == '/api/v3/fleet/control/set-command-status/'
+    ]
+    assert statuses[2] == {'uid': 'uid-1', 'status': 'DONE', 'data': 'started'}
+
+
+def test_long_polling__scheduler(stub_server):
+    from mirismanagerclient import MirisManagerClient
+
+    class LongPollingClient(MirisManagerClient):
+        def handle_action(self, uid, action, params):
+            return 'DONE', action
+
+    stub_server.routes['/remote-event/v3'] = lambda request: (200, _get_command(*COMMANDS[0]))
+    stub_server.routes['/api/v3/fleet/control/set-command-status/'] = lambda request: (200, {})
+    conf = dict(CONFIG, SERVER_URL=stub_server.url, LONG_POLLING_STREAM=False, COMMAND_WORKERS=2)
+    mmc = LongPollingClient(local_conf=conf, setup_logging=False)
+    mmc.long_polling_loop(single_loop=True)
+    scheduler = mmc._long_polling_manager.scheduler
+    assert scheduler.wait_idle(5)
+    scheduler.stop()
+    assert stub_server.requests[-1]['data'] == {'uid': 'uid-1', 'status': 'DONE', 'data': 'START_RECORDING'}
+    assert scheduler.get_stats()['START_RECORDING']['count'] == 1
+
+
+@pytest.mark.parametrize('error, kind', [
+    ('ReadTimeout', 'timeout'),
+    ('ConnectTimeout', 'error'),
+    ('ChunkedEncodingError', 'dropped'),
+    ('dropped', 'dropped'),
+    ('stream timeout', 'timeout'),
+    ('ConnectionError', 'error'),
+    ('ValueError', 'error'),
+])
+def test_long_polling__classify_error(error, kind):
+    import requests
+    from urllib3.exceptions import ProtocolError, ReadTimeoutError
+
+    from mirismanagerclient.lib.long_polling import classify_error
+
+    if error == 'dropped':
+        exception = requests.exceptions.ConnectionError(ProtocolError('Connection aborted.'))
+    elif error == 'stream timeout':
+        exception = requests.exceptions.ConnectionError(ReadTimeoutError(None, '/', 'Read timed out.'))
+    elif error == 'ValueError':
+        exception = ValueError('test')
+    else:
+        exception = getattr(requests.exceptions, error)('test')
+    assert classify_error(exception) == kind
+
+
+def test_long_polling__adaptive_timeout():
+    from mirismanagerclient.lib.long_polling import LongPollingTimeout
+
+    timeout = LongPollingTimeout(max_timeout=300, min_timeout=30)
+    assert timeout.value == 300
+    timeout.on_dropped(100)
+    assert timeout.value == 80
+    assert timeout.ceiling == 100
+    # The timeout is raised progressively but stays below the idle duration of the dropped connection
+    timeout.on_success(80)
+    assert timeout.value == 80
+    assert timeout.survived == 80
+    timeout.on_dropped(50)
+    assert timeout.value == 40
+    for _index in range(LongPollingTimeout.PROBE_AFTER):
+        timeout.on_success(40)
+    # A longer timeout is tried again after several successful requests
+    assert timeout.ceiling == 62.5
+    assert timeout.value == 50
+    timeout.on_dropped(5)
+    assert timeout.value == 30
+
+    fixed = LongPollingTimeout(max_timeout=120, adaptive=False)
+    fixed.on_dropped(50)
+    assert fixed.value == 120
+
+
+def test_long_polling__dropped_connection(stub_server):
+    import time
+
+    from mirismanagerclient import MirisManagerClient
+
+    def long_polling(request):
+        # Close the connection without response
+        time.sleep(0.3)
+        request['handler'].close_connection = True
+        request['handler'].wfile.write(b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n5\r\nab')
+
+    stub_server.routes['/remote-event/v3'] = long_polling
+    conf = dict(CONFIG, SERVER_URL=stub_server.url, LONG_POLLING_MIN_TIMEOUT=0.1)
+    mmc = MirisManagerClient(local_conf=conf, setup_logging=False)
+    mmc.long_polling_loop(single_loop=True)
+    manager = mmc._long_polling_manager
+    assert 0.3 <= manager.timeout.ceiling < 1
+    assert manager.timeout.value < 1
+
+
+def test_long_polling__hanging_server(stub_server):
+    import socket
+    import time
+
+    from mirismanagerclient import MirisManagerClient
+
+    stub_server.routes['/api/'] = lambda request: (200, {'version': '8.0.0'})
+    stub_server.routes['/remote-event/v3'] = lambda request: (200, {})
+    # Server accepting connections without ever answering
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as hanging:
+        hanging.bind(('127.0.0.1', 0))
+        hanging.listen(8)
+        hanging_url = 'http://127.0.0.1:%s' % hanging.getsockname()[1]
+        conf = dict(
+            CONFIG,
+            SERVER_URL=[hanging_url, stub_server.url],
+            SERVER_CHECK_INTERVAL=0.5,
+            API_CALLS={'PING': {'timeout': 0.2}},
+        )
+        mmc = MirisManagerClient(local_conf=conf, setup_logging=False)
+        assert mmc.get_server_url() == hanging_url
+        # The long polling request is limited to the servers check interval
+        start = time.monotonic()
+        mmc.long_polling_loop(single_loop=True)
+        assert time.monotonic() - start < 2
+        manager = mmc._long_polling_manager
+        assert manager.timeout.value == 300
+        assert manager.timeout.ceiling is None
+
+        mmc.check_servers()
+        assert mmc.get_server_url() == stub_server.url
+        mmc.long_polling_loop(single_loop=True)
+    assert stub_server.count('/remote-event/v3') == 1
@@ -0,0 +1,104 @@
+import threading
+import time
+
+
+def _make_tracker(fail=0, **kwargs):
+    from mirismanagerclient.lib.progress import CommandTracker
+
+    sent = []
+    failures = [fail]
+    lock = threading.Lock()
+
+    def send(uid, status, data):
+        with lock:
+            if failures[0]:
+                failures[0] -= 1
+                raise ConnectionError('Server unreachable')
+            sent.append((uid, status, data))
+
+    return CommandTracker(send, **kwargs), sent
+
+
+def test_progress__coalesced():
+    tracker, sent = _make_tracker(interval=0.2)
+    progress = tracker.track('uid-1')
+    progress.update('0%')
+    time.sleep(0.05)
+    for percent in range(10, 100, 10):
+        progress.update(f'{percent}%')
+    time.sleep(0.3)
+    progress.update('95%')
+    progress.done('finished')
+    assert tracker.flush(5)
+    tracker.stop()
+    # The last update is replaced by the final status
+    assert sent == [('uid-1', 'IN_PROGRESS', '0%'), ('uid-1', 'IN_PROGRESS', '90%'), ('uid-1', 'DONE', 'finished')]
+
+
+def test_progress__final_status_retried():
+    tracker, sent = _make_tracker(fail=2, retry_delay=0.05)
+    progress = tracker.track('uid-1')
+    progress.failed('error')
+    progress.update('ignored')
+    assert tracker.flush(5)
+    tracker.stop()
+    assert sent == [('uid-1', 'FAILED', 'error')]
+
+
+def test_progress__final_status_rejected(tmp_path):
+    from mirismanagerclient import MirisManagerRequestError
+    from mirismanagerclient.lib.progress import CommandTracker
+
+    calls = []
+
+    def send(uid, status, data):
+        calls.append(uid)
+        if uid == 'uid-unknown':
+            raise MirisManagerRequestError('Unknown command.', status_code=404)
+        if len(calls) < 3:
+            raise MirisManagerRequestError('Unavailable.', status_code=503)
+
+    path = tmp_path / 'statuses.json'
+    tracker = CommandTracker(send, retry_delay=0.05, path=path)
+    tracker.track('uid-unknown').done('result')
+    tracker.track('uid-1').done('result')
+    assert tracker.flush(5)
+    tracker.stop()
+    # Rejected statuses are dropped, server errors are retried
+    assert calls.count('uid-unknown') == 1
+    assert calls.count('uid-1') >= 2
+    assert CommandTracker(send, path=path)._finals == {}
+
+
+def test_progress__persistence(tmp_path):
+    path = tmp_path / 'statuses.json'
+    tracker, sent = _make_tracker(fail=1000, retry_delay=10, path=path)
+    tracker.track('uid-1').done('result')
+    assert not tracker.flush(0.2)
+    tracker.stop()
+    assert sent == []
+
+    # Undelivered statuses are sent after a restart
+    tracker, sent = _make_tracker(path=path)
+    assert tracker.flush(5)
+    tracker.stop()
+    assert sent == [('uid-1', 'DONE', 'result')]
+    assert _make_tracker(path=path)[0]._finals == {}
+
+
+def test_client__track_command(stub_server):
+    from mirismanagerclient import MirisManagerClient
+
+    stub_server.routes['/api/v3/fleet/control/set-command-status/'] = lambda request: (200, {})
+    conf = {'SERVER_URL': stub_server.url, 'API_KEY': 'key', 'SECRET_KEY': 'secret'}
+    client = MirisManagerClient(local_conf=conf, setup_logging=False)
+    progress = client.track_command('uid-1')
+    progress.update({'progress': 50})
+    time.sleep(0.1)
+    progress.done('ok')
+    assert client.get_command_tracker().flush(5)
+    assert [request['data'] for request in stub_server.requests] == [
+        {'uid': 'uid-1', 'status': 'IN_PROGRESS', 'data': '{"progress":50}'},
+        {'uid': 'uid-1', 'status': 'DONE', 'data': 'ok'},
+    ]
+    assert client.command_history.get('uid-1') == ('DONE', 'ok')
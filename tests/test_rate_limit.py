@@ -0,0 +1,70 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+
+class MockResponse:
+    status_code = 200
+    headers = {}
+    content = b'{}'
+
+
+def test_token_bucket():
+    from mirismanagerclient.lib.rate_limit import TokenBucket
+
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    # Next calls are queued
+    assert 0.09 < bucket.reserve() <= 0.1
+    assert 0.19 < bucket.reserve() <= 0.2
+
+
+def test_rate_limiter__threads():
+    from mirismanagerclient.lib.rate_limit import RateLimiter
+
+    limiter = RateLimiter({'status': {'rate': 50, 'burst': 5}, 'reads': None})
+    assert limiter.acquire('reads') == 0
+    assert limiter.acquire(None) == 0
+    start = time.monotonic()
+    threads = [threading.Thread(target=limiter.acquire, args=('status', )) for _i in range(15)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 5 calls are allowed immediately, the 10 others need 0.2s
+    assert time.monotonic() - start >= 0.18
+    stats = limiter.get_stats()
+    assert list(stats.keys()) == ['status']
+    assert stats['status']['calls'] == 15
+    assert stats['status']['delayed'] == 10
+
+
+def test_rate_limiter__asyncio():
+    from mirismanagerclient.lib.rate_limit import RateLimiter
+
+    limiter = RateLimiter({'messages': {'rate': 100, 'burst': 1}})
+
+    async def run():
+        return await asyncio.gather(*[limiter.acquire_async('messages') for _i in range(3)])
+
+    delays = asyncio.run(run())
+    assert delays[0] == 0
+    assert delays[2] > delays[1] > 0
+
+
+@patch('requests.Session.post', return_value=MockResponse())
+def test_client__command_status_not_limited(mock_post):
+    from mirismanagerclient import MirisManagerClient
+
+    mmc = MirisManagerClient(local_conf={
+        'SERVER_URL': 'https://mmctest',
+        'API_KEY': 'test API key',
+        'RATE_LIMITS': {'status': {'rate': 0.001, 'burst': 1}},
+    })
+    mmc.set_status(status='ready')
+    for _i in range(5):
+        mmc.set_command_status('uid', 'DONE')
+    assert len(mock_post.call_args_list) == 6
+    assert mmc.rate_limiter.get_stats() == {'status': {'calls': 1, 'delayed': 0, 'delay': 0.0}}
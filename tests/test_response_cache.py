@@ -0,0 +1,102 @@
+import json
+from unittest.mock import patch
+
+CONFIG = {
+    'SERVER_URL': 'https://mmctest',
+    'SECRET_KEY': 'the secret key',
+    'API_KEY': 'test API key',
+    'RESPONSE_CACHE': True,
+}
+
+
+class MockResponse:
+    def __init__(self, json_data, status_code, headers=None):
+        self.text = json.dumps(json_data) if json_data is not None else ''
+        self.content = self.text.encode()
+        self.json_data = json_data
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        return self.json_data
+
+
+def mocked_request(*args, **kwargs):
+    url = kwargs['url']
+    headers = kwargs.get('headers') or {}
+    if url == CONFIG['SERVER_URL'] + '/api/v3/fleet/systems/get-status/':
+        if headers.get('If-None-Match') == '"v1"':
+            return MockResponse(None, 304, {'ETag': '"v1"'})
+        return MockResponse({'status': 'READY'}, 200, {'ETag': '"v1"'})
+    if url == CONFIG['SERVER_URL'] + '/api/v3/fleet/systems/set-status/':
+        return MockResponse({}, 200)
+    return MockResponse(None, 404)
+
+
+def test_cache__disabled_by_default():
+    from mirismanagerclient import MirisManagerClient
+
+    mmc = MirisManagerClient(local_conf=dict(CONFIG, RESPONSE_CACHE=False))
+    assert mmc.response_cache is None
+
+
+@patch('requests.Session.post', side_effect=mocked_request)
+@patch('requests.Session.get', side_effect=mocked_request)
+def test_cache__ttl_and_invalidation(mock_get, mock_post):
+    from mirismanagerclient import MirisManagerClient
+
+    mmc = MirisManagerClient(local_conf=CONFIG)
+    response = mmc.api_request('GET_STATUS', params={'profile': 'main'})
+    assert response == {'status': 'READY'}
+    response['status'] = 'changed'
+    # Cached response is returned and is not affected by changes on previous responses
+    assert mmc.api_request('GET_STATUS', params={'profile': 'main'}) == {'status': 'READY'}
+    assert len(mock_get.call_args_list) == 1
+    # Other parameters are not cached
+    mmc.api_request('GET_STATUS', params={'profile': 'other'})
+    assert len(mock_get.call_args_list) == 2
+    # A status update invalidates the cached status
+    mmc.set_status(status='ready')
+    mmc.api_request('GET_STATUS', params={'profile': 'main'})
+    assert len(mock_get.call_args_list) == 3
+    assert mmc.response_cache.hits == 1
+
+
+@patch('requests.Session.get', side_effect=mocked_request)
+def test_cache__conditional_request(mock_get):
+    from mirismanagerclient import MirisManagerClient
+
+    mmc = MirisManagerClient(local_conf=CONFIG)
+    mmc.override_route('GET_STATUS', cache_ttl=0)
+    assert mmc.api_request('GET_STATUS') == {'status': 'READY'}
+    assert mmc.api_request('GET_STATUS') == {'status': 'READY'}
+    assert len(mock_get.call_args_list) == 2
+    assert mock_get.call_args_list[1].kwargs['headers']['If-None-Match'] == '"v1"'
+    assert mmc.response_cache.revalidations == 1
+
+
+def test_cache__lru_eviction():
+    from mirismanagerclient.lib.response_cache import ResponseCache
+
+    cache = ResponseCache(max_size=2)
+    for index in range(3):
+        cache.store(ResponseCache.make_key('GET_STATUS', '/url/', {'profile': index}), {'index': index}, 10)
+    assert len(cache) == 2
+    assert cache.get(ResponseCache.make_key('GET_STATUS', '/url/', {'profile': 0})) is None
+    assert cache.get(ResponseCache.make_key('GET_STATUS', '/url/', {'profile': 2})) is not None
+
+
+def test_cache__refresh_evicted_entry():
+    from mirismanagerclient.lib.response_cache import ResponseCache
+
+    cache = ResponseCache(max_size=2)
+    keys = [ResponseCache.make_key('GET_STATUS', '/url/', {'profile': index}) for index in range(3)]
+    cache.store(keys[0], {'index': 0}, 0, {'ETag': '"0"'})
+    entry = cache.get(keys[0])
+    # The entry is evicted while it is revalidated
+    cache.store(keys[1], {'index': 1}, 10)
+    cache.store(keys[2], {'index': 2}, 10)
+    cache.refresh(keys[0], entry, 10)
+    assert len(cache) == 2
+    assert cache.get(keys[0]) is entry
+    assert cache.get(keys[1]) is None
@@ -0,0 +1,91 @@
+import pytest
+
+
+def test_routes__shared_base_routes():
+    from mirismanagerclient.lib.configuration import load_conf
+    from mirismanagerclient.lib.routes import BASE_ROUTES, build_routes
+
+    routes_1 = build_routes(load_conf()['API_CALLS'])
+    routes_2 = build_routes(load_conf()['API_CALLS'])
+    assert routes_1['PING'] is BASE_ROUTES['PING']
+    assert routes_2['PING'] is BASE_ROUTES['PING']
+    assert routes_1['SET_STATUS'].method == 'post'
+    assert routes_1['SET_STATUS'].idempotent is False
+    assert routes_1['GET_STATUS'].idempotent is True
+    assert routes_1['PING'].anonymous is True
+
+
+def test_routes__immutable():
+    from mirismanagerclient.lib.routes import BASE_ROUTES
+
+    with pytest.raises(AttributeError):
+        BASE_ROUTES['PING'].url = '/test/'
+    with pytest.raises(TypeError):
+        BASE_ROUTES['PING'] = None
+
+
+def test_routes__conf_not_shared():
+    from mirismanagerclient.conf import BASE_CONF
+    from mirismanagerclient.lib.configuration import load_conf
+
+    conf = load_conf()
+    conf['API_CALLS']['PING']['url'] = '/changed/'
+    assert BASE_CONF['API_CALLS']['PING']['url'] == '/api/'
+    assert load_conf()['API_CALLS']['PING']['url'] == '/api/'
+
+
+def test_routes__partial_override():
+    from mirismanagerclient.lib.configuration import load_conf
+    from mirismanagerclient.lib.routes import BASE_ROUTES, build_routes
+
+    conf = load_conf(local_conf={'API_CALLS': {'PING': {'url': '/api/v4/', 'timeout': 3}}})
+    routes = build_routes(conf['API_CALLS'])
+    assert routes['PING'].url == '/api/v4/'
+    assert routes['PING'].timeout == 3
+    assert routes['PING'].method == 'get'
+    assert routes['SET_STATUS'] is BASE_ROUTES['SET_STATUS']
+
+
+def test_routes__partial_override_post():
+    from mirismanagerclient import MirisManagerClient
+    from mirismanagerclient.lib.configuration import load_conf
+    from mirismanagerclient.lib.routes import build_routes
+
+    conf = load_conf(local_conf={'API_CALLS': {
+        'SET_STATUS': {'url': '/x/', 'timeout': 3},
+        'SET_INFO': {'timeout': 5},
+        'CUSTOM': {'url': '/api/custom/'},
+    }})
+    routes = build_routes(conf['API_CALLS'])
+    assert routes['SET_STATUS'].method == 'post'
+    assert routes['SET_STATUS'].url == '/x/'
+    assert routes['SET_STATUS'].timeout == 3
+    assert routes['SET_STATUS'].invalidates == ('GET_STATUS', )
+    assert routes['SET_INFO'].method == 'post'
+    assert routes['SET_INFO'].timeout == 5
+    # API calls without method use the method given to the request
+    assert routes['CUSTOM'].method is None
+
+    client = MirisManagerClient(local_conf={'SERVER_URL': 'https://mmctest'}, setup_logging=False)
+    client.update_conf('API_CALLS', {'SET_STATUS': {'timeout': 4}})
+    route = client.get_url_info('SET_STATUS')
+    assert route.method == 'post'
+    assert route.url == '/api/v3/fleet/systems/set-status/'
+    assert route.timeout == 4
+    assert client.conf['API_CALLS']['PING']['url'] == '/api/'
+
+
+def test_client__override_route():
+    from mirismanagerclient import MirisManagerClient, MirisManagerRequestError
+
+    conf = {'SERVER_URL': 'https://mmctest'}
+    mmc_1 = MirisManagerClient(local_conf=conf)
+    mmc_2 = MirisManagerClient(local_conf=conf)
+    mmc_1.override_route('PING', timeout=2)
+    mmc_1.override_route('CUSTOM', url='/api/custom/', method='post')
+    assert mmc_1.get_url_info('PING').timeout == 2
+    assert mmc_2.get_url_info('PING').timeout is None
+    assert mmc_1.get_url_info('CUSTOM').idempotent is False
+    assert mmc_1.get_url_info('/api/raw/').url == '/api/raw/'
+    with pytest.raises(MirisManagerRequestError):
+        mmc_2.get_url_info('CUSTOM')
@@ -0,0 +1,141 @@
+import threading
+import time
+
+
+def _make_scheduler(execute, **kwargs):
+    from mirismanagerclient.lib.scheduler import CommandScheduler
+
+    reports = []
+    lock = threading.Lock()
+
+    def report(uid, status, data):
+        with lock:
+            reports.append((uid, status, data))
+
+    return CommandScheduler(execute, report, **kwargs), reports
+
+
+def test_scheduler__priority():
+    started = []
+    release = threading.Event()
+
+    def execute(uid, action, params):
+        started.append(uid)
+        if uid == 'blocker':
+            release.wait(5)
+        return 'DONE', uid
+
+    scheduler, reports = _make_scheduler(execute, workers=1, priorities={'STOP': 1, 'SCREENSHOT': 8})
+    scheduler.start()
+    scheduler.submit('blocker', 'OTHER', {})
+    time.sleep(0.05)
+    scheduler.submit('screenshot', 'SCREENSHOT', {})
+    scheduler.submit('other', 'OTHER', {})
+    scheduler.submit('stop', 'STOP', {})
+    release.set()
+    assert scheduler.wait_idle(5)
+    scheduler.stop()
+    assert started == ['blocker', 'stop', 'other', 'screenshot']
+    assert sorted(reports) == sorted((uid, 'DONE', uid) for uid in started)
+
+
+def test_scheduler__concurrency():
+    running = []
+    max_running = []
+    lock = threading.Lock()
+
+    def execute(uid, action, params):
+        with lock:
+            running.append(uid)
+            max_running.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(uid)
+        return 'DONE', ''
+
+    scheduler, reports = _make_scheduler(execute, workers=4, concurrency={'UPGRADE': 1})
+    scheduler.start()
+    for index in range(3):
+        scheduler.submit(f'uid-{index}', 'UPGRADE', {})
+    assert scheduler.wait_idle(5)
+    scheduler.stop()
+    assert max(max_running) == 1
+    assert len(reports) == 3
+
+
+def test_scheduler__timeout():
+    release = threading.Event()
+
+    def execute(uid, action, params):
+        release.wait(5)
+        return 'DONE', 'too late'
+
+    scheduler, reports = _make_scheduler(execute, workers=1, timeouts={'UPGRADE': 0.05})
+    scheduler.start()
+    scheduler.submit('uid-1', 'UPGRADE', {})
+    time.sleep(0.2)
+    assert reports == [('uid-1', 'FAILED', 'The command has not completed in 0.05s.')]
+    release.set()
+    assert scheduler.wait_idle(5)
+    scheduler.stop()
+    # The late result is not sent
+    assert len(reports) == 1
+    stats = scheduler.get_stats()['UPGRADE']
+    assert stats['count'] == 1
+    assert stats['timeouts'] == 1
+
+
+def test_scheduler__urgent():
+    release = threading.Event()
+
+    def execute(uid, action, params):
+        if action == 'UPGRADE':
+            release.wait(5)
+        return 'DONE', ''
+
+    scheduler, reports = _make_scheduler(execute, workers=1, priorities={'STOP_RECORDING': 0})
+    scheduler.start()
+    scheduler.submit('upgrade', 'UPGRADE', {})
+    time.sleep(0.05)
+    scheduler.submit('stop', 'STOP_RECORDING', {})
+    time.sleep(0.1)
+    # The urgent command does not wait for the worker running the upgrade
+    assert reports == [('stop', 'DONE', '')]
+    release.set()
+    assert scheduler.wait_idle(5)
+    scheduler.stop()
+    stats = scheduler.get_stats()
+    assert stats['STOP_RECORDING']['count'] == 1
+    assert stats['UPGRADE']['max_run_time'] >= 0.1
+
+
+def test_scheduler__failure():
+    def execute(uid, action, params):
+        raise RuntimeError('broken')
+
+    scheduler, reports = _make_scheduler(execute, workers=1)
+    scheduler.start()
+    scheduler.submit('uid-1', 'ACTION', {})
+    assert scheduler.wait_idle(5)
+    scheduler.stop()
+    assert reports == [('uid-1', 'FAILED', 'broken')]
+
+
+
+def test_scheduler__stop():
+    release = threading.Event()
+
+    def execute(uid, action, params):
+        release.wait(5)
+        return 'DONE', uid
+
+    scheduler, reports = _make_scheduler(execute, workers=2, concurrency={'UPGRADE': 1})
+    scheduler.start()
+    for uid, action in (('running', 'UPGRADE'), ('deferred', 'UPGRADE'), ('other', 'OTHER'), ('queued', 'OTHER')):
+        scheduler.submit(uid, action, {})
+        time.sleep(0.05)
+    scheduler.stop()
+    release.set()
+    # The queued and deferred commands are dropped, only the running ones are waited for
+    assert scheduler.wait_idle(2)
+    assert sorted(reports) == [('other', 'DONE', 'other'), ('running', 'DONE', 'running')]
@@ -0,0 +1,61 @@
+import threading
+import time
+
+
+def test_resolve_hosts():
+    from mirismanagerclient.lib.startup import resolve_hosts
+
+    assert resolve_hosts(['http://127.0.0.1:8000', 'https://localhost', '']) == []
+    assert resolve_hosts(['https://unknown-host.invalid']) == ['unknown-host.invalid']
+
+
+def test_run_concurrently():
+    from mirismanagerclient.lib.startup import run_concurrently
+
+    barrier = threading.Barrier(2, timeout=5)
+
+    def fail():
+        barrier.wait()
+        raise RuntimeError('failed')
+
+    results = run_concurrently({'ok': lambda: barrier.wait() or 'result', 'fail': fail})
+    assert results['ok'][0] == 'result'
+    assert str(results['fail'][1]) == 'failed'
+
+
+def test_client_start(stub_server):
+    from mirismanagerclient import MirisManagerClient
+
+    def set_status(request):
+        # The status is sent while the info request is being processed
+        time.sleep(0.1)
+        return 200, {}
+
+    stub_server.routes['/api/'] = lambda request: (200, {'version': '8.0.0'})
+    stub_server.routes['/api/v3/fleet/systems/register/'] = lambda request: (200, {
+        'api_key': 'the API key', 'secret_key': 'the secret key'})
+    stub_server.routes['/api/v3/fleet/systems/set-status/'] = set_status
+    stub_server.routes['/api/v3/fleet/systems/set-info/'] = set_status
+    conf = {'SERVER_URL': stub_server.url, 'CAPABILITIES': ['record']}
+    client = MirisManagerClient(local_conf=conf, setup_logging=False)
+
+    # First start: the system is registered
+    timings = client.start(status='ready')
+    assert client.conf['API_KEY'] == 'the API key'
+    assert [request['path'] for request in stub_server.requests] == [
+        '/api/', '/api/v3/fleet/systems/register/', '/api/v3/fleet/systems/set-status/']
+    assert stub_server.requests[1]['data']['capabilities'] == 'record'
+    assert 'info' not in timings
+    assert client.time_to_ready == timings['ready']
+
+    # Next start: the info and the status are sent at the same time
+    stub_server.requests.clear()
+    timings = client.start(status='ready', status_message='Ready')
+    assert sorted(request['path'] for request in stub_server.requests) == [
+        '/api/', '/api/v3/fleet/systems/set-info/', '/api/v3/fleet/systems/set-status/']
+    assert timings['ready'] < timings['info'] + timings['status']
+
+    stub_server.routes['/api/v3/fleet/systems/set-info/'] = lambda request: (500, {'error': 'Failed.'})
+    timings = client.start(send_info=True)
+    assert 'status' not in timings
+    assert client.time_to_ready is None
@@ -0,0 +1,79 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+
+class MockResponse:
+    status_code = 200
+    headers = {}
+    content = b'{}'
+
+
+def test_status_info__changes():
+    from mirismanagerclient.lib.codec import get_codec
+    from mirismanagerclient.lib.status import StatusInfo
+
+    info = StatusInfo(get_codec('json'), {'playlist': '/hls/adaptive.m3u8'})
+    assert info.changed is True
+    info.set('audio.master.volume', 1.0)
+    info['time_in_sec'] = 2
+    assert info.dirty_paths == ['audio.master.volume', 'playlist', 'time_in_sec']
+    assert json.loads(info.serialize()) == {
+        'playlist': '/hls/adaptive.m3u8',
+        'audio': {'master': {'volume': 1.0}},
+        'time_in_sec': 2,
+    }
+    info.mark_sent()
+    assert info.changed is False
+    # Setting the same value is not a change
+    assert info.set('audio.master.volume', 1.0) is False
+    assert info.changed is False
+    with pytest.raises(ValueError):
+        info.set('playlist.test', 1)
+
+
+def test_status_info__partial_serialization():
+    from mirismanagerclient.lib.codec import get_codec
+    from mirismanagerclient.lib.status import StatusInfo
+
+    codec = get_codec('json')
+    info = StatusInfo(codec, {'video': [{'name': 'source-f41f'}], 'time_in_sec': 1})
+    info.serialize()
+    info.mark_sent()
+    with patch.object(codec, 'dumps', wraps=codec.dumps) as mock_dumps:
+        info['time_in_sec'] = 2
+        assert json.loads(info.serialize()) == {'video': [{'name': 'source-f41f'}], 'time_in_sec': 2}
+    # Only the key and the value of the changed field are serialized
+    assert [call.args[0] for call in mock_dumps.call_args_list] == ['time_in_sec', 2]
+
+
+def test_status_info__changes_during_request():
+    from mirismanagerclient.lib.codec import get_codec
+    from mirismanagerclient.lib.status import StatusInfo
+
+    info = StatusInfo(get_codec('json'), {'time_in_sec': 1})
+    info.serialize()
+    info['time_in_sec'] = 2
+    info.mark_sent()
+    assert info.changed is True
+
+
+@patch('requests.Session.post', return_value=MockResponse())
+def test_client__set_status_info(mock_post):
+    from mirismanagerclient import MirisManagerClient
+
+    mmc = MirisManagerClient(local_conf={'SERVER_URL': 'https://mmctest', 'API_KEY': 'test API key'})
+    mmc.status_info.update(playlist='/hls/adaptive.m3u8', time_in_sec=0)
+    mmc.set_status(status='running', status_info=mmc.status_info)
+    assert json.loads(mock_post.call_args.kwargs['data']['status_info']) == {
+        'playlist': '/hls/adaptive.m3u8', 'time_in_sec': 0}
+    # Unchanged status info is not sent
+    assert mmc.set_status(status_info=mmc.status_info) == {}
+    assert len(mock_post.call_args_list) == 1
+    mmc.status_info['time_in_sec'] = 1
+    mmc.set_status(status_info=mmc.status_info)
+    assert len(mock_post.call_args_list) == 2
+    # Dicts are accepted too
+    mmc.set_status(status_info={'playlist': '/test.m3u8'})
+    assert mock_post.call_args.kwargs['data']['status_info'] == '{"playlist":"/test.m3u8"}'
@@ -0,0 +1,98 @@
+import time
+
+
+def test_compute_changes():
+    from mirismanagerclient.lib.status_watch import compute_changes
+
+    thresholds = [10000, 2000]
+    first = {'status': 'READY', 'online': True, 'remaining_space': 50000}
+    changes = compute_changes('room-1', None, first, thresholds)
+    assert [(change.kind, change.old, change.new) for change in changes] == [('status', None, 'READY')]
+    assert compute_changes('room-1', first, dict(first, remaining_space=20000), thresholds) == []
+
+    new = dict(first, status='RUNNING', online=False, remaining_space=1500,
+               last_error_date='2024-07-06 10:00:00', last_error_message='Failed')
+    changes = compute_changes('room-1', first, new, thresholds)
+    assert [(change.kind, change.old, change.new) for change in changes] == [
+        ('status', 'READY', 'RUNNING'), ('online', True, False), ('error', None, 'Failed'), ('space', 50000, 1500)]
+    assert compute_changes('room-1', new, dict(new, remaining_space=1000), thresholds) == []
+
+
+def test_status_watcher(stub_server):
+    from mirismanagerclient import MirisManagerClient
+    from mirismanagerclient.lib.status_watch import StatusWatcher
+
+    statuses = {'room-1': {'status': 'READY'}, 'room-2': {'status': 'INITIALIZING'}}
+
+    def get_status(request):
+        status = statuses.get(request['params']['profile'])
+        return (200, status) if status else (500, {'error': 'Failed.'})
+
+    stub_server.routes['/api/v3/fleet/systems/get-status/'] = get_status
+    conf = {'SERVER_URL': stub_server.url, 'API_KEY': 'user key', 'AUTO_REGISTRATION': False}
+    client = MirisManagerClient(local_conf=conf, setup_logging=False)
+    watcher = StatusWatcher(client, ['room-1', 'room-2', 'room-3'], min_interval=0.05, max_interval=0.4)
+    changes = []
+    for change in watcher.watch(duration=1):
+        changes.append((change.profile, change.kind, change.new))
+        if len(changes) == 3:
+            statuses['room-2'] = {'status': 'RUNNING'}
+            statuses['room-3'] = {'status': 'READY'}
+    assert sorted(changes[:3]) == [
+        ('room-1', 'status', 'READY'), ('room-2', 'status', 'INITIALIZING'), ('room-3', 'poll_error', True)]
+    assert sorted(changes[3:]) == [
+        ('room-2', 'status', 'RUNNING'), ('room-3', 'poll_error', False), ('room-3', 'status', 'READY')]
+
+    stats = {stats['profile']: stats for stats in watcher.get_stats()}
+    # Unchanged profiles are polled less often
+    assert stats['room-1']['interval'] == 0.4
+    assert stats['room-1']['polls'] < 10
+    assert not stats['room-3']['failing']
+
+    # The watcher can be stopped from a consumer
+    statuses['room-1'] = {'status': 'RUNNING'}
+    for change in client.watch_profiles(['room-1'], min_interval=0.05):
+        assert change.new == 'RUNNING'
+        break
+
+
+def test_status_watcher__close(stub_server):
+    from mirismanagerclient import MirisManagerClient
+    from mirismanagerclient.lib.status_watch import StatusWatcher
+
+    def get_status(request):
+        if request['params']['profile'] == 'room-2':
+            time.sleep(1)
+        return 200, {'status': 'READY'}
+
+    stub_server.routes['/api/v3/fleet/systems/get-status/'] = get_status
+    conf = {'SERVER_URL': stub_server.url, 'API_KEY': 'user key', 'AUTO_REGISTRATION': False}
+    client = MirisManagerClient(local_conf=conf, setup_logging=False)
+    watcher = StatusWatcher(client, ['room-1', 'room-2', 'room-1'], min_interval=0.05)
+    # Duplicate profiles are polled once
+    assert watcher.profiles == ['room-1', 'room-2']
+    changes = watcher.watch()
+    assert next(changes).profile == 'room-1'
+    # Closing the generator does not wait for the polls in progress
+    start = time.monotonic()
+    changes.close()
+    assert time.monotonic() - start < 0.5
+    assert [request['params']['profile'] for request in stub_server.requests].count('room-1') == 1
+
+
+def test_status_watcher__invalid_status(stub_server):
+    from mirismanagerclient import MirisManagerClient
+    from mirismanagerclient.lib.status_watch import StatusWatcher
+
+    def get_status(request):
+        if request['params']['profile'] == 'room-2':
+            return 200, ['READY']
+        return 200, {'status': 'READY'}
+
+    stub_server.routes['/api/v3/fleet/systems/get-status/'] = get_status
+    conf = {'SERVER_URL': stub_server.url, 'API_KEY': 'user key', 'AUTO_REGISTRATION': False}
+    client = MirisManagerClient(local_conf=conf, setup_logging=False)
+    watcher = StatusWatcher(client, ['room-1', 'room-2'], min_interval=0.05)
+    # An invalid response is reported as a poll error of its profile, the other profiles are still watched
+    changes = sorted((change.profile, change.kind, change.new) for change in watcher.watch(duration=0.5))
+    assert changes == [('room-1', 'status', 'READY'), ('room-2', 'poll_error', True)]
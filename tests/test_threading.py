@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import pytest
+
+
+@pytest.fixture()
+def server(stub_server):
+    def register(request):
+        time.sleep(0.2)  # Make concurrent registrations likely
+        return 200, {'api_key': 'new API key', 'secret_key': 'new secret key'}
+
+    def get_status(request):
+        if request['headers'].get('api-key') != 'new API key':
+            return 403, {'error': 'Invalid API key.'}
+        return 200, {'status': 'READY'}
+
+    stub_server.routes['/api/v3/fleet/systems/register/'] = register
+    stub_server.routes['/api/v3/fleet/systems/get-status/'] = get_status
+    return stub_server
+
+
+def test_client__single_registration(server):
+    from mirismanagerclient import MirisManagerClient
+
+    mmc = MirisManagerClient(local_conf={'SERVER_URL': server.url, 'RATE_LIMITS': None}, setup_logging=False)
+
+    def call(_index):
+        return mmc.api_request('GET_STATUS')
+
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        results = list(executor.map(call, range(200)))
+    assert results == [{'status': 'READY'}] * 200
+    assert server.count('/api/v3/fleet/systems/register/') == 1
+    assert server.count('/api/v3/fleet/systems/get-status/') == 200
+    assert mmc.conf['API_KEY'] == 'new API key'
+    assert mmc.conf['SECRET_KEY'] == 'new secret key'
+
+
+def test_client__concurrent_conf_updates(tmp_path):
+    from mirismanagerclient import MirisManagerClient
+
+    conf_path = tmp_path / 'conf.json'
+    conf_path.write_text('{"SERVER_URL": "https://mmctest"}')
+    mmc = MirisManagerClient(local_conf=str(conf_path), setup_logging=False)
+    snapshot = mmc.conf
+
+    def update(index):
+        mmc.check_conf()
+        mmc.update_conf(f'KEY_{index}', index)
+
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        list(executor.map(update, range(100)))
+    # No update is lost, and previous snapshots are never modified
+    assert all(mmc.conf[f'KEY_{index}'] == index for index in range(100))
+    assert 'KEY_0' not in snapshot
+    reloaded = MirisManagerClient(local_conf=str(conf_path), setup_logging=False)
+    assert all(reloaded.conf[f'KEY_{index}'] == index for index in range(100))
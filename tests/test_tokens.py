@@ -0,0 +1,99 @@
+import datetime
+import json
+import threading
+import time
+
+
+def test_token_pool():
+    from mirismanagerclient.lib.tokens import parse_expires, TokenPool
+
+    assert parse_expires('2022-01-14 02:56:13') == parse_expires('2022-01-14T03:56:13+01:00')
+
+    created = []
+    lifetimes = {'room-1': 600, 'room-2': 600}
+    lock = threading.Lock()
+
+    def create(system, purpose, data):
+        with lock:
+            created.append((system, purpose, data))
+            number = len(created)
+        expires = datetime.datetime.now(datetime.UTC) + datetime.timedelta(seconds=lifetimes[system])
+        return {'token': f'token-{number}', 'expires': expires.strftime('%Y-%m-%d %H:%M:%S')}
+
+    pool = TokenPool(create, size=3, margin=30, idle_timeout=60, retry_delay=0.05)
+    # First call: the token is created synchronously and the pool is filled in the background
+    assert pool.get('room-1', data={'b': 1, 'a': 2}) == 'token-1'
+    for _index in range(50):
+        if pool.get_stats()['available'] == 3:
+            break
+        time.sleep(0.01)
+    assert created[1] == ('room-1', 'control', '{"a": 2, "b": 1}')
+    tokens = {pool.get('room-1', data={'a': 2, 'b': 1}) for _index in range(3)}
+    assert tokens == {'token-2', 'token-3', 'token-4'}
+    stats = pool.get_stats()
+    assert stats['hits'] == 3
+    assert stats['misses'] == 1
+
+    # Tokens expiring too soon are not kept
+    lifetimes['room-2'] = 20
+    pool.warm('room-2', purpose='upload')
+    time.sleep(0.2)
+    assert pool.get_stats()['errors'] >= 1
+    assert 'token' in pool.get('room-2', purpose='upload')
+    pool.stop()
+    assert not pool._thread.is_alive()
+
+
+
+def test_token_pool__failing_pool():
+    from mirismanagerclient.lib.tokens import TokenPool
+
+    created = []
+
+    def create(system, purpose, data):
+        if system == 'room-bad':
+            raise OSError('Connection refused')
+        created.append(system)
+        expires = datetime.datetime.now(datetime.UTC) + datetime.timedelta(seconds=600)
+        return {'token': f'token-{len(created)}', 'expires': expires.strftime('%Y-%m-%d %H:%M:%S')}
+
+    pool = TokenPool(create, size=2, retry_delay=10)
+    pool.warm('room-bad')
+    time.sleep(0.05)
+    # A failing pool does not prevent the other pools from being refilled
+    pool.warm('room-1')
+    for _index in range(50):
+        if pool.get_stats()['available'] == 2:
+            break
+        time.sleep(0.01)
+    stats = pool.get_stats()
+    pool.stop()
+    assert stats['available'] == 2
+    assert stats['errors'] == 1
+
+
+def test_client_access_token(stub_server):
+    from mirismanagerclient import MirisManagerClient
+
+    def create_token(request):
+        return 200, {'token': 'token-' + request['data']['system'], 'expires': '2099-01-01 00:00:00'}
+
+    stub_server.routes['/api/v3/users/create-token/'] = create_token
+    conf = {'SERVER_URL': stub_server.url, 'API_KEY': 'user key', 'AUTO_REGISTRATION': False, 'TOKEN_POOL_SIZE': 2}
+    client = MirisManagerClient(local_conf=conf, setup_logging=False)
+    response = client.create_access_token('ubi-box-1', data={'speaker_id': 'jdoe'})
+    assert response['token'] == 'token-ubi-box-1'
+    request = stub_server.requests[0]
+    assert request['headers']['system'] == 'ubi-box-1'
+    assert request['data']['purpose'] == 'control'
+    assert json.loads(request['data']['data']) == {'speaker_id': 'jdoe'}
+
+    assert client.get_access_token('ubi-box-2') == 'token-ubi-box-2'
+    pool = client.get_token_pool()
+    for _index in range(50):
+        if pool.get_stats()['available'] == 2:
+            break
+        time.sleep(0.01)
+    # The pool is filled up to "TOKEN_POOL_SIZE" tokens
+    assert pool.get_stats()['available'] == 2
+    pool.stop()
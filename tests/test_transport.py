@@ -0,0 +1,29 @@
+import socket
+
+
+def test_keepalive_options():
+    from mirismanagerclient.lib.transport import get_keepalive_options
+
+    options = get_keepalive_options(idle=30, interval=10, count=3)
+    assert options[0] == (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    if hasattr(socket, 'TCP_KEEPIDLE'):
+        assert (socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30) in options
+    assert get_keepalive_options(idle=None) == [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+
+
+def test_session_keepalive(stub_server):
+    from mirismanagerclient import MirisManagerClient
+
+    client = MirisManagerClient(local_conf={'SERVER_URL': stub_server.url}, setup_logging=False)
+    adapter = client.session.get_adapter(stub_server.url)
+    socket_options = adapter.poolmanager.connection_pool_kw['socket_options']
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in socket_options
+
+    stub_server.routes['/api/'] = lambda request: (200, {'version': '8.0.0'})
+    for _index in range(3):
+        assert client.api_request('PING') == {'version': '8.0.0'}
+    # The connection is reused
+    assert len(set(request['handler'].client_address for request in stub_server.requests)) == 1
+
+    client = MirisManagerClient(local_conf={'TCP_KEEPALIVE': None}, setup_logging=False)
+    assert 'socket_options' not in client.session.get_adapter('https://test').poolmanager.connection_pool_kw
@@ -0,0 +1,43 @@
+import socket
+
+import pytest
+
+
+def test_magic_packet():
+    from mirismanagerclient.lib.wake_on_lan import build_magic_packet, get_targets
+
+    packet = build_magic_packet('AA-bb-cc-dd-ee-0F')
+    assert len(packet) == 102
+    assert packet[:6] == b'\xff' * 6
+    assert packet[6:12] == bytes.fromhex('aabbccddee0f')
+    assert packet == build_magic_packet('aa:bb:cc:dd:ee:0f') == build_magic_packet('aabbccddee0f')
+    with pytest.raises(ValueError):
+        build_magic_packet('aa:bb:cc:dd:ee')
+
+    assert get_targets({'mac': 'aa:bb:cc:dd:ee:ff', 'ip': '10.0.0.255'}) == [
+        {'mac': 'aa:bb:cc:dd:ee:ff', 'ip': '10.0.0.255'}]
+    assert get_targets({'targets': ['aa:bb:cc:dd:ee:ff']}) == [{'mac': 'aa:bb:cc:dd:ee:ff'}]
+    with pytest.raises(ValueError):
+        get_targets({})
+
+
+def test_wake_on_lan_sender():
+    from mirismanagerclient.lib.wake_on_lan import build_magic_packet, WakeOnLanSender
+
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as receiver:
+        receiver.bind(('127.0.0.1', 0))
+        receiver.settimeout(1)
+        sender = WakeOnLanSender(port=receiver.getsockname()[1], repeat=2, interval=0.01)
+        targets = [
+            {'mac': 'aa:bb:cc:dd:ee:01', 'ip': '127.0.0.1'},
+            {'mac': 'invalid', 'ip': '127.0.0.1'},
+            {'mac': 'aa:bb:cc:dd:ee:02', 'ip': '127.0.0.1'},
+            {'mac': 'aa:bb:cc:dd:ee:03', 'ip': '10.0.0'},
+        ]
+        results = sender.send(targets)
+        assert [result['sent'] for result in results] == [2, 0, 2, 0]
+        assert results[0]['error'] is None
+        assert 'mac address' in results[1]['error']
+        assert results[3]['error']
+        packets = [receiver.recv(1024) for _index in range(4)]
+    assert packets == [build_magic_packet('aa:bb:cc:dd:ee:01'), build_magic_packet('aa:bb:cc:dd:ee:02')] * 2